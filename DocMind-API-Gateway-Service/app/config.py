@@ -1,9 +1,11 @@
 from pydantic import BaseModel
-from typing import List
+from typing import Dict, List
 import os
 
 
 class Settings(BaseModel):
+    # Each upstream URL may list several replicas, comma-separated; they
+    # must serve the same paths and are balanced by LOAD_BALANCER_POLICY
     AUTH_SERVICE_URL: str = os.getenv(
         "AUTH_SERVICE_URL", "http://auth-service:8001")
     DOCUMENT_SERVICE_URL: str = os.getenv(
@@ -13,5 +15,173 @@ class Settings(BaseModel):
     ALLOWED_ORIGINS: List[str] = ["http://localhost:3000"]
     API_V1_PREFIX: str = "/api/v1"
 
+    # Upstream connection pool (one long-lived client per upstream; the
+    # limits apply to each replica)
+    UPSTREAM_MAX_CONNECTIONS: int = int(os.getenv(
+        "UPSTREAM_MAX_CONNECTIONS", "100"))
+    UPSTREAM_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv(
+        "UPSTREAM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    UPSTREAM_KEEPALIVE_EXPIRY: float = float(os.getenv(
+        "UPSTREAM_KEEPALIVE_EXPIRY", "30"))
+    UPSTREAM_CONNECT_TIMEOUT: float = float(os.getenv(
+        "UPSTREAM_CONNECT_TIMEOUT", "3"))
+    UPSTREAM_READ_TIMEOUT: float = float(os.getenv(
+        "UPSTREAM_READ_TIMEOUT", "30"))
+    UPSTREAM_WRITE_TIMEOUT: float = float(os.getenv(
+        "UPSTREAM_WRITE_TIMEOUT", "30"))
+    UPSTREAM_POOL_TIMEOUT: float = float(os.getenv(
+        "UPSTREAM_POOL_TIMEOUT", "5"))
+    # HTTP/2 needs the optional h2 package (pip install "httpx[http2]")
+    UPSTREAM_HTTP2: bool = os.getenv(
+        "UPSTREAM_HTTP2", "false").lower() in ("1", "true", "yes")
+
+    # Per-user gateway cache of document listings: served from memory while
+    # fresh, then revalidated upstream with If-None-Match until stale
+    RESPONSE_CACHE_MAX_SIZE: int = int(os.getenv("RESPONSE_CACHE_MAX_SIZE", "10000"))
+    RESPONSE_CACHE_FRESH_TTL: float = float(os.getenv("RESPONSE_CACHE_FRESH_TTL", "5"))
+    RESPONSE_CACHE_STALE_TTL: float = float(os.getenv("RESPONSE_CACHE_STALE_TTL", "300"))
+
+    # Largest request body the upload proxy will stream upstream (bytes)
+    MAX_UPLOAD_SIZE: int = int(os.getenv("MAX_UPLOAD_SIZE", str(1024 ** 3)))
+
+    # Shared Redis for cross-replica state; in-process stand-ins when unset
+    REDIS_URL: str = os.getenv("REDIS_URL", "")
+
+    # Verified token cache. Revocations reach the gateway only through
+    # Redis, so without REDIS_URL entries live at most
+    # TOKEN_CACHE_TTL_WITHOUT_REDIS seconds and a revoked token is accepted
+    # for no longer than that
+    TOKEN_CACHE_MAX_SIZE: int = int(os.getenv("TOKEN_CACHE_MAX_SIZE", "10000"))
+    TOKEN_CACHE_TTL: float = float(os.getenv("TOKEN_CACHE_TTL", "300"))
+    TOKEN_CACHE_TTL_WITHOUT_REDIS: float = float(os.getenv("TOKEN_CACHE_TTL_WITHOUT_REDIS", "5"))
+    TOKEN_REVOCATION_CHANNEL: str = os.getenv(
+        "TOKEN_REVOCATION_CHANNEL", "docmind:token-revocations")
+    # Revoked token IDs are held in Bloom filters bucketed by token expiry
+    REVOCATION_BUCKET_SECONDS: int = int(os.getenv("REVOCATION_BUCKET_SECONDS", "300"))
+    REVOCATION_FILTER_CAPACITY: int = int(os.getenv("REVOCATION_FILTER_CAPACITY", "10000"))
+    REVOCATION_FILTER_ERROR_RATE: float = float(os.getenv("REVOCATION_FILTER_ERROR_RATE", "0.001"))
+    # Full reload from Redis, covering messages missed while unsubscribed
+    REVOCATION_RELOAD_INTERVAL: float = float(os.getenv("REVOCATION_RELOAD_INTERVAL", "60"))
+
+    # Token verification: "local" checks signatures against the auth
+    # service's JWKS (RS256/EdDSA), "remote" asks the auth service every
+    # time, "auto" verifies locally and falls back to remote for tokens
+    # signed with keys it doesn't know (e.g. HS256). Local verification
+    # learns of revocations only through Redis, so without REDIS_URL
+    # "auto" verifies remotely and "local" refuses to start
+    JWT_VERIFY_MODE: str = os.getenv("JWT_VERIFY_MODE", "auto")
+    JWKS_PATH: str = os.getenv("JWKS_PATH", "/.well-known/jwks.json")
+    JWKS_REFRESH_INTERVAL: float = float(os.getenv("JWKS_REFRESH_INTERVAL", "300"))
+    JWT_LEEWAY: float = float(os.getenv("JWT_LEEWAY", "0"))
+
+    # Rate limiting: comma-separated "scope:limit/window_seconds" rules where
+    # scope is ip, user or route; algorithm is token_bucket or sliding_window
+    RATE_LIMIT_ENABLED: bool = os.getenv(
+        "RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+    RATE_LIMIT_RULES: str = os.getenv("RATE_LIMIT_RULES", "ip:100/60")
+    RATE_LIMIT_ALGORITHM: str = os.getenv("RATE_LIMIT_ALGORITHM", "token_bucket")
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+    # Upstream health snapshot refresh period and per-upstream probe deadline
+    HEALTH_CHECK_INTERVAL: float = float(os.getenv("HEALTH_CHECK_INTERVAL", "5"))
+    HEALTH_CHECK_TIMEOUT: float = float(os.getenv("HEALTH_CHECK_TIMEOUT", "1"))
+
+    # Client-side load balancing: round_robin, least_outstanding or p2c
+    # (power of two choices). A replica failing EJECTION_FAILURES times in a
+    # row is skipped for EJECTION_TIME seconds, growing per repeat ejection
+    LOAD_BALANCER_POLICY: str = os.getenv("LOAD_BALANCER_POLICY", "p2c")
+    EJECTION_FAILURES: int = int(os.getenv("EJECTION_FAILURES", "3"))
+    EJECTION_TIME: float = float(os.getenv("EJECTION_TIME", "30"))
+    EJECTION_MAX_TIME: float = float(os.getenv("EJECTION_MAX_TIME", "300"))
+    # Optional JSON file {"service": ["url", ...]}, re-read when it changes
+    UPSTREAM_ENDPOINTS_FILE: str = os.getenv("UPSTREAM_ENDPOINTS_FILE", "")
+
+    # Upstream resilience: circuit breaker, retries, hedging and deadlines
+    BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+    BREAKER_RECOVERY_TIMEOUT: float = float(os.getenv("BREAKER_RECOVERY_TIMEOUT", "30"))
+    BREAKER_HALF_OPEN_MAX_CALLS: int = int(os.getenv("BREAKER_HALF_OPEN_MAX_CALLS", "1"))
+    RETRY_MAX_ATTEMPTS: int = int(os.getenv("RETRY_MAX_ATTEMPTS", "2"))
+    RETRY_BACKOFF_BASE: float = float(os.getenv("RETRY_BACKOFF_BASE", "0.05"))
+    RETRY_BACKOFF_MAX: float = float(os.getenv("RETRY_BACKOFF_MAX", "1"))
+    HEDGE_ENABLED: bool = os.getenv(
+        "HEDGE_ENABLED", "false").lower() in ("1", "true", "yes")
+    HEDGE_PERCENTILE: float = float(os.getenv("HEDGE_PERCENTILE", "95"))
+    HEDGE_MIN_SAMPLES: int = int(os.getenv("HEDGE_MIN_SAMPLES", "50"))
+    # Default per-upstream deadline in seconds, "service:seconds,..."
+    UPSTREAM_DEADLINES: str = os.getenv(
+        "UPSTREAM_DEADLINES", "auth:5,document:30,rag:60")
+    UPLOAD_DEADLINE: float = float(os.getenv("UPLOAD_DEADLINE", "600"))
+
+    # Admission control: in-flight caps gateway-wide, per upstream and per
+    # route ("METHOD /route/template:limit"), each with a bounded wait queue.
+    # Lower priority values are admitted first when queues form
+    ADMISSION_ENABLED: bool = os.getenv(
+        "ADMISSION_ENABLED", "true").lower() in ("1", "true", "yes")
+    ADMISSION_GATEWAY_LIMIT: int = int(os.getenv("ADMISSION_GATEWAY_LIMIT", "512"))
+    ADMISSION_UPSTREAM_LIMITS: str = os.getenv(
+        "ADMISSION_UPSTREAM_LIMITS", "auth:200,document:200,rag:32")
+    ADMISSION_ROUTE_LIMITS: str = os.getenv("ADMISSION_ROUTE_LIMITS", "")
+    ADMISSION_PRIORITIES: str = os.getenv("ADMISSION_PRIORITIES", "auth:0,document:1,rag:2")
+    ADMISSION_QUEUE_SIZE: int = int(os.getenv("ADMISSION_QUEUE_SIZE", "100"))
+    ADMISSION_QUEUE_TIMEOUT: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2"))
+    # Adaptive upstream limits shrink while the median of recent latencies
+    # stays above ADMISSION_LATENCY_TOLERANCE x its long-run average, or by
+    # ADMISSION_BACKOFF per request while a good share of recent requests
+    # fail, and grow back towards the configured limit after
+    ADMISSION_ADAPTIVE: bool = os.getenv(
+        "ADMISSION_ADAPTIVE", "true").lower() in ("1", "true", "yes")
+    ADMISSION_MIN_LIMIT: int = int(os.getenv("ADMISSION_MIN_LIMIT", "4"))
+    ADMISSION_LATENCY_TOLERANCE: float = float(os.getenv("ADMISSION_LATENCY_TOLERANCE", "2"))
+    ADMISSION_BACKOFF: float = float(os.getenv("ADMISSION_BACKOFF", "0.9"))
+
+    # POST /api/v1/batch: most sub-requests per batch, and per batch at once
+    BATCH_MAX_REQUESTS: int = int(os.getenv("BATCH_MAX_REQUESTS", "20"))
+    BATCH_MAX_CONCURRENCY: int = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+
+    # Share one upstream call among identical concurrent GETs / token checks
+    SINGLE_FLIGHT_ENABLED: bool = os.getenv(
+        "SINGLE_FLIGHT_ENABLED", "true").lower() in ("1", "true", "yes")
+
+    # RAG answers per user, normalized query and document-set version; a
+    # similarity in (0, 1] also serves near-duplicate questions, 0 disables
+    ANSWER_CACHE_MAX_SIZE: int = int(os.getenv("ANSWER_CACHE_MAX_SIZE", "10000"))
+    ANSWER_CACHE_TTL: float = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+    ANSWER_CACHE_SIMILARITY: float = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0"))
+    # Document-Service announces new per-user document-set versions here
+    DOCSET_VERSION_CHANNEL: str = os.getenv(
+        "DOCSET_VERSION_CHANNEL", "docmind:docset-versions")
+
+    def jwt_verify_mode(self) -> str:
+        """JWT_VERIFY_MODE as it can actually be honoured with the configured Redis."""
+        if self.REDIS_URL or self.JWT_VERIFY_MODE == "remote":
+            return self.JWT_VERIFY_MODE
+        if self.JWT_VERIFY_MODE == "local":
+            raise RuntimeError("JWT_VERIFY_MODE=local needs REDIS_URL to receive token revocations")
+        return "remote"
+
+    def token_cache_ttl(self) -> float:
+        """TOKEN_CACHE_TTL, capped when no revocation feed can reach the cache."""
+        if self.REDIS_URL:
+            return self.TOKEN_CACHE_TTL
+        return min(self.TOKEN_CACHE_TTL, self.TOKEN_CACHE_TTL_WITHOUT_REDIS)
+
+    def upstream_deadlines(self) -> Dict[str, float]:
+        deadlines = {}
+        for item in filter(None, (part.strip() for part in self.UPSTREAM_DEADLINES.split(","))):
+            service, _, seconds = item.partition(":")
+            deadlines[service] = float(seconds)
+        return deadlines
+
+    def upstream_endpoints(self) -> Dict[str, List[str]]:
+        return {
+            service: [url.strip() for url in urls.split(",") if url.strip()]
+            for service, urls in (
+                ("auth", self.AUTH_SERVICE_URL),
+                ("document", self.DOCUMENT_SERVICE_URL),
+                ("rag", self.RAG_SERVICE_URL),
+            )
+        }
+
 
 settings = Settings()
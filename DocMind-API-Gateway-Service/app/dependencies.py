@@ -1,26 +1,89 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-import httpx
+import jwt
 from .config import settings
+from .utils.http import get_client, get_policy
+from .utils.jwks import UnknownKey, jwks_verifier
+from .utils.singleflight import SingleFlight
+from .utils.token_cache import hash_token, token_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Concurrent checks of the same token share one auth service round trip
+_verifications = SingleFlight("verify_token")
 
-async def verify_token(token: str = Depends(oauth2_scheme)) -> dict:
-    async with httpx.AsyncClient() as client:
+
+async def _verify_with_auth_service(token: str) -> dict:
+    # Sent through the auth upstream's policy, so it gets the same circuit
+    # breaker, retries, hedging and default deadline as proxied requests
+    request = get_client("auth").build_request(
+        "GET",
+        "/verify-token",
+        headers={"Authorization": f"Bearer {token}"}
+    )
+    try:
+        response = await get_policy("auth").send(request)
+    except HTTPException as e:
+        # Circuit open, deadline exceeded, auth service unreachable or overloaded
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication service unavailable",
+            headers=e.headers
+        )
+    if response.status_code == 200:
+        claims = response.json()
+        token_cache.set(token, claims)
+        return claims
+    if response.status_code >= 500:
+        # The auth service failing says nothing about the token
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication service unavailable"
+        )
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid token"
+    )
+
+
+async def _verify_locally(token: str) -> dict:
+    try:
+        claims = await jwks_verifier.verify(token)
+    except jwt.PyJWTError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token"
+        )
+    # Same shape as the auth service's /verify-token answer
+    claims = {**claims, "id": claims.get("id", claims["sub"])}
+    token_cache.set(token, claims)
+    return claims
+
+
+async def authenticate(token: str) -> dict:
+    claims = token_cache.get(token)
+    if claims is not None:
+        return claims
+
+    if settings.jwt_verify_mode() != "remote":
         try:
-            response = await client.get(
-                f"{settings.AUTH_SERVICE_URL}/verify-token",
-                headers={"Authorization": f"Bearer {token}"}
-            )
-            if response.status_code == 200:
-                return response.json()
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token"
-            )
-        except httpx.RequestError:
-            raise HTTPException(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail="Authentication service unavailable"
-            )
+            claims = await _verify_locally(token)
+            if not token_cache.maybe_revoked(claims):
+                return claims
+            # The revocation filter can't say "revoked" for certain; the
+            # auth service can
+        except UnknownKey:
+            if settings.jwt_verify_mode() == "local":
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Invalid token"
+                )
+
+    if not settings.SINGLE_FLIGHT_ENABLED:
+        return await _verify_with_auth_service(token)
+    return await _verifications.do(
+        hash_token(token), lambda: _verify_with_auth_service(token))
+
+
+async def verify_token(token: str = Depends(oauth2_scheme)) -> dict:
+    return await authenticate(token)
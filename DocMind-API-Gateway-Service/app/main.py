@@ -1,17 +1,60 @@
+from contextlib import asynccontextmanager
+from docmind_common.metrics import registry
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from datetime import datetime
-import httpx
 
 from .config import settings
+from .middlewares.auth import AdmissionMiddleware, RateLimitMiddleware
 from .routes import router
+from .utils.answer_cache import answer_cache
+from .utils.health import health_monitor
+from .utils.http import start_clients, close_clients
+from .utils.jwks import jwks_verifier
+from .utils.pubsub import pubsub
+from .utils.token_cache import token_cache
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open one pooled client per upstream for the lifetime of the gateway
+    await start_clients()
+    if settings.jwt_verify_mode() != "remote":
+        await jwks_verifier.start()
+    await token_cache.start()
+    await answer_cache.start()
+    await health_monitor.start()
+    yield
+    await health_monitor.stop()
+    await answer_cache.stop()
+    await token_cache.stop()
+    await jwks_verifier.stop()
+    if rate_limiter is not None:
+        await rate_limiter.limiter.close()
+    await pubsub.close()
+    await close_clients()
+
 
 app = FastAPI(
     title="DocMind-Document Processing Platform API Gateway",
     description="API Gateway for document processing and RAG-based Q&A system",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Admission control (innermost, so rate-limited requests never take a slot)
+if settings.ADMISSION_ENABLED:
+    app.middleware("http")(AdmissionMiddleware())
+
+# Rate limiting (registered before CORS so CORS wraps its 429 responses)
+rate_limiter = None
+if settings.RATE_LIMIT_ENABLED:
+    rate_limiter = RateLimitMiddleware()
+    app.middleware("http")(rate_limiter)
+# The batch route charges each of its sub-requests through it
+app.state.rate_limiter = rate_limiter
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -29,35 +72,43 @@ app.include_router(router)
 
 @app.get("/health")
 async def health_check():
-    services_health = {}
-    async with httpx.AsyncClient() as client:
-        for service, url in {
-            "auth": settings.AUTH_SERVICE_URL,
-            "document": settings.DOCUMENT_SERVICE_URL,
-            "rag": settings.RAG_SERVICE_URL
-        }.items():
-            try:
-                response = await client.get(f"{url}/health")
-                services_health[service] = "healthy" if response.status_code == 200 else "unhealthy"
-            except httpx.RequestError:
-                services_health[service] = "unavailable"
+    # Served from the background-refreshed snapshot, never blocks on upstreams
+    return {
+        "status": health_monitor.overall(),
+        "timestamp": datetime.now().isoformat(),
+        "services": health_monitor.summary()
+    }
+
 
+@app.get("/health/details")
+async def health_details():
     return {
-        "status": "healthy",
+        "status": health_monitor.overall(),
         "timestamp": datetime.now().isoformat(),
-        "services": services_health
+        "check_interval": health_monitor.interval,
+        "check_timeout": health_monitor.timeout,
+        "services": health_monitor.details()
     }
 
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 # Error Handlers
 
 
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
-    return {
-        "status_code": exc.status_code,
-        "detail": exc.detail,
-        "timestamp": datetime.now().isoformat()
-    }
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={
+            "status_code": exc.status_code,
+            "detail": exc.detail,
+            "timestamp": datetime.now().isoformat()
+        },
+        headers=exc.headers
+    )
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,10 +1,15 @@
 from fastapi import Request, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from typing import Optional, Dict
-import jwt
-from datetime import datetime
-import httpx
+from fastapi.responses import JSONResponse
+from starlette.routing import Match
+from typing import Optional, Dict, Tuple
+import time
 from ..config import settings
+from ..dependencies import authenticate
+from ..utils.admission import Admission, Shed, admission, retry_after_header
+from ..utils.rate_limit import (RateLimiter, RateLimitResult, RateLimitRule, create_rate_limiter,
+                               rate_limit_headers)
+from ..utils.token_cache import hash_token, token_cache
 
 
 class JWTAuthMiddleware(HTTPBearer):
@@ -15,6 +20,8 @@ class JWTAuthMiddleware(HTTPBearer):
             "/api/v1/auth/register",
             "/api/v1/auth/refresh-token",
             "/health",
+            "/health/details",
+            "/metrics",
             "/docs",
             "/openapi.json"
         }
@@ -31,64 +38,110 @@ class JWTAuthMiddleware(HTTPBearer):
                 detail="Invalid authorization credentials"
             )
 
-        try:
-            # Verify token with auth service
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{settings.AUTH_SERVICE_URL}/verify-token",
-                    headers={"Authorization": f"Bearer {
-                        credentials.credentials}"}
-                )
-
-                if response.status_code != 200:
-                    raise HTTPException(
-                        status_code=status.HTTP_401_UNAUTHORIZED,
-                        detail="Invalid or expired token"
-                    )
-
-                user_data = response.json()
-                # Add user data to request state
-                request.state.user = user_data
-                return user_data
-
-        except httpx.RequestError:
-            raise HTTPException(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail="Authentication service unavailable"
-            )
-        except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail=str(e)
-            )
+        # Verify token with auth service (cached and coalesced)
+        user_data = await authenticate(credentials.credentials)
+        # Add user data to request state
+        request.state.user = user_data
+        return user_data
+
+
+def route_key(request: Request) -> str:
+    # Key on the route template so /documents/1 and /documents/2 share a limit
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return f"{request.method} {getattr(route, 'path', request.url.path)}"
+    return f"{request.method} {request.url.path}"
 
 
 class RateLimitMiddleware:
-    def __init__(self, max_requests: int = 100, window_seconds: int = 60):
-        self.max_requests = max_requests
-        self.window_seconds = window_seconds
-        self._requests = {}
+    def __init__(self, limiter: Optional[RateLimiter] = None):
+        self.limiter = limiter or create_rate_limiter()
+        self.scopes = {rule.scope for rule in self.limiter.rules}
+        # Load balancer probes and scrapes must never be throttled; batch
+        # sub-requests are charged one by one by the batch route
+        self.exempt_paths = {"/health", "/health/details", "/metrics",
+                             f"{settings.API_V1_PREFIX}/batch"}
+
+    @staticmethod
+    def _user_key(request: Request) -> Optional[str]:
+        authorization = request.headers.get("authorization", "")
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return None
+        claims = token_cache.peek(token)
+        if claims and claims.get("id") is not None:
+            return str(claims["id"])
+        return hash_token(token)
+
+    async def check(self, request: Request) -> Tuple[RateLimitResult, Optional[RateLimitRule]]:
+        """Charge one hit for ``request`` against every configured scope."""
+        keys = {}
+        if "ip" in self.scopes and request.client:
+            keys["ip"] = request.client.host
+        if "user" in self.scopes:
+            keys["user"] = self._user_key(request)
+        if "route" in self.scopes:
+            keys["route"] = route_key(request)
+        return await self.limiter.hit(
+            {scope: key for scope, key in keys.items() if key is not None})
 
     async def __call__(self, request: Request, call_next):
-        # Get client IP
-        client_ip = request.client.host
+        if request.url.path in self.exempt_paths:
+            return await call_next(request)
 
-        # Check if client has exceeded rate limit
-        current_time = datetime.utcnow().timestamp()
-        client_requests = self._requests.get(client_ip, [])
+        result, rule = await self.check(request)
+        headers = rate_limit_headers(result, rule)
 
-        # Remove old requests
-        client_requests = [req_time for req_time in client_requests
-                           if current_time - req_time < self.window_seconds]
-
-        if len(client_requests) >= self.max_requests:
-            raise HTTPException(
+        if not result.allowed:
+            return JSONResponse(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail="Rate limit exceeded"
+                content={"detail": "Rate limit exceeded"},
+                headers=headers
             )
 
-        # Add current request
-        client_requests.append(current_time)
-        self._requests[client_ip] = client_requests
+        response = await call_next(request)
+        response.headers.update(headers)
+        return response
 
-        return await call_next(request)
+
+class AdmissionMiddleware:
+    """Caps in-flight requests per route and gateway-wide.
+
+    Requests beyond a limit wait in a bounded priority queue (auth and
+    document listings ahead of RAG by default) and get a fast 503 with
+    Retry-After when the queue is full or the wait times out. Upstream
+    limits are applied by UpstreamPolicy, around the upstream call itself.
+    """
+
+    def __init__(self, controller: Optional[Admission] = None):
+        self.admission = controller or admission
+        # Batch sub-requests are admitted one by one by the batch route
+        self.exempt_paths = {"/health", "/health/details", "/metrics",
+                             f"{settings.API_V1_PREFIX}/batch"}
+
+    async def __call__(self, request: Request, call_next):
+        if request.url.path in self.exempt_paths:
+            return await call_next(request)
+
+        try:
+            acquired = await self.admission.enter(
+                self.admission.service_for(request.url.path), route_key(request))
+        except Shed as e:
+            return JSONResponse(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                content={"detail": f"Gateway overloaded ({e.limiter} {e.reason}), retry later"},
+                headers=retry_after_header(e)
+            )
+
+        start = time.perf_counter()
+        ok = False
+        try:
+            response = await call_next(request)
+            ok = response.status_code < 500
+            return response
+        finally:
+            # Time to response headers; upload time says nothing about load
+            streamed_body = request.headers.get("content-type", "").startswith("multipart/")
+            latency = None if streamed_body else time.perf_counter() - start
+            self.admission.leave(acquired, latency, ok)
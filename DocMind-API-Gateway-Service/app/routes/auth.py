@@ -1,14 +1,15 @@
 from fastapi import APIRouter
 from app.config import settings
-from app.utils.http import forward_request
+from app.utils.http import proxy_request
 
 router = APIRouter(prefix=f"{settings.API_V1_PREFIX}/auth", tags=["auth"])
 
 
 @router.post("/login")
 async def login(credentials: dict):
-    return await forward_request(
-        f"{settings.AUTH_SERVICE_URL}/login",
+    return await proxy_request(
+        "auth",
+        "/login",
         method="POST",
         json=credentials
     )
@@ -16,8 +17,9 @@ async def login(credentials: dict):
 
 @router.post("/register")
 async def register(user_data: dict):
-    return await forward_request(
-        f"{settings.AUTH_SERVICE_URL}/register",
+    return await proxy_request(
+        "auth",
+        "/register",
         method="POST",
         json=user_data
     )
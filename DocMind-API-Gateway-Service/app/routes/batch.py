@@ -0,0 +1,103 @@
+import asyncio
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from ..config import settings
+from ..dependencies import verify_token
+from ..middlewares.auth import route_key
+from ..utils.admission import Shed, admission, retry_after_header
+from ..utils.rate_limit import rate_limit_headers
+from ..utils.batch import SubRequest, decode_body, is_batchable
+
+router = APIRouter(prefix=settings.API_V1_PREFIX, tags=["batch"])
+
+
+class BatchItem(BaseModel):
+    id: Optional[str] = None
+    method: str = "GET"
+    path: str
+    query: Optional[Dict[str, Any]] = None
+    headers: Optional[Dict[str, str]] = None
+    body: Optional[Any] = None
+
+
+class BatchRequest(BaseModel):
+    requests: List[BatchItem]
+    # Stream results as NDJSON in completion order instead of one ordered list
+    stream: bool = False
+
+
+def _result(index: int, item: BatchItem, status_code: int, headers: Dict[str, str], body: Any) -> Dict:
+    return {"index": index, "id": item.id, "status": status_code, "headers": headers, "body": body}
+
+
+async def _run(request: Request, index: int, item: BatchItem, slots: asyncio.Semaphore) -> Dict:
+    if not is_batchable(item.path):
+        return _result(index, item, status.HTTP_400_BAD_REQUEST, {},
+                       {"detail": f"Path not allowed in a batch: {item.path}"})
+
+    sub_request = SubRequest(request, item.method, item.path, item.query, item.headers, item.body)
+    rate_limiter = getattr(request.app.state, "rate_limiter", None)
+    if rate_limiter is not None:
+        # Charged like a standalone call, so a batch can't multiply the quota
+        result, rule = await rate_limiter.check(sub_request.request)
+        if not result.allowed:
+            return _result(index, item, status.HTTP_429_TOO_MANY_REQUESTS, rate_limit_headers(result, rule),
+                           {"detail": "Rate limit exceeded"})
+    async with slots:
+        acquired = []
+        if settings.ADMISSION_ENABLED:
+            # Admitted like a standalone call, so batches can't bypass the gateway's limits
+            try:
+                acquired = await admission.enter(
+                    admission.service_for(item.path), route_key(sub_request.request))
+            except Shed as e:
+                return _result(index, item, status.HTTP_503_SERVICE_UNAVAILABLE, retry_after_header(e),
+                               {"detail": f"Gateway overloaded ({e.limiter} {e.reason}), retry later"})
+
+        start = time.perf_counter()
+        status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+        try:
+            status_code, headers, body = await sub_request.run()
+        except Exception:
+            return _result(index, item, status_code, {}, {"detail": "Internal error"})
+        finally:
+            admission.leave(acquired, time.perf_counter() - start, status_code < 500)
+    return _result(index, item, status_code, headers, decode_body(headers, body))
+
+
+@router.post("/batch")
+async def batch(batch_request: BatchRequest, request: Request, user: dict = Depends(verify_token)):
+    """Run several API calls in one round trip, authenticated once.
+
+    Sub-requests run concurrently (at most BATCH_MAX_CONCURRENCY at a time)
+    and each result carries its index, id, status, headers and body.
+    """
+    items = batch_request.requests
+    if len(items) > settings.BATCH_MAX_REQUESTS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch exceeds {settings.BATCH_MAX_REQUESTS} requests"
+        )
+
+    slots = asyncio.Semaphore(settings.BATCH_MAX_CONCURRENCY)
+    tasks = [asyncio.create_task(_run(request, index, item, slots)) for index, item in enumerate(items)]
+
+    if not batch_request.stream:
+        return {"responses": await asyncio.gather(*tasks)}
+
+    async def results():
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield json.dumps(await next_done).encode() + b"\n"
+        finally:
+            # Client went away mid-stream; don't leave sub-requests running
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
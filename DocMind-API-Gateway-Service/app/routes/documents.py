@@ -1,28 +1,91 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from ..config import settings
 from ..dependencies import verify_token
-from ..utils.http import forward_request
+from ..utils.answer_cache import answer_cache
+from ..utils.http import cached_proxy_request, forward_upload, proxy_request
+from ..utils.response_cache import response_cache
 
 router = APIRouter(
     prefix=f"{settings.API_V1_PREFIX}/documents", tags=["documents"])
 
 
+def _documents_changed(user_id: str, response) -> None:
+    response_cache.invalidate(user_id)
+    # Document-Service reports the new document-set version on writes
+    version = response.headers.get("x-docset-version")
+    answer_cache.docset_changed(user_id, int(version) if version and version.isdigit() else None)
+
+
 @router.post("/upload")
-async def upload_document(user: dict = Depends(verify_token)):
-    return await forward_request(
-        f"{settings.DOCUMENT_SERVICE_URL}/upload",
-        method="POST",
-        headers={"X-User-ID": user["id"]}
+async def upload_document(request: Request, user: dict = Depends(verify_token)):
+    response = await forward_upload(
+        "document",
+        "/upload",
+        request,
+        headers={"X-User-ID": str(user["id"])},
+        deadline=settings.UPLOAD_DEADLINE
     )
+    _documents_changed(str(user["id"]), response)
+    return response
 
 
 @router.get("/")
 async def list_documents(
+    request: Request,
     page: int = 1,
     limit: int = 10,
     user: dict = Depends(verify_token)
 ):
-    return await forward_request(
-        f"{settings.DOCUMENT_SERVICE_URL}/documents",
-        params={"page": page, "limit": limit, "user_id": user["id"]}
+    return await cached_proxy_request(
+        "document",
+        "/documents",
+        request,
+        principal=str(user["id"]),
+        params={"page": page, "limit": limit, "user_id": user["id"]},
+        headers={"Authorization": request.headers["authorization"]}
+    )
+
+
+@router.get("/{document_id}")
+async def get_document(
+    document_id: int,
+    request: Request,
+    user: dict = Depends(verify_token)
+):
+    return await cached_proxy_request(
+        "document",
+        f"/documents/{document_id}",
+        request,
+        principal=str(user["id"]),
+        headers={"Authorization": request.headers["authorization"]}
+    )
+
+
+@router.get("/{document_id}/status")
+async def get_document_status(
+    document_id: int,
+    request: Request,
+    user: dict = Depends(verify_token)
+):
+    # Changes as ingestion progresses, so never served from the cache
+    return await proxy_request(
+        "document",
+        f"/documents/{document_id}/status",
+        headers={"Authorization": request.headers["authorization"]}
+    )
+
+
+@router.delete("/{document_id}")
+async def delete_document(
+    document_id: int,
+    request: Request,
+    user: dict = Depends(verify_token)
+):
+    response = await proxy_request(
+        "document",
+        f"/documents/{document_id}",
+        method="DELETE",
+        headers={"Authorization": request.headers["authorization"]}
     )
+    _documents_changed(str(user["id"]), response)
+    return response
@@ -1,15 +1,34 @@
 from fastapi import APIRouter, Depends
 from ..config import settings
 from ..dependencies import verify_token
-from ..utils.http import forward_request
+from ..utils.answer_cache import answer_cache
+from ..utils.http import buffered_response, fetch_buffered, get_client
+from ..utils.singleflight import SingleFlight
 
 router = APIRouter(prefix=f"{settings.API_V1_PREFIX}/rag", tags=["rag"])
 
+# Identical questions asked concurrently by one user share one RAG call
+_answers = SingleFlight("rag_answer")
+
+
+async def _answer(key, query: dict, user_id):
+    upstream_request = get_client("rag").build_request(
+        "POST", "/query", json={"query": query, "user_id": user_id})
+    status_code, raw_headers, body = await fetch_buffered(
+        "rag", upstream_request, deadline=None)
+    # Only successful answers are reused; errors are retried next time
+    if status_code == 200:
+        answer_cache.set(key, (status_code, raw_headers, body))
+    return status_code, raw_headers, body
+
 
 @router.post("/query")
 async def query_documents(query: dict, user: dict = Depends(verify_token)):
-    return await forward_request(
-        f"{settings.RAG_SERVICE_URL}/query",
-        method="POST",
-        json={"query": query, "user_id": user["id"]}
-    )
+    key = answer_cache.key(str(user["id"]), query)
+    cached = answer_cache.get(key)
+    if cached is None:
+        if settings.SINGLE_FLIGHT_ENABLED:
+            cached = await _answers.do(key, lambda: _answer(key, query, user["id"]))
+        else:
+            cached = await _answer(key, query, user["id"])
+    return buffered_response(*cached)
@@ -0,0 +1,283 @@
+import asyncio
+import heapq
+import itertools
+import math
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from docmind_common.metrics import registry
+
+from ..config import settings
+
+admitted_total = registry.counter(
+    "gateway_admission_admitted_total", "Requests admitted per limiter")
+shed_total = registry.counter(
+    "gateway_admission_shed_total", "Requests shed per limiter and reason (queue_full, evicted, timeout)")
+
+
+class Shed(Exception):
+    """Raised when a request is refused admission."""
+
+    def __init__(self, limiter: str, reason: str, retry_after: float):
+        super().__init__(f"{limiter}: {reason}")
+        self.limiter = limiter
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class GradientLimit:
+    """Concurrency limit adapted from how far latency has drifted from its norm.
+
+    The signal is the median latency of the last ``short_window``
+    requests, so a few slow ones don't move it; its moving average over
+    about ``long_window`` requests is the norm. Each request moves the
+    limit a fifth of the way towards ``limit * gradient + sqrt(limit)``,
+    where the gradient is ``tolerance * norm / median``, capped at 1 and
+    floored at 0.5: the limit holds or grows (the headroom only counts
+    while the limit is actually used) until recent latency as a whole
+    rises past ``tolerance`` times the norm. Errors work the same way:
+    the limit is multiplied by ``backoff`` only while more than
+    ERROR_RATE of the recent requests failed. A slowdown that lasts
+    becomes the new norm, and the limit recovers.
+    """
+
+    ERROR_RATE = 0.3
+
+    def __init__(self, initial: int, min_limit: int, max_limit: int,
+                 tolerance: float = 2.0, backoff: float = 0.9,
+                 short_window: int = 20, long_window: int = 500):
+        self.value = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.recent: Deque[float] = deque(maxlen=short_window)
+        self.norm = 0.0
+        self.samples = 0
+        self.errors = 0.0
+        self._short_weight = 2 / (short_window + 1)
+        self._long_weight = 2 / (long_window + 1)
+
+    @property
+    def limit(self) -> int:
+        return int(self.value)
+
+    def _set(self, value: float) -> None:
+        self.value = min(self.max_limit, max(self.min_limit, value))
+
+    def observe(self, latency: Optional[float], ok: bool, inflight: int) -> None:
+        self.errors += ((0.0 if ok else 1.0) - self.errors) * self._short_weight
+        if self.errors > self.ERROR_RATE:
+            self._set(self.value * self.backoff)
+            return
+        if latency is None:
+            return
+        self.recent.append(latency)
+        median = sorted(self.recent)[len(self.recent) // 2]
+        self.samples += 1
+        # A plain mean until the window has filled, so the first requests
+        # don't set the norm on their own
+        self.norm += (median - self.norm) * max(self._long_weight, 1 / self.samples)
+        if self.norm > median * 2:
+            # Back from a slow spell: let the norm come down with it
+            self.norm = max(median, self.norm * 0.95)
+        if len(self.recent) < self.recent.maxlen or median <= 0:
+            return
+
+        gradient = max(0.5, min(1.0, self.tolerance * self.norm / median))
+        target = self.value * gradient
+        if inflight * 2 >= self.value:
+            target += math.sqrt(self.value)
+        self._set(self.value * 0.8 + target * 0.2)
+
+
+class FixedLimit:
+    def __init__(self, limit: int):
+        self.limit = limit
+
+    def observe(self, latency: Optional[float], ok: bool, inflight: int) -> None:
+        pass
+
+
+class AdmissionController:
+    """Concurrency limit with a bounded, priority-ordered wait queue.
+
+    Lower ``priority`` values are admitted first. When the queue is full a
+    newcomer displaces the lowest-priority waiter if it outranks it, and is
+    shed otherwise; waiters are also shed after ``queue_timeout`` seconds.
+    """
+
+    def __init__(self, name: str, limit, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.limiter = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.inflight = 0
+        self.latency: Optional[float] = None
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+    @property
+    def limit(self) -> int:
+        return self.limiter.limit
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> float:
+        # Rough time for the current backlog to drain at the current limit
+        latency = self.latency or 1.0
+        return latency * (self.queued + 1) / max(1, self.limit)
+
+    def _shed(self, reason: str) -> Shed:
+        shed_total.inc(limiter=self.name, reason=reason)
+        return Shed(self.name, reason, self.retry_after())
+
+    async def acquire(self, priority: int = 0) -> None:
+        if self.inflight < self.limit and not self._waiters:
+            self.inflight += 1
+            admitted_total.inc(limiter=self.name)
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            worst = max(self._waiters, default=None)
+            if worst is None or worst[0] <= priority:
+                raise self._shed("queue_full")
+            self._waiters.remove(worst)
+            heapq.heapify(self._waiters)
+            worst[2].set_exception(self._shed("evicted"))
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._sequence), future)
+        heapq.heappush(self._waiters, entry)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            if future.done() and not future.exception():
+                # Admitted just as the wait timed out; hand the slot back
+                self.release(None, True)
+            raise self._shed("timeout")
+        except asyncio.CancelledError:
+            if entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            elif future.done() and not future.exception():
+                self.release(None, True)
+            raise
+        admitted_total.inc(limiter=self.name)
+
+    def release(self, latency: Optional[float], ok: bool) -> None:
+        self.inflight -= 1
+        if latency is not None:
+            self.latency = latency if self.latency is None else self.latency * 0.9 + latency * 0.1
+        if latency is not None or not ok:
+            self.limiter.observe(latency, ok, self.inflight)
+        while self._waiters and self.inflight < self.limit:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self.inflight += 1
+                future.set_result(None)
+
+
+def _parse_mapping(value: str) -> Dict[str, str]:
+    mapping = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        key, _, limit = item.rpartition(":")
+        mapping[key.strip()] = limit.strip()
+    return mapping
+
+
+def _controller(name: str, limit: int, adaptive: bool) -> AdmissionController:
+    if adaptive:
+        limiter = GradientLimit(limit, settings.ADMISSION_MIN_LIMIT, limit,
+                            settings.ADMISSION_LATENCY_TOLERANCE, settings.ADMISSION_BACKOFF)
+    else:
+        limiter = FixedLimit(limit)
+    return AdmissionController(
+        name, limiter, settings.ADMISSION_QUEUE_SIZE, settings.ADMISSION_QUEUE_TIMEOUT)
+
+
+class Admission:
+    """Gateway-wide, per-upstream and per-route admission controllers.
+
+    A request queues for its route (if that route has a limit), then for
+    a gateway-wide slot. Upstream slots are taken by UpstreamPolicy around
+    each call to the upstream, and fed that call's latency and outcome,
+    so requests the gateway answers itself (cache hits, 304s, locally
+    verified tokens) neither hold one nor skew its limit. With
+    ADMISSION_ADAPTIVE, upstream limits are ceilings that back off while
+    the upstream slows down or fails, and recover after.
+    """
+
+    def __init__(self):
+        self.priorities = {service: int(value) for service, value in
+                           _parse_mapping(settings.ADMISSION_PRIORITIES).items()}
+        self.gateway = _controller("gateway", settings.ADMISSION_GATEWAY_LIMIT, adaptive=False)
+        self.upstreams = {
+            service: _controller(service, int(limit), settings.ADMISSION_ADAPTIVE)
+            for service, limit in _parse_mapping(settings.ADMISSION_UPSTREAM_LIMITS).items()
+        }
+        self.routes = {
+            route: _controller(route, int(limit), adaptive=False)
+            for route, limit in _parse_mapping(settings.ADMISSION_ROUTE_LIMITS).items()
+        }
+        self.prefixes = {
+            f"{settings.API_V1_PREFIX}/auth": "auth",
+            f"{settings.API_V1_PREFIX}/documents": "document",
+            f"{settings.API_V1_PREFIX}/rag": "rag",
+        }
+
+    def service_for(self, path: str) -> Optional[str]:
+        for prefix, service in self.prefixes.items():
+            if path.startswith(prefix):
+                return service
+        return None
+
+    def controllers(self, route: str) -> List[AdmissionController]:
+        chain = []
+        if route in self.routes:
+            chain.append(self.routes[route])
+        chain.append(self.gateway)
+        return chain
+
+    def priority(self, service: Optional[str]) -> int:
+        return self.priorities.get(service, max(self.priorities.values(), default=0))
+
+    async def enter(self, service: Optional[str], route: str) -> List[AdmissionController]:
+        """Acquire every controller in the chain, or none (raising Shed)."""
+        priority = self.priority(service)
+        acquired: List[AdmissionController] = []
+        try:
+            for controller in self.controllers(route):
+                await controller.acquire(priority)
+                acquired.append(controller)
+        except BaseException:
+            self.leave(acquired, None, True)
+            raise
+        return acquired
+
+    @staticmethod
+    def leave(acquired: List[AdmissionController], latency: Optional[float], ok: bool) -> None:
+        for controller in reversed(acquired):
+            controller.release(latency, ok)
+
+    def all(self) -> List[AdmissionController]:
+        return [self.gateway, *self.upstreams.values(), *self.routes.values()]
+
+
+def retry_after_header(error: Shed) -> Dict[str, str]:
+    return {"Retry-After": str(max(1, math.ceil(error.retry_after)))}
+
+
+admission = Admission()
+
+registry.gauge("gateway_admission_queue_depth", "Requests waiting for admission per limiter",
+               lambda: {(("limiter", c.name),): c.queued for c in admission.all()})
+registry.gauge("gateway_admission_inflight", "Admitted requests in flight per limiter",
+               lambda: {(("limiter", c.name),): c.inflight for c in admission.all()})
+registry.gauge("gateway_admission_limit", "Current concurrency limit per limiter",
+               lambda: {(("limiter", c.name),): c.limit for c in admission.all()})
@@ -0,0 +1,189 @@
+import asyncio
+import itertools
+import json
+import math
+import re
+import unicodedata
+from collections import Counter, deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from docmind_common.metrics import registry
+
+from ..config import settings
+from .cache import TTLCache
+from .pubsub import pubsub
+
+lookups_total = registry.counter(
+    "gateway_answer_cache_lookups_total",
+    "RAG answer cache lookups by outcome (hit, near_hit, miss)")
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s?!.]+$")
+
+
+def normalize_query(query: Any) -> str:
+    """Canonical form of a RAG query payload.
+
+    Strings are NFKC-normalized, case-folded, whitespace-collapsed and
+    stripped of trailing ?!. so trivially different phrasings share a key;
+    dicts are serialized with sorted keys.
+    """
+    def normalize(value: Any) -> Any:
+        if isinstance(value, str):
+            value = unicodedata.normalize("NFKC", value).casefold()
+            return _TRAILING_PUNCTUATION.sub("", _WHITESPACE.sub(" ", value).strip())
+        if isinstance(value, dict):
+            return {key: normalize(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [normalize(item) for item in value]
+        return value
+
+    return json.dumps(normalize(query), sort_keys=True, separators=(",", ":"))
+
+
+def trigram_embedding(text: str) -> Dict[str, float]:
+    """Sparse, L2-normalized character-trigram vector of ``text``."""
+    padded = f"  {text} "
+    counts = Counter(padded[i:i + 3] for i in range(len(padded) - 2))
+    norm = math.sqrt(sum(count * count for count in counts.values())) or 1.0
+    return {gram: count / norm for gram, count in counts.items()}
+
+
+def cosine(a: Dict[str, float], b: Dict[str, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(gram, 0.0) for gram, weight in a.items())
+
+
+class AnswerCache:
+    """RAG answers keyed by user, normalized query and document-set version.
+
+    The version is a per-user generation that changes whenever
+    Document-Service announces a new document-set version (or the gateway
+    proxies an upload/delete), so answers computed over an older set of
+    documents are never served again; they simply age out of the LRU.
+
+    With ``similarity`` > 0, a miss falls back to the most similar recent
+    query of the same user and version whose embedding cosine similarity
+    is at least ``similarity``.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, similarity: float = 0.0,
+                 recent_per_user: int = 32, embed=trigram_embedding):
+        self.similarity = similarity
+        self.recent_per_user = recent_per_user
+        self.embed = embed
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self._entries = TTLCache(maxsize, ttl)
+        self._generations = TTLCache(maxsize, ttl)
+        self._versions = TTLCache(maxsize, ttl)
+        self._recent = TTLCache(maxsize, ttl)
+        self._counter = itertools.count()
+        self._listener: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.near_hits + self.misses
+        return (self.hits + self.near_hits) / lookups if lookups else 0.0
+
+    def version(self, user_id: str) -> int:
+        generation = self._generations.peek(user_id)
+        if generation is None:
+            # Fresh and globally unique, so a forgotten version is never reused
+            generation = next(self._counter)
+        self._generations.set(user_id, generation)
+        return generation
+
+    def key(self, user_id: str, query: Any) -> Tuple[str, int, str]:
+        return user_id, self.version(user_id), normalize_query(query)
+
+    def get(self, key: Tuple[str, int, str]) -> Optional[Any]:
+        # get(), not peek(): a hit counts as a use, so eviction is LRU
+        answer = self._entries.get(key)
+        if answer is not None:
+            self.hits += 1
+            lookups_total.inc(outcome="hit")
+            return answer
+
+        if self.similarity > 0:
+            user_id, version, query = key
+            best, best_score = None, self.similarity
+            vector = self.embed(query)
+            for recent_vector, recent_key in self._recent.peek((user_id, version), ()):
+                score = cosine(vector, recent_vector)
+                if score >= best_score:
+                    best, best_score = recent_key, score
+            if best is not None:
+                answer = self._entries.get(best)
+                if answer is not None:
+                    self.near_hits += 1
+                    lookups_total.inc(outcome="near_hit")
+                    return answer
+
+        self.misses += 1
+        lookups_total.inc(outcome="miss")
+        return None
+
+    def set(self, key: Tuple[str, int, str], answer: Any) -> None:
+        self._entries.set(key, answer)
+        if self.similarity > 0:
+            user_id, version, query = key
+            recent: Optional[Deque] = self._recent.peek((user_id, version))
+            if recent is None:
+                recent = deque(maxlen=self.recent_per_user)
+            recent.append((self.embed(query), key))
+            self._recent.set((user_id, version), recent)
+
+    def docset_changed(self, user_id: str, version: Optional[int] = None) -> None:
+        """Move the user to a new version; ``version`` dedupes repeat announcements."""
+        if version is not None:
+            seen = self._versions.peek(user_id)
+            if seen is not None and version <= seen:
+                return
+            self._versions.set(user_id, version)
+        self._generations.set(user_id, next(self._counter))
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async for message in pubsub.subscribe(settings.DOCSET_VERSION_CHANNEL):
+                    try:
+                        event = json.loads(message)
+                        self.docset_changed(str(event["user_id"]), int(event["version"]))
+                    except (ValueError, KeyError, TypeError):
+                        continue
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Lost the channel; resubscribe after a short pause
+                await asyncio.sleep(1)
+
+    async def start(self) -> None:
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+
+answer_cache = AnswerCache(
+    settings.ANSWER_CACHE_MAX_SIZE,
+    settings.ANSWER_CACHE_TTL,
+    settings.ANSWER_CACHE_SIMILARITY,
+)
+
+registry.gauge("gateway_answer_cache_entries", "RAG answers currently cached",
+               lambda: len(answer_cache))
+registry.gauge("gateway_answer_cache_hit_ratio", "Share of RAG queries answered from the cache",
+               lambda: answer_cache.hit_rate)
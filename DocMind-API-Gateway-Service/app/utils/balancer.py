@@ -0,0 +1,287 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
+
+import httpx
+from docmind_common.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Upstream answers that count against an endpoint for passive health checking
+PASSIVE_FAILURE_STATUS = {502, 503, 504}
+
+endpoint_requests_total = registry.counter(
+    "gateway_upstream_endpoint_requests_total", "Requests sent to each upstream endpoint")
+ejections_total = registry.counter(
+    "gateway_upstream_endpoint_ejections_total", "Endpoints ejected after consecutive failures")
+
+
+class Endpoint:
+    """One replica of an upstream service and its own connection pool."""
+
+    def __init__(self, url: str, transport: httpx.AsyncBaseTransport):
+        self.url = httpx.URL(url)
+        self.host_header = self.url.netloc.decode("ascii")
+        # Mount point of the service on this replica, e.g. b"/docs"
+        self.prefix = self.url.raw_path.split(b"?")[0].rstrip(b"/")
+        self.transport = transport
+        self.outstanding = 0
+        self.failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+        # Result of the last active health check; unknown counts as healthy
+        self.healthy = True
+        self.retired = False
+
+    @property
+    def ejected(self) -> bool:
+        return time.monotonic() < self.ejected_until
+
+    @property
+    def available(self) -> bool:
+        return self.healthy and not self.ejected
+
+    def target(self, url: httpx.URL) -> httpx.URL:
+        """``url``, a path relative to the service, on this replica."""
+        return url.copy_with(scheme=self.url.scheme, host=self.url.host, port=self.url.port,
+                             raw_path=self.prefix + url.raw_path)
+
+    def as_dict(self) -> Dict:
+        return {
+            "url": str(self.url),
+            "healthy": self.healthy,
+            "ejected": self.ejected,
+            "outstanding": self.outstanding,
+        }
+
+
+class RoundRobin:
+    def __init__(self):
+        self._counter = itertools.count()
+
+    def pick(self, endpoints: List[Endpoint]) -> Endpoint:
+        return endpoints[next(self._counter) % len(endpoints)]
+
+
+class LeastOutstanding:
+    def pick(self, endpoints: List[Endpoint]) -> Endpoint:
+        fewest = min(endpoint.outstanding for endpoint in endpoints)
+        # Break ties randomly so idle replicas share the load
+        return random.choice([e for e in endpoints if e.outstanding == fewest])
+
+
+class PowerOfTwoChoices:
+    """Least outstanding of two random endpoints; O(1) and avoids herding."""
+
+    def pick(self, endpoints: List[Endpoint]) -> Endpoint:
+        if len(endpoints) == 1:
+            return endpoints[0]
+        first, second = random.sample(endpoints, 2)
+        return first if first.outstanding <= second.outstanding else second
+
+
+POLICIES = {
+    "round_robin": RoundRobin,
+    "least_outstanding": LeastOutstanding,
+    "p2c": PowerOfTwoChoices,
+}
+
+
+class _TrackedStream(httpx.AsyncByteStream):
+    """Response body that reports back once it has been closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, on_close: Callable[[], None]):
+        self._stream = stream
+        self._on_close: Optional[Callable[[], None]] = on_close
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._on_close is not None:
+                on_close, self._on_close = self._on_close, None
+                on_close()
+
+
+class BalancedTransport(httpx.AsyncBaseTransport):
+    """httpx transport that spreads requests over the replicas of one upstream.
+
+    Each request is routed to an endpoint chosen by ``policy`` among those
+    that passed their last active health check and are not ejected. An
+    endpoint is ejected for ``ejection_time`` (times the number of
+    back-to-back ejections, capped at ``max_ejection_time``) after
+    ``ejection_failures`` consecutive transport errors or 502/503/504s.
+    When no endpoint is available every endpoint is tried, so a wrong
+    health signal cannot take the whole service offline.
+
+    An endpoint counts as outstanding until its response body is closed,
+    which is what least-outstanding and power-of-two-choices balance on.
+    """
+
+    def __init__(self, service: str, urls: List[str],
+                 transport_factory: Callable[[], httpx.AsyncBaseTransport],
+                 policy: str = "p2c", ejection_failures: int = 3,
+                 ejection_time: float = 30.0, max_ejection_time: float = 300.0):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown load balancing policy '{policy}'")
+        if not urls:
+            raise ValueError(f"No endpoints configured for '{service}'")
+        self.service = service
+        self.policy = POLICIES[policy]()
+        self.ejection_failures = ejection_failures
+        self.ejection_time = ejection_time
+        self.max_ejection_time = max_ejection_time
+        self._transport_factory = transport_factory
+        self.endpoints = [Endpoint(url, transport_factory()) for url in urls]
+        self._closing: Set[asyncio.Task] = set()
+
+    def pick(self) -> Endpoint:
+        candidates = [endpoint for endpoint in self.endpoints if endpoint.available]
+        return self.policy.pick(candidates or self.endpoints)
+
+    def _record(self, endpoint: Endpoint, ok: bool) -> None:
+        if ok:
+            endpoint.failures = 0
+            endpoint.ejections = 0
+            return
+        endpoint.failures += 1
+        if endpoint.failures >= self.ejection_failures and not endpoint.ejected:
+            endpoint.ejections += 1
+            endpoint.failures = 0
+            endpoint.ejected_until = time.monotonic() + min(
+                self.max_ejection_time, self.ejection_time * endpoint.ejections)
+            ejections_total.inc(upstream=self.service, endpoint=endpoint.host_header)
+
+    def _release(self, endpoint: Endpoint) -> None:
+        endpoint.outstanding -= 1
+        if endpoint.retired and endpoint.outstanding == 0:
+            self._close_later(endpoint)
+
+    def _close_later(self, endpoint: Endpoint) -> None:
+        task = asyncio.create_task(endpoint.transport.aclose())
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        endpoint = self.pick()
+        request.url = endpoint.target(request.url)
+        request.headers["Host"] = endpoint.host_header
+        endpoint.outstanding += 1
+        endpoint_requests_total.inc(upstream=self.service, endpoint=endpoint.host_header)
+        try:
+            response = await endpoint.transport.handle_async_request(request)
+        except httpx.TransportError:
+            self._release(endpoint)
+            self._record(endpoint, ok=False)
+            raise
+        except BaseException:
+            # Cancelled (deadline, losing hedge): says nothing about the endpoint
+            self._release(endpoint)
+            raise
+        self._record(endpoint, ok=response.status_code not in PASSIVE_FAILURE_STATUS)
+        response.stream = _TrackedStream(response.stream, lambda: self._release(endpoint))
+        return response
+
+    async def probe(self, endpoint: Endpoint, path: str) -> int:
+        """Active health check of one endpoint, bypassing the balancer."""
+        response = await endpoint.transport.handle_async_request(
+            httpx.Request("GET", endpoint.target(httpx.URL(path))))
+        try:
+            await response.aread()
+        finally:
+            await response.aclose()
+        return response.status_code
+
+    def update(self, urls: List[str]) -> None:
+        """Swap in a new endpoint list, keeping the pools of unchanged endpoints.
+
+        Removed endpoints stop receiving requests at once and are closed
+        when their in-flight responses finish.
+        """
+        if not urls:
+            raise ValueError(f"No endpoints configured for '{self.service}'")
+        current = {str(endpoint.url): endpoint for endpoint in self.endpoints}
+        self.endpoints = [
+            current.pop(str(httpx.URL(url)), None) or Endpoint(url, self._transport_factory())
+            for url in urls
+        ]
+        for endpoint in current.values():
+            endpoint.retired = True
+            if endpoint.outstanding == 0:
+                self._close_later(endpoint)
+
+    async def aclose(self) -> None:
+        for endpoint in self.endpoints:
+            await endpoint.transport.aclose()
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+
+
+class EndpointsFile:
+    """Polls a JSON file of {"service": ["url", ...]} and applies changes.
+
+    Lets operators add or drain replicas without restarting the gateway;
+    services missing from the file keep their current endpoints.
+    """
+
+    def __init__(self, path: str, interval: float,
+                 apply: Callable[[Dict[str, List[str]]], Awaitable[None]]):
+        self.path = path
+        self.interval = interval
+        self.apply = apply
+        self._mtime: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def reload(self) -> bool:
+        """Apply the file if it changed since the last load."""
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+        with open(self.path) as f:
+            endpoints = json.load(f)
+        if not isinstance(endpoints, dict) or not all(
+                isinstance(urls, list) and all(isinstance(url, str) for url in urls)
+                for urls in endpoints.values()):
+            raise ValueError(f"{self.path} must map each service to a list of URLs")
+        self._mtime = mtime
+        await self.apply({service: list(urls) for service, urls in endpoints.items()})
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.reload()
+            except (ValueError, OSError) as e:
+                # Half-written or invalid file; keep the current endpoints
+                logger.warning(f"Not reloading {self.path}: {str(e)}")
+            except Exception:
+                logger.exception(f"Reloading {self.path} failed")
+
+    async def start(self) -> None:
+        if not self.path:
+            return
+        await self.reload()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
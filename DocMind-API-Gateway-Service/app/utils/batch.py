@@ -0,0 +1,115 @@
+import asyncio
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from docmind_common.metrics import registry
+from fastapi import Request
+from starlette.exceptions import HTTPException
+
+from ..config import settings
+
+sub_requests_total = registry.counter(
+    "gateway_batch_sub_requests_total", "Batch sub-requests by status class")
+
+# Request headers a sub-request may not set itself
+RESERVED_HEADERS = {"authorization", "content-length", "content-type", "host", "transfer-encoding"}
+# Routing state the parent request picked up that must not leak into a sub-request
+_ROUTING_KEYS = ("endpoint", "path_params", "route", "router")
+
+
+class SubRequest:
+    """One batch sub-request, run through the gateway's routes in-process.
+
+    It reuses the batch request's credentials, so its verify_token
+    dependency is answered from the token cache, and goes through the same
+    route handlers, caches and pooled upstream clients as a standalone
+    call. Middleware is not re-run.
+    """
+
+    def __init__(self, parent: Request, method: str, path: str,
+                 query: Optional[Dict[str, Any]] = None,
+                 headers: Optional[Dict[str, str]] = None,
+                 body: Any = None):
+        self.parent = parent
+        self.path = path
+        self.payload = b"" if body is None else json.dumps(body).encode()
+
+        raw_headers: List[Tuple[bytes, bytes]] = [
+            (name.lower().encode("latin-1"), str(value).encode("latin-1"))
+            for name, value in (headers or {}).items()
+            if name.lower() not in RESERVED_HEADERS
+        ]
+        for name in ("host", "authorization"):
+            if name in parent.headers:
+                raw_headers.append((name.encode(), parent.headers[name].encode("latin-1")))
+        if self.payload:
+            raw_headers.append((b"content-type", b"application/json"))
+        raw_headers.append((b"content-length", str(len(self.payload)).encode()))
+
+        # Inherit app, client, server and exception handlers from the batch request
+        self.scope = {key: value for key, value in parent.scope.items() if key not in _ROUTING_KEYS}
+        self.scope.update(
+            method=method.upper(),
+            path=path,
+            raw_path=path.encode(),
+            query_string=urlencode(query or {}, doseq=True).encode(),
+            headers=raw_headers,
+        )
+        self.request = Request(self.scope)
+
+    async def run(self) -> Tuple[int, Dict[str, str], bytes]:
+        finished = asyncio.Event()
+        status_code = 500
+        response_headers: Dict[str, str] = {}
+        chunks: List[bytes] = []
+        sent = False
+
+        async def receive() -> Dict:
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": self.payload, "more_body": False}
+            # Only report a disconnect once the response is complete
+            await finished.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message: Dict) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                response_headers.update(
+                    (name.decode("latin-1").lower(), value.decode("latin-1"))
+                    for name, value in message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    finished.set()
+
+        try:
+            await self.parent.app.router(self.scope, receive, send)
+        except HTTPException as e:
+            # Raised outside any route (e.g. no route matched)
+            status_code = e.status_code
+            response_headers = {"content-type": "application/json"}
+            chunks = [json.dumps({"detail": e.detail}).encode()]
+        finally:
+            finished.set()
+        sub_requests_total.inc(status=f"{status_code // 100}xx")
+        return status_code, response_headers, b"".join(chunks)
+
+
+def decode_body(headers: Dict[str, str], body: bytes) -> Any:
+    if not body:
+        return None
+    if headers.get("content-type", "").startswith("application/json"):
+        try:
+            return json.loads(body)
+        except ValueError:
+            pass
+    return body.decode("utf-8", errors="replace")
+
+
+def is_batchable(path: str) -> bool:
+    """Sub-requests may target any API route except the batch endpoint itself."""
+    return path.startswith(f"{settings.API_V1_PREFIX}/") and path != f"{settings.API_V1_PREFIX}/batch"
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import httpx
+
+from ..config import settings
+from .balancer import Endpoint
+from .http import get_balancer
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamHealth:
+    """Last active check of one upstream endpoint."""
+
+    def __init__(self, service: str, url: str):
+        self.service = service
+        self.url = url
+        self.status = "unknown"
+        self.latency_ms: Optional[float] = None
+        self.last_checked: Optional[datetime] = None
+        self.last_success: Optional[datetime] = None
+        self.error: Optional[str] = None
+
+    def as_dict(self) -> Dict:
+        return {
+            "url": self.url,
+            "status": self.status,
+            "latency_ms": self.latency_ms,
+            "last_checked": self.last_checked.isoformat() if self.last_checked else None,
+            "last_success": self.last_success.isoformat() if self.last_success else None,
+            "error": self.error,
+        }
+
+
+class HealthMonitor:
+    """Background-refreshed snapshot of upstream health.
+
+    Every interval each endpoint of every upstream is probed concurrently,
+    with its own deadline, so one hung replica cannot delay the others.
+    Failing endpoints are taken out of load balancing until they pass again.
+    Probes to /health are answered from the snapshot without touching the
+    network.
+    """
+
+    def __init__(self, interval: float, timeout: float):
+        self.interval = interval
+        self.timeout = timeout
+        self.upstreams: Dict[str, List[UpstreamHealth]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def _check(self, upstream: UpstreamHealth, endpoint: Endpoint) -> None:
+        start = time.perf_counter()
+        try:
+            status_code = await asyncio.wait_for(
+                get_balancer(upstream.service).probe(endpoint, "/health"), self.timeout)
+            upstream.status = "healthy" if status_code == 200 else "unhealthy"
+            upstream.error = None if status_code == 200 else f"HTTP {status_code}"
+        except asyncio.TimeoutError:
+            upstream.status = "unavailable"
+            upstream.error = f"timed out after {self.timeout}s"
+        except httpx.RequestError as e:
+            upstream.status = "unavailable"
+            upstream.error = str(e) or e.__class__.__name__
+        except Exception as e:
+            # Whatever went wrong, the endpoint didn't prove itself healthy
+            upstream.status = "unhealthy"
+            upstream.error = f"{e.__class__.__name__}: {e}"
+        upstream.latency_ms = round((time.perf_counter() - start) * 1000, 3)
+        upstream.last_checked = datetime.now()
+        if upstream.status == "healthy":
+            upstream.last_success = upstream.last_checked
+        endpoint.healthy = upstream.status == "healthy"
+
+    async def refresh(self) -> None:
+        checks = []
+        upstreams: Dict[str, List[UpstreamHealth]] = {}
+        known = {(u.service, u.url): u for group in self.upstreams.values() for u in group}
+        for service in settings.upstream_endpoints():
+            # Follow endpoint reloads; keep history for endpoints that stayed
+            for endpoint in get_balancer(service).endpoints:
+                url = str(endpoint.url)
+                upstream = known.get((service, url)) or UpstreamHealth(service, url)
+                upstreams.setdefault(service, []).append(upstream)
+                checks.append(self._check(upstream, endpoint))
+        await asyncio.gather(*checks)
+        self.upstreams = upstreams
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh()
+            except Exception:
+                # Keep refreshing; a dead task would serve this snapshot forever
+                logger.exception("Upstream health refresh failed")
+
+    async def start(self) -> None:
+        await self.refresh()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @staticmethod
+    def _status(upstreams: List[UpstreamHealth]) -> str:
+        healthy = sum(upstream.status == "healthy" for upstream in upstreams)
+        if healthy == len(upstreams):
+            return "healthy"
+        if healthy:
+            return "degraded"
+        return upstreams[0].status
+
+    def overall(self) -> str:
+        """The gateway's own status: healthy only if every upstream is."""
+        if all(status == "healthy" for status in self.summary().values()):
+            return "healthy"
+        return "degraded"
+
+    def summary(self) -> Dict[str, str]:
+        return {service: self._status(upstreams) for service, upstreams in self.upstreams.items()}
+
+    def details(self) -> Dict[str, Dict]:
+        return {
+            service: {
+                "status": self._status(upstreams),
+                "endpoints": [upstream.as_dict() for upstream in upstreams],
+            }
+            for service, upstreams in self.upstreams.items()
+        }
+
+
+health_monitor = HealthMonitor(settings.HEALTH_CHECK_INTERVAL, settings.HEALTH_CHECK_TIMEOUT)
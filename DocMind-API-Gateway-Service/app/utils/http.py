@@ -1,20 +1,361 @@
 import httpx
-from typing import Optional, Dict, Any
+from docmind_common.metrics import registry
+from functools import partial
+from fastapi import HTTPException, Request, status
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+from typing import AsyncIterator, Optional, Dict, Any, List, Tuple
+
+from ..config import settings
+from .balancer import BalancedTransport, EndpointsFile
+from .resilience import BREAKER_STATE_VALUES, UpstreamPolicy
+from .response_cache import etag_matches, lookups_total, response_cache
+from .singleflight import SingleFlight
+
+# Connection-scoped headers that must not be relayed between hops (RFC 9110 7.6.1)
+HOP_BY_HOP_HEADERS = {
+    b"connection", b"keep-alive", b"proxy-authenticate", b"proxy-authorization",
+    b"te", b"trailer", b"transfer-encoding", b"upgrade",
+}
+
+# One long-lived, pooled client per upstream service, keyed by service name.
+# Created by start_clients() in the app lifespan and closed at shutdown.
+_clients: Dict[str, httpx.AsyncClient] = {}
+# Breaker, retry and hedging state for each of those clients
+_policies: Dict[str, UpstreamPolicy] = {}
+# Replica selection and ejection behind each client
+_balancers: Dict[str, BalancedTransport] = {}
+# Identical in-flight GETs for the same principal share one upstream call
+_coalesced = SingleFlight("upstream")
+
+
+def _build_transport() -> httpx.AsyncHTTPTransport:
+    return httpx.AsyncHTTPTransport(
+        limits=httpx.Limits(
+            max_connections=settings.UPSTREAM_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.UPSTREAM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.UPSTREAM_KEEPALIVE_EXPIRY,
+        ),
+        http2=settings.UPSTREAM_HTTP2,
+    )
+
+
+def build_client(service: str, urls: List[str]) -> httpx.AsyncClient:
+    """Pooled client for an upstream, balancing over its replica ``urls``."""
+    _balancers[service] = BalancedTransport(
+        service,
+        urls,
+        _build_transport,
+        policy=settings.LOAD_BALANCER_POLICY,
+        ejection_failures=settings.EJECTION_FAILURES,
+        ejection_time=settings.EJECTION_TIME,
+        max_ejection_time=settings.EJECTION_MAX_TIME,
+    )
+    return httpx.AsyncClient(
+        # Only used to build absolute URLs; the transport picks the replica
+        # and puts the request under that replica's path prefix
+        base_url=httpx.URL(urls[0]).copy_with(raw_path=b"/"),
+        timeout=httpx.Timeout(
+            connect=settings.UPSTREAM_CONNECT_TIMEOUT,
+            read=settings.UPSTREAM_READ_TIMEOUT,
+            write=settings.UPSTREAM_WRITE_TIMEOUT,
+            pool=settings.UPSTREAM_POOL_TIMEOUT,
+        ),
+        transport=_balancers[service],
+    )
+
+
+async def start_clients() -> None:
+    for service, urls in settings.upstream_endpoints().items():
+        if service not in _clients:
+            _clients[service] = build_client(service, urls)
+            _policies[service] = UpstreamPolicy(service, _clients[service])
+    await _endpoints_file.start()
+
+
+async def close_clients() -> None:
+    await _endpoints_file.stop()
+    _policies.clear()
+    _balancers.clear()
+    while _clients:
+        _, client = _clients.popitem()
+        await client.aclose()
+
+
+async def reload_endpoints(endpoints: Dict[str, List[str]]) -> None:
+    """Point running upstream clients at new replica lists."""
+    for service, urls in endpoints.items():
+        if service in _balancers:
+            _balancers[service].update(urls)
+
+
+# Runtime endpoint changes from UPSTREAM_ENDPOINTS_FILE, if configured
+_endpoints_file = EndpointsFile(
+    settings.UPSTREAM_ENDPOINTS_FILE, settings.HEALTH_CHECK_INTERVAL, reload_endpoints)
+
+
+def get_client(service: str) -> httpx.AsyncClient:
+    try:
+        return _clients[service]
+    except KeyError:
+        raise RuntimeError(f"Upstream client for '{service}' is not started")
+
+
+def get_policy(service: str) -> UpstreamPolicy:
+    try:
+        return _policies[service]
+    except KeyError:
+        raise RuntimeError(f"Upstream client for '{service}' is not started")
+
+
+def get_balancer(service: str) -> BalancedTransport:
+    try:
+        return _balancers[service]
+    except KeyError:
+        raise RuntimeError(f"Upstream client for '{service}' is not started")
+
+
+async def relay_response(
+    service: str,
+    upstream_request: httpx.Request,
+    deadline: Optional[float] = None
+) -> StreamingResponse:
+    """Send a request upstream and relay status, headers and raw body bytes.
+
+    The body is passed through chunk by chunk without being decoded, so no
+    JSON parse/serialize round trip happens in the gateway.
+    """
+    upstream_response = await get_policy(service).send(
+        upstream_request, stream=True, deadline=deadline)
+    response = StreamingResponse(
+        upstream_response.aiter_raw(),
+        status_code=upstream_response.status_code,
+        background=BackgroundTask(upstream_response.aclose),
+    )
+    response.raw_headers = _relayed_headers(upstream_response)
+    return response
+
+
+def _relayed_headers(upstream_response: httpx.Response) -> List[Tuple[bytes, bytes]]:
+    return [
+        (name, value) for name, value in upstream_response.headers.raw
+        if name.lower() not in HOP_BY_HOP_HEADERS
+    ]
+
+
+async def fetch_buffered(
+    service: str,
+    upstream_request: httpx.Request,
+    deadline: Optional[float]
+) -> Tuple[int, List[Tuple[bytes, bytes]], bytes]:
+    upstream_response = await get_policy(service).send(
+        upstream_request, stream=True, deadline=deadline)
+    try:
+        # Raw bytes, so Content-Encoding stays valid for every caller
+        body = b"".join([chunk async for chunk in upstream_response.aiter_raw()])
+    finally:
+        await upstream_response.aclose()
+    return upstream_response.status_code, _relayed_headers(upstream_response), body
+
+
+async def coalesced_response(
+    service: str,
+    upstream_request: httpx.Request,
+    principal: str,
+    deadline: Optional[float] = None
+) -> Response:
+    """Relay a GET, sharing one upstream call among identical concurrent requests.
+
+    Requests are identical when method, URL (with query params) and the
+    authenticated principal match. Each caller gets its own Response built
+    from the shared status, headers and body.
+    """
+    key = (service, upstream_request.method, str(upstream_request.url), principal)
+    status_code, raw_headers, body = await _coalesced.do(
+        key, lambda: fetch_buffered(service, upstream_request, deadline))
+    return buffered_response(status_code, raw_headers, body)
+
+
+def buffered_response(status_code: int, raw_headers: List[Tuple[bytes, bytes]], body: bytes) -> Response:
+    response = Response(content=body, status_code=status_code)
+    response.raw_headers = [
+        (name, value) for name, value in raw_headers if name.lower() != b"content-length"
+    ] + [(b"content-length", str(len(body)).encode())]
+    return response
+
+
+async def cached_proxy_request(
+    service: str,
+    path: str,
+    request: Request,
+    principal: str,
+    params: Optional[Dict] = None,
+    headers: Optional[Dict] = None,
+    deadline: Optional[float] = None
+) -> Response:
+    """GET through the per-principal response cache.
+
+    Fresh entries are served from memory; stale ones are revalidated
+    upstream with If-None-Match, so an unchanged resource costs a 304 and
+    no body. The client's own If-None-Match is answered locally.
+    """
+    upstream_request = get_client(service).build_request(
+        "GET", path, params=params, headers=headers)
+    url = str(upstream_request.url)
+    entry = response_cache.get(principal, url)
+
+    if entry is not None and entry.is_fresh():
+        lookups_total.inc(outcome="hit")
+    else:
+        if entry is not None and entry.etag:
+            upstream_request.headers["If-None-Match"] = entry.etag
+        key = (service, "GET", url, principal, upstream_request.headers.get("If-None-Match"))
+        fetch = partial(fetch_buffered, service, upstream_request, deadline)
+        if settings.SINGLE_FLIGHT_ENABLED:
+            status_code, raw_headers, body = await _coalesced.do(key, fetch)
+        else:
+            status_code, raw_headers, body = await fetch()
+
+        if status_code == 304 and entry is not None:
+            lookups_total.inc(outcome="revalidated")
+            entry = response_cache.refresh(principal, url, entry)
+        elif status_code == 200:
+            lookups_total.inc(outcome="miss")
+            entry = response_cache.store(principal, url, status_code, raw_headers, body)
+        else:
+            # Errors are relayed but never cached
+            return buffered_response(status_code, raw_headers, body)
+
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers={"ETag": entry.etag, "Cache-Control": "private, no-cache"})
+    return buffered_response(entry.status_code, entry.raw_headers, entry.body)
+
+
+async def proxy_request(
+    service: str,
+    path: str,
+    method: str = "GET",
+    params: Optional[Dict] = None,
+    json: Optional[Dict] = None,
+    headers: Optional[Dict] = None,
+    deadline: Optional[float] = None,
+    principal: Optional[str] = None
+) -> Response:
+    """Proxy a request upstream, streaming the response back.
+
+    Passing the authenticated ``principal`` makes concurrent identical GETs
+    for that principal share a single upstream call.
+    """
+    upstream_request = get_client(service).build_request(
+        method=method,
+        url=path,
+        params=params,
+        json=json,
+        headers=headers
+    )
+    if principal is not None and method in ("GET", "HEAD") and settings.SINGLE_FLIGHT_ENABLED:
+        return await coalesced_response(service, upstream_request, principal, deadline)
+    return await relay_response(service, upstream_request, deadline)
 
 
 async def forward_request(
-    url: str,
+    service: str,
+    path: str,
     method: str = "GET",
     params: Optional[Dict] = None,
     json: Optional[Dict] = None,
-    headers: Optional[Dict] = None
+    headers: Optional[Dict] = None,
+    deadline: Optional[float] = None
 ) -> Dict[str, Any]:
-    async with httpx.AsyncClient() as client:
-        response = await client.request(
-            method=method,
-            url=url,
-            params=params,
-            json=json,
-            headers=headers
+    upstream_request = get_client(service).build_request(
+        method=method,
+        url=path,
+        params=params,
+        json=json,
+        headers=headers
+    )
+    response = await get_policy(service).send(upstream_request, deadline=deadline)
+    return response.json()
+
+
+async def _limited_body(request: Request, max_size: int) -> AsyncIterator[bytes]:
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > max_size:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail="Request body too large"
+            )
+        yield chunk
+
+
+def _content_length(request: Request) -> Optional[int]:
+    value = request.headers.get("content-length")
+    if value is None:
+        return None
+    try:
+        length = int(value)
+    except ValueError:
+        length = -1
+    if length < 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid Content-Length"
+        )
+    return length
+
+
+async def forward_upload(
+    service: str,
+    path: str,
+    request: Request,
+    headers: Optional[Dict] = None,
+    max_size: Optional[int] = None,
+    deadline: Optional[float] = None
+) -> StreamingResponse:
+    """Stream the incoming request body upstream chunk by chunk.
+
+    Only one chunk is held in memory at a time, so memory per upload stays
+    flat regardless of the file size.
+    """
+    max_size = settings.MAX_UPLOAD_SIZE if max_size is None else max_size
+    content_length = _content_length(request)
+    if content_length is not None and content_length > max_size:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="Request body too large"
         )
-        return response.json()
+
+    upstream_headers = {
+        name: request.headers[name]
+        for name in ("content-type", "content-length", "authorization")
+        if name in request.headers
+    }
+    upstream_headers.update(headers or {})
+
+    upstream_request = get_client(service).build_request(
+        method=request.method,
+        url=path,
+        content=_limited_body(request, max_size),
+        headers=upstream_headers
+    )
+    return await relay_response(service, upstream_request, deadline)
+
+
+registry.gauge(
+    "gateway_upstream_breaker_state",
+    "Circuit breaker state per upstream (0 closed, 1 half-open, 2 open)",
+    lambda: {(("upstream", service),): BREAKER_STATE_VALUES[policy.breaker.state]
+             for service, policy in _policies.items()})
+
+registry.gauge(
+    "gateway_upstream_endpoint_outstanding",
+    "In-flight requests per upstream endpoint",
+    lambda: {(("endpoint", endpoint.host_header), ("upstream", service)): endpoint.outstanding
+             for service, balancer in _balancers.items() for endpoint in balancer.endpoints})
+registry.gauge(
+    "gateway_upstream_endpoint_available",
+    "Whether an upstream endpoint is eligible for traffic (1) or not (0)",
+    lambda: {(("endpoint", endpoint.host_header), ("upstream", service)): int(endpoint.available)
+             for service, balancer in _balancers.items() for endpoint in balancer.endpoints})
@@ -0,0 +1,119 @@
+import asyncio
+import time
+from typing import Dict, Optional
+
+import httpx
+import jwt
+from docmind_common.metrics import registry
+from fastapi import HTTPException
+
+from ..config import settings
+from .http import get_client, get_policy
+
+verifications_total = registry.counter(
+    "gateway_jwt_local_verifications_total", "Tokens verified locally against the JWKS, by outcome")
+refreshes_total = registry.counter(
+    "gateway_jwks_refreshes_total", "JWKS fetches from the auth service, by outcome")
+
+
+class UnknownKey(Exception):
+    """The token names a key (or algorithm) the current JWKS does not have."""
+
+
+class JWKSVerifier:
+    """Verifies auth-service tokens locally with its published signing keys.
+
+    The JWKS is fetched at startup and refreshed every ``refresh_interval``
+    seconds in the background. A token signed with a key we have not seen
+    yet (just rotated in) triggers one early refresh, at most once per
+    ``min_refresh_interval``, before it is rejected.
+    """
+
+    def __init__(self, path: str, refresh_interval: float, min_refresh_interval: float = 10.0,
+                 leeway: float = 0.0):
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self.leeway = leeway
+        self.keys: Dict[str, jwt.PyJWK] = {}
+        self._last_refresh = 0.0
+        self._refreshing: Optional[asyncio.Task] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _fetch(self) -> None:
+        self._last_refresh = time.monotonic()
+        try:
+            # Through the auth upstream's breaker, retries and deadline
+            request = get_client("auth").build_request("GET", self.path)
+            response = await get_policy("auth").send(request)
+            response.raise_for_status()
+            jwk_set = jwt.PyJWKSet.from_dict(response.json())
+        except (HTTPException, httpx.HTTPError, ValueError, jwt.PyJWTError):
+            # Keep verifying with the keys we already have
+            refreshes_total.inc(outcome="error")
+            return
+        self.keys = {key.key_id: key for key in jwk_set.keys if key.key_id}
+        refreshes_total.inc(outcome="ok")
+
+    async def refresh(self) -> None:
+        # Concurrent callers share one fetch
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.create_task(self._fetch())
+        await asyncio.shield(self._refreshing)
+
+    def _decode(self, token: str) -> Dict:
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.DecodeError:
+            # Not a JWT we could check; let the caller decide
+            raise UnknownKey(None)
+        key = self.keys.get(header.get("kid"))
+        if key is None or header.get("alg") != key.algorithm_name:
+            raise UnknownKey(header.get("kid"))
+        return jwt.decode(token, key.key, algorithms=[key.algorithm_name],
+                          leeway=self.leeway, options={"require": ["exp", "sub"]})
+
+    async def verify(self, token: str) -> Dict:
+        """Return the token's claims; raises jwt.PyJWTError or UnknownKey."""
+        try:
+            try:
+                claims = self._decode(token)
+            except UnknownKey:
+                if time.monotonic() - self._last_refresh < self.min_refresh_interval:
+                    raise
+                await self.refresh()
+                claims = self._decode(token)
+        except UnknownKey:
+            verifications_total.inc(outcome="unknown_key")
+            raise
+        except jwt.PyJWTError:
+            verifications_total.inc(outcome="invalid")
+            raise
+        verifications_total.inc(outcome="ok")
+        return claims
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await self.refresh()
+
+    async def start(self) -> None:
+        await self.refresh()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+jwks_verifier = JWKSVerifier(
+    settings.JWKS_PATH,
+    settings.JWKS_REFRESH_INTERVAL,
+    leeway=settings.JWT_LEEWAY,
+)
@@ -0,0 +1,63 @@
+import asyncio
+from typing import AsyncIterator, Dict, Set
+
+from ..config import settings
+
+
+class LocalPubSub:
+    """In-process stand-in for Redis pub/sub, used when REDIS_URL is unset."""
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    async def publish(self, channel: str, message: str) -> int:
+        queues = self._subscribers.get(channel, set())
+        for queue in queues:
+            queue.put_nowait(message)
+        return len(queues)
+
+    async def subscribe(self, channel: str) -> AsyncIterator[str]:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(channel, set()).add(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self._subscribers[channel].discard(queue)
+
+    async def close(self) -> None:
+        self._subscribers.clear()
+
+
+class RedisPubSub:
+    def __init__(self, url: str):
+        # redis is optional for the gateway; only needed when REDIS_URL is set
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url, decode_responses=True)
+
+    async def publish(self, channel: str, message: str) -> int:
+        return await self._redis.publish(channel, message)
+
+    async def subscribe(self, channel: str) -> AsyncIterator[str]:
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(channel)
+        try:
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    yield message["data"]
+        finally:
+            await pubsub.unsubscribe(channel)
+            await pubsub.aclose()
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+def create_pubsub():
+    if settings.REDIS_URL:
+        return RedisPubSub(settings.REDIS_URL)
+    return LocalPubSub()
+
+
+pubsub = create_pubsub()
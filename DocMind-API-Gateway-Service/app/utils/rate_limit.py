@@ -0,0 +1,253 @@
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from ..config import settings
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_after: float
+    retry_after: float
+
+
+class TokenBucket:
+    """Bucket of ``limit`` tokens refilled continuously over ``window`` seconds.
+
+    State is ``[tokens, last_refill]``; each hit is O(1).
+    """
+
+    name = "token_bucket"
+
+    # KEYS[1] = bucket hash, ARGV = limit, window. Uses the Redis clock so
+    # replicas with skewed clocks still agree.
+    lua = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local rate = limit / window
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or limit
+local ts = tonumber(state[2]) or now
+tokens = math.min(limit, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(window * 1000))
+return {allowed, math.floor(tokens), tostring((limit - tokens) / rate), tostring(retry)}
+"""
+
+    def initial_state(self, limit: int, now: float) -> List[float]:
+        return [float(limit), now]
+
+    def hit(self, state: List[float], limit: int, window: float, now: float) -> RateLimitResult:
+        rate = limit / window
+        tokens = min(limit, state[0] + max(0.0, now - state[1]) * rate)
+        state[1] = now
+        if tokens >= 1:
+            state[0] = tokens - 1
+            return RateLimitResult(True, limit, int(state[0]), (limit - state[0]) / rate, 0.0)
+        state[0] = tokens
+        return RateLimitResult(False, limit, 0, (limit - tokens) / rate, (1 - tokens) / rate)
+
+
+class SlidingWindowCounter:
+    """Fixed-window counters blended by overlap with the previous window.
+
+    State is ``[window_index, current_count, previous_count]``; each hit is
+    O(1), unlike keeping a timestamp per request.
+    """
+
+    name = "sliding_window"
+
+    lua = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local idx = math.floor(now / window)
+local state = redis.call('HMGET', KEYS[1], 'idx', 'cur', 'prev')
+local cur_idx = tonumber(state[1]) or idx
+local cur = tonumber(state[2]) or 0
+local prev = tonumber(state[3]) or 0
+if idx == cur_idx + 1 then
+    prev = cur
+    cur = 0
+elseif idx ~= cur_idx then
+    prev = 0
+    cur = 0
+end
+local elapsed = now - idx * window
+local estimated = prev * (1 - elapsed / window) + cur
+local allowed = 0
+local retry = 0
+if estimated + 1 <= limit then
+    cur = cur + 1
+    estimated = estimated + 1
+    allowed = 1
+elseif cur + 1 <= limit and prev > 0 then
+    retry = window * (1 - (limit - 1 - cur) / prev) - elapsed
+else
+    retry = window - elapsed
+end
+redis.call('HSET', KEYS[1], 'idx', idx, 'cur', cur, 'prev', prev)
+redis.call('PEXPIRE', KEYS[1], math.ceil(window * 2000))
+return {allowed, math.max(0, math.floor(limit - estimated)), tostring(window - elapsed), tostring(retry)}
+"""
+
+    def initial_state(self, limit: int, now: float) -> List[float]:
+        return [0.0, 0.0, 0.0]
+
+    def hit(self, state: List[float], limit: int, window: float, now: float) -> RateLimitResult:
+        idx = math.floor(now / window)
+        if idx == state[0] + 1:
+            state[1], state[2] = 0.0, state[1]
+        elif idx != state[0]:
+            state[1], state[2] = 0.0, 0.0
+        state[0] = idx
+
+        elapsed = now - idx * window
+        reset_after = window - elapsed
+        estimated = state[2] * (1 - elapsed / window) + state[1]
+        if estimated + 1 <= limit:
+            state[1] += 1
+            return RateLimitResult(True, limit, max(0, math.floor(limit - estimated - 1)), reset_after, 0.0)
+
+        if state[1] + 1 <= limit and state[2] > 0:
+            # Wait until the previous window's share decays enough
+            retry_after = window * (1 - (limit - 1 - state[1]) / state[2]) - elapsed
+        else:
+            retry_after = reset_after
+        return RateLimitResult(False, limit, 0, reset_after, max(0.0, retry_after))
+
+
+ALGORITHMS = {
+    TokenBucket.name: TokenBucket,
+    SlidingWindowCounter.name: SlidingWindowCounter,
+}
+
+
+class MemoryBackend:
+    """Per-process limiter state, bounded to ``max_keys`` with LRU eviction."""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._state: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._state)
+
+    async def hit(self, algorithm, key: str, limit: int, window: float) -> RateLimitResult:
+        now = time.monotonic()
+        state = self._state.get(key)
+        if state is None:
+            state = self._state[key] = algorithm.initial_state(limit, now)
+            if len(self._state) > self.max_keys:
+                self._state.popitem(last=False)
+        else:
+            self._state.move_to_end(key)
+        return algorithm.hit(state, limit, window, now)
+
+    async def close(self) -> None:
+        self._state.clear()
+
+
+class RedisBackend:
+    """Limiter state shared by every gateway replica, updated by atomic Lua scripts."""
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        # redis is optional for the gateway; only needed for this backend
+        import redis.asyncio as redis
+
+        self.prefix = prefix
+        self._redis = redis.from_url(url)
+        self._scripts = {}
+
+    async def hit(self, algorithm, key: str, limit: int, window: float) -> RateLimitResult:
+        script = self._scripts.get(algorithm.name)
+        if script is None:
+            script = self._scripts[algorithm.name] = self._redis.register_script(algorithm.lua)
+        allowed, remaining, reset_after, retry_after = await script(
+            keys=[f"{self.prefix}{algorithm.name}:{key}"], args=[limit, window])
+        return RateLimitResult(bool(allowed), limit, int(remaining),
+                               float(reset_after), float(retry_after))
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+class RateLimitRule(NamedTuple):
+    scope: str  # "ip", "user" or "route"
+    limit: int
+    window: float
+
+
+def parse_rules(spec: str) -> List[RateLimitRule]:
+    """Parse ``"ip:100/60,user:1000/3600"`` into rules (``scope:limit/window``)."""
+    rules = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        scope, _, quota = item.partition(":")
+        limit, _, window = quota.partition("/")
+        if scope not in ("ip", "user", "route"):
+            raise ValueError(f"Unknown rate limit scope '{scope}'")
+        rules.append(RateLimitRule(scope, int(limit), float(window)))
+    return rules
+
+
+class RateLimiter:
+    def __init__(self, rules: List[RateLimitRule], algorithm: str = "token_bucket", backend=None):
+        self.rules = rules
+        self.algorithm = ALGORITHMS[algorithm]()
+        self.backend = backend or MemoryBackend(settings.RATE_LIMIT_MAX_KEYS)
+
+    async def hit(self, keys: Dict[str, str]) -> Tuple[RateLimitResult, Optional[RateLimitRule]]:
+        """Apply every rule whose scope has a key; return the most restrictive outcome."""
+        outcome: Optional[RateLimitResult] = None
+        outcome_rule: Optional[RateLimitRule] = None
+        for rule in self.rules:
+            key = keys.get(rule.scope)
+            if key is None:
+                continue
+            result = await self.backend.hit(
+                self.algorithm, f"{rule.scope}:{rule.limit}/{rule.window}:{key}", rule.limit, rule.window)
+            if (outcome is None
+                    or (outcome.allowed and not result.allowed)
+                    or (outcome.allowed == result.allowed and result.remaining < outcome.remaining)):
+                outcome, outcome_rule = result, rule
+        if outcome is None:
+            return RateLimitResult(True, 0, 0, 0.0, 0.0), None
+        return outcome, outcome_rule
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+
+def rate_limit_headers(result: RateLimitResult, rule: Optional[RateLimitRule]) -> Dict[str, str]:
+    if rule is None:
+        return {}
+    headers = {
+        "RateLimit-Limit": str(result.limit),
+        "RateLimit-Remaining": str(result.remaining),
+        "RateLimit-Reset": str(math.ceil(result.reset_after)),
+        "RateLimit-Policy": f"{rule.limit};w={rule.window:g}",
+    }
+    if not result.allowed:
+        headers["Retry-After"] = str(max(1, math.ceil(result.retry_after)))
+    return headers
+
+
+def create_rate_limiter() -> RateLimiter:
+    backend = None
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        backend = RedisBackend(settings.REDIS_URL)
+    return RateLimiter(parse_rules(settings.RATE_LIMIT_RULES), settings.RATE_LIMIT_ALGORITHM, backend)
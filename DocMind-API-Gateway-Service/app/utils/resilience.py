@@ -0,0 +1,304 @@
+import asyncio
+import math
+import random
+import time
+from collections import deque
+from typing import Dict, Optional
+
+import httpx
+from docmind_common.metrics import registry
+from fastapi import HTTPException, status
+
+from ..config import settings
+from .admission import Shed, admission
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRYABLE_STATUS = {502, 503, 504}
+# Errors raised before the request reached the upstream; safe to retry any method
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+BREAKER_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+retries_total = registry.counter(
+    "gateway_upstream_retries_total", "Upstream request retries")
+hedges_total = registry.counter(
+    "gateway_upstream_hedges_total", "Hedged requests sent to upstreams")
+failures_total = registry.counter(
+    "gateway_upstream_failures_total", "Failed upstream attempts (transport errors, timeouts, 502/503/504)")
+rejections_total = registry.counter(
+    "gateway_upstream_breaker_rejections_total", "Requests rejected by an open circuit breaker")
+
+
+class CircuitBreaker:
+    """Closed -> open after ``failure_threshold`` consecutive failures.
+
+    After ``recovery_timeout`` seconds the breaker goes half-open and lets
+    ``half_open_max_calls`` trial requests through; a success closes it and
+    a failure opens it again. A trial that ends with neither (cancelled,
+    or an unrelated error) gives its slot back with release(); should one
+    never report at all, the trial slots are handed out afresh after
+    another ``recovery_timeout``.
+    """
+
+    def __init__(self, failure_threshold: int, recovery_timeout: float, half_open_max_calls: int):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._half_open_calls = 0
+        self._half_open_at = 0.0
+
+    def _start_trials(self, now: float) -> None:
+        self.state = HALF_OPEN
+        self._half_open_calls = 0
+        self._half_open_at = now
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        if self.state == OPEN:
+            if now - self.opened_at < self.recovery_timeout:
+                return False
+            self._start_trials(now)
+        if self.state == HALF_OPEN:
+            if self._half_open_calls >= self.half_open_max_calls:
+                if now - self._half_open_at < self.recovery_timeout:
+                    return False
+                # Trials that never reported back; don't wait on them forever
+                self._start_trials(now)
+            self._half_open_calls += 1
+        return True
+
+    def release(self) -> None:
+        """End a call allowed through that says nothing about the upstream's health."""
+        if self.state == HALF_OPEN and self._half_open_calls > 0:
+            self._half_open_calls -= 1
+
+    def retry_after(self) -> float:
+        return max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.state = CLOSED
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+
+class LatencyWindow:
+    """Recent upstream latencies, with a percentile refreshed every few samples."""
+
+    def __init__(self, size: int = 512, refresh_every: int = 32):
+        self._samples = deque(maxlen=size)
+        self._refresh_every = refresh_every
+        self._since_refresh = 0
+        self._percentiles: Dict[float, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+        self._since_refresh += 1
+        if self._since_refresh >= self._refresh_every:
+            self._percentiles.clear()
+            self._since_refresh = 0
+
+    def percentile(self, p: float) -> float:
+        value = self._percentiles.get(p)
+        if value is None:
+            ordered = sorted(self._samples)
+            value = ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+            self._percentiles[p] = value
+        return value
+
+
+def _is_replayable(request: httpx.Request) -> bool:
+    try:
+        request.content
+    except httpx.RequestNotRead:
+        # Streaming body (e.g. an upload); it can only be sent once
+        return False
+    return True
+
+
+class UpstreamPolicy:
+    """Circuit breaker, retries, hedging and deadlines for one upstream."""
+
+    def __init__(self, service: str, client: httpx.AsyncClient):
+        self.service = service
+        self.client = client
+        self.breaker = CircuitBreaker(
+            settings.BREAKER_FAILURE_THRESHOLD,
+            settings.BREAKER_RECOVERY_TIMEOUT,
+            settings.BREAKER_HALF_OPEN_MAX_CALLS,
+        )
+        self.latency = LatencyWindow()
+        self.default_deadline = settings.upstream_deadlines().get(service)
+        # Concurrency limit for this upstream, if admission control has one
+        self.admission = admission.upstreams.get(service) if settings.ADMISSION_ENABLED else None
+        self.priority = admission.priority(service)
+
+    async def _attempt(self, request: httpx.Request, stream: bool,
+                       remaining: Optional[float]) -> httpx.Response:
+        start = time.perf_counter()
+        if remaining is None:
+            response = await self.client.send(request, stream=stream)
+        else:
+            response = await asyncio.wait_for(self.client.send(request, stream=stream), remaining)
+        self.latency.record(time.perf_counter() - start)
+        return response
+
+    async def _hedged(self, request: httpx.Request, stream: bool,
+                      remaining: Optional[float]) -> httpx.Response:
+        """Send a second copy once the first outlives the latency percentile; first good answer wins."""
+        delay = self.latency.percentile(settings.HEDGE_PERCENTILE)
+        tasks = [asyncio.create_task(self._attempt(request, stream, remaining))]
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done and (remaining is None or remaining > delay):
+            hedges_total.inc(upstream=self.service)
+            hedge_remaining = None if remaining is None else remaining - delay
+            tasks.append(asyncio.create_task(self._attempt(request, stream, hedge_remaining)))
+
+        pending = set(tasks)
+        winner: Optional[httpx.Response] = None
+        fallback: Optional[httpx.Response] = None
+        error: Optional[BaseException] = None
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                    elif winner is None and task.result().status_code not in RETRYABLE_STATUS:
+                        winner = task.result()
+                    else:
+                        if fallback is not None:
+                            await fallback.aclose()
+                        fallback = task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            for task in pending:
+                try:
+                    await (await task).aclose()
+                except (asyncio.CancelledError, Exception):
+                    pass
+
+        if winner is not None:
+            if fallback is not None:
+                await fallback.aclose()
+            return winner
+        if fallback is not None:
+            return fallback
+        raise error
+
+    def _unavailable(self, detail: str, retry_after: float) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+
+    async def send(self, request: httpx.Request, stream: bool = False,
+                   deadline: Optional[float] = None) -> httpx.Response:
+        """Send ``request`` within this upstream's admission limit, if it has one.
+
+        The limit is fed the time to response headers and whether the
+        upstream answered without a 5xx; a streamed upload's time says
+        nothing about load and only counts for the outcome.
+        """
+        if self.admission is None:
+            return await self._send(request, stream, deadline)
+        try:
+            await self.admission.acquire(self.priority)
+        except Shed as e:
+            raise self._unavailable(f"Gateway overloaded ({e.limiter} {e.reason}), retry later", e.retry_after)
+
+        start = time.perf_counter()
+        timed = _is_replayable(request)
+        try:
+            response = await self._send(request, stream, deadline)
+        except HTTPException:
+            # Circuit open, deadline exceeded or upstream unreachable
+            self.admission.release(time.perf_counter() - start if timed else None, False)
+            raise
+        except BaseException:
+            # Cancelled: says nothing about the upstream
+            self.admission.release(None, True)
+            raise
+        self.admission.release(time.perf_counter() - start if timed else None,
+                               response.status_code < 500)
+        return response
+
+    async def _send(self, request: httpx.Request, stream: bool,
+                    deadline: Optional[float]) -> httpx.Response:
+        deadline = self.default_deadline if deadline is None else deadline
+        expires_at = time.monotonic() + deadline if deadline else None
+        idempotent = (request.method in IDEMPOTENT_METHODS
+                      or "idempotency-key" in request.headers)
+        replayable = _is_replayable(request)
+        hedge = (settings.HEDGE_ENABLED and request.method == "GET"
+                 and len(self.latency) >= settings.HEDGE_MIN_SAMPLES)
+
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                rejections_total.inc(upstream=self.service)
+                raise self._unavailable(
+                    f"{self.service} service unavailable (circuit open)", self.breaker.retry_after())
+
+            remaining = None
+            if expires_at is not None:
+                remaining = expires_at - time.monotonic()
+                if remaining <= 0:
+                    raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                                        detail=f"{self.service} service deadline exceeded")
+                # Tell the upstream how long we are still willing to wait
+                request.headers["X-Request-Timeout"] = f"{remaining:.3f}"
+
+            response: Optional[httpx.Response] = None
+            error: Optional[Exception] = None
+            try:
+                if hedge:
+                    response = await self._hedged(request, stream, remaining)
+                else:
+                    response = await self._attempt(request, stream, remaining)
+            except (httpx.TransportError, asyncio.TimeoutError) as e:
+                error = e
+            except BaseException:
+                # Cancelled (deadline, lost hedge, client gone) or an error
+                # that isn't the upstream's: no verdict, but a half-open
+                # trial slot must not stay taken
+                self.breaker.release()
+                raise
+            if response is not None and response.status_code not in RETRYABLE_STATUS:
+                self.breaker.record_success()
+                return response
+
+            self.breaker.record_failure()
+            failures_total.inc(upstream=self.service)
+            retryable = replayable and (idempotent or isinstance(error, NOT_SENT_ERRORS))
+            backoff = random.uniform(0, min(settings.RETRY_BACKOFF_MAX,
+                                            settings.RETRY_BACKOFF_BASE * 2 ** attempt))
+            out_of_time = expires_at is not None and time.monotonic() + backoff >= expires_at
+            if not retryable or attempt >= settings.RETRY_MAX_ATTEMPTS or out_of_time:
+                if response is not None:
+                    # Relay the upstream's own 5xx rather than masking it
+                    return response
+                if isinstance(error, (asyncio.TimeoutError, httpx.TimeoutException)):
+                    raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                                        detail=f"{self.service} service timed out")
+                raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY,
+                                    detail=f"{self.service} service unreachable")
+
+            if response is not None:
+                await response.aclose()
+            attempt += 1
+            retries_total.inc(upstream=self.service)
+            await asyncio.sleep(backoff)
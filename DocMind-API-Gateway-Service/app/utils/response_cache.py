@@ -0,0 +1,82 @@
+import itertools
+import time
+from typing import List, NamedTuple, Optional, Tuple
+
+from docmind_common.metrics import registry
+
+from ..config import settings
+from .cache import TTLCache
+
+lookups_total = registry.counter(
+    "gateway_response_cache_lookups_total",
+    "Response cache lookups by outcome (hit, revalidated, miss)")
+
+
+class CachedResponse(NamedTuple):
+    status_code: int
+    raw_headers: List[Tuple[bytes, bytes]]
+    body: bytes
+    etag: Optional[str]
+    fresh_until: float
+
+    def is_fresh(self) -> bool:
+        return time.monotonic() < self.fresh_until
+
+
+class ResponseCache:
+    """Per-principal cache of upstream GET responses.
+
+    Entries are served without an upstream call for ``fresh_ttl`` seconds,
+    then kept until ``stale_ttl`` so they can be revalidated with
+    If-None-Match. invalidate() bumps the principal's generation, which
+    orphans all of its entries in O(1); they age out of the LRU.
+    """
+
+    def __init__(self, maxsize: int, fresh_ttl: float, stale_ttl: float):
+        self.fresh_ttl = fresh_ttl
+        self._entries = TTLCache(maxsize, max(fresh_ttl, stale_ttl))
+        self._generations = TTLCache(maxsize, max(fresh_ttl, stale_ttl))
+        # Globally unique generations, so a forgotten one can never be reused
+        self._counter = itertools.count()
+
+    def _generation(self, principal: str) -> int:
+        generation = self._generations.peek(principal)
+        if generation is None:
+            generation = next(self._counter)
+        # Touch on every use so active principals keep their generation
+        self._generations.set(principal, generation)
+        return generation
+
+    def get(self, principal: str, url: str) -> Optional[CachedResponse]:
+        return self._entries.peek((principal, self._generation(principal), url))
+
+    def store(self, principal: str, url: str, status_code: int,
+              raw_headers: List[Tuple[bytes, bytes]], body: bytes) -> CachedResponse:
+        etag = next((value.decode() for name, value in raw_headers if name.lower() == b"etag"), None)
+        entry = CachedResponse(status_code, raw_headers, body, etag, time.monotonic() + self.fresh_ttl)
+        self._entries.set((principal, self._generation(principal), url), entry)
+        return entry
+
+    def refresh(self, principal: str, url: str, entry: CachedResponse) -> CachedResponse:
+        entry = entry._replace(fresh_until=time.monotonic() + self.fresh_ttl)
+        self._entries.set((principal, self._generation(principal), url), entry)
+        return entry
+
+    def invalidate(self, principal: str) -> None:
+        self._generations.set(principal, next(self._counter))
+
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+response_cache = ResponseCache(
+    settings.RESPONSE_CACHE_MAX_SIZE,
+    settings.RESPONSE_CACHE_FRESH_TTL,
+    settings.RESPONSE_CACHE_STALE_TTL,
+)
@@ -0,0 +1,42 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from docmind_common.metrics import registry
+
+calls_total = registry.counter(
+    "gateway_singleflight_calls_total",
+    "Calls through single-flight groups, by whether they led or shared an upstream call")
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one execution.
+
+    The first caller for a key starts ``fn``; callers arriving while it is
+    in flight await the same result (or exception). The call runs in its
+    own task, so one caller disconnecting does not cancel it for the rest.
+    Results are shared objects and must not be mutated by callers.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def _done(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Mark the exception retrieved even if every caller went away
+            task.exception()
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            calls_total.inc(group=self.name, role="leader")
+            task = self._calls[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            calls_total.inc(group=self.name, role="shared")
+        return await asyncio.shield(task)
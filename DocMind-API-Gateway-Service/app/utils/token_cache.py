@@ -0,0 +1,191 @@
+import asyncio
+import base64
+import hashlib
+import json
+import time
+from typing import Dict, Optional
+
+from docmind_common.bloom import ExpiringBloomFilter
+from docmind_common.metrics import registry
+
+from ..config import settings
+from .cache import TTLCache
+from .pubsub import pubsub
+
+
+# Written by the auth service, one per revoked token, expiring with it
+REVOKED_PREFIX = "revoked:"
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def token_expiry(token: str, claims: Dict) -> Optional[float]:
+    """Return the token's ``exp`` as a unix timestamp, if it carries one.
+
+    The signature is not checked here: the auth service has already
+    verified the token, we only need ``exp`` to bound the cache entry.
+    """
+    exp = claims.get("exp")
+    if exp is None:
+        try:
+            payload = token.split(".")[1]
+            payload += "=" * (-len(payload) % 4)
+            exp = json.loads(base64.urlsafe_b64decode(payload)).get("exp")
+        except (IndexError, ValueError, AttributeError):
+            return None
+    try:
+        return float(exp)
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenCache:
+    """Verified token -> user claims, keyed by the SHA-256 of the token.
+
+    Entries never outlive the token's own ``exp``. Token IDs (``jti``)
+    revoked by the auth service arrive on TOKEN_REVOCATION_CHANNEL and go
+    into an expiring Bloom filter, which is also reloaded from Redis every
+    REVOCATION_RELOAD_INTERVAL. A token whose ID is not in the filter (the
+    usual case) is answered locally; a filter hit only means "maybe
+    revoked": the entry is dropped and the auth service decides. Without
+    Redis no revocations arrive, so entries are kept only a few seconds
+    (see Settings.token_cache_ttl).
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize, ttl)
+        self.revoked = self._empty_filter()
+        self._listener: Optional[asyncio.Task] = None
+        self._reloader: Optional[asyncio.Task] = None
+        self._redis = None
+        self.revocations = 0
+
+    @staticmethod
+    def _empty_filter() -> ExpiringBloomFilter:
+        return ExpiringBloomFilter(settings.REVOCATION_BUCKET_SECONDS,
+                                   settings.REVOCATION_FILTER_CAPACITY,
+                                   settings.REVOCATION_FILTER_ERROR_RATE)
+
+    @property
+    def hits(self) -> int:
+        return self._cache.hits
+
+    @property
+    def misses(self) -> int:
+        return self._cache.misses
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def maybe_revoked(self, claims: Dict) -> bool:
+        jti = claims.get("jti")
+        return jti is not None and jti in self.revoked
+
+    def get(self, token: str) -> Optional[Dict]:
+        key = hash_token(token)
+        claims = self._cache.get(key)
+        if claims is not None and self.maybe_revoked(claims):
+            self._cache.delete(key)
+            return None
+        return claims
+
+    def peek(self, token: str) -> Optional[Dict]:
+        return self._cache.peek(hash_token(token))
+
+    def set(self, token: str, claims: Dict) -> None:
+        if self.maybe_revoked(claims):
+            return
+        key = hash_token(token)
+
+        ttl = self._cache.ttl
+        expires_at = token_expiry(token, claims)
+        if expires_at is not None:
+            ttl = min(ttl, expires_at - time.time())
+        self._cache.set(key, claims, ttl)
+
+    def revoke(self, jti: str, expires_at: float) -> None:
+        self.revoked.add(jti, expires_at)
+        self.revocations += 1
+
+    async def load(self) -> None:
+        """Rebuild the filter from the auth service's ``revoked:<jti>`` keys."""
+        if self._redis is None:
+            return
+        loaded = self._empty_filter()
+        keys = [key async for key in self._redis.scan_iter(match=f"{REVOKED_PREFIX}*", count=1000)]
+        for start in range(0, len(keys), 1000):
+            batch = keys[start:start + 1000]
+            for key, exp in zip(batch, await self._redis.mget(batch)):
+                if exp is not None:
+                    loaded.add(key[len(REVOKED_PREFIX):], float(exp))
+        self.revoked = loaded
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async for message in pubsub.subscribe(settings.TOKEN_REVOCATION_CHANNEL):
+                    try:
+                        revocation = json.loads(message)
+                        self.revoke(revocation["jti"], float(revocation["exp"]))
+                    except (ValueError, KeyError, TypeError):
+                        continue
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Lost the channel; resubscribe after a short pause
+                await asyncio.sleep(1)
+
+    async def _reload(self) -> None:
+        while True:
+            try:
+                await self.load()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Keep the filter we have; the channel still feeds it
+                pass
+            await asyncio.sleep(settings.REVOCATION_RELOAD_INTERVAL)
+
+    async def start(self) -> None:
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+        if self._reloader is None and settings.REDIS_URL:
+            # redis is optional for the gateway; only needed when REDIS_URL is set
+            import redis.asyncio as redis
+
+            self._redis = redis.from_url(settings.REDIS_URL, decode_responses=True)
+            self._reloader = asyncio.create_task(self._reload())
+
+    async def stop(self) -> None:
+        for task in (self._listener, self._reloader):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._listener = self._reloader = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+
+token_cache = TokenCache(settings.TOKEN_CACHE_MAX_SIZE, settings.token_cache_ttl())
+
+registry.counter("gateway_token_cache_hits_total",
+                 "Token verifications answered from the local cache",
+                 lambda: token_cache.hits)
+registry.counter("gateway_token_cache_misses_total",
+                 "Token verifications sent to the auth service",
+                 lambda: token_cache.misses)
+registry.counter("gateway_token_cache_revocations_total",
+                 "Token revocations received from the auth service",
+                 lambda: token_cache.revocations)
+registry.gauge("gateway_token_revocation_filter_entries",
+               "Live revoked token IDs held in the local filter",
+               lambda: len(token_cache.revoked))
+registry.gauge("gateway_token_cache_entries",
+               "Verified tokens currently cached",
+               lambda: len(token_cache))
@@ -0,0 +1,124 @@
+"""
+Adaptive upstream limits under steady load, a slowdown and recovery.
+
+First sends ``--concurrency`` clients' worth of distinct document
+listings through the gateway for ``--warmup`` and then ``--seconds``
+seconds against a stub with
+log-normal latency, ``--outliers`` of the requests ten times slower.
+Then drives each upstream's limiter (as configured by
+ADMISSION_UPSTREAM_LIMITS, with ADMISSION_ADAPTIVE on) directly with
+``--samples`` fully-used samples of such latencies, then with a
+sustained 4x slowdown (which becomes the new norm once it lasts),
+then steady again.
+
+Under steady load the limit must stay within 10% of its configured
+value; the benchmark fails otherwise.
+
+    python -m benchmarks.bench_adaptive_limit --samples 5000 --concurrency 150
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import time
+from typing import Callable
+
+import httpx
+
+from .stub_upstream import StubUpstream, default_handler
+
+MEDIAN_LATENCY = 0.02
+
+
+def make_latency(rng: random.Random, outliers: float, slowdown: float = 1.0) -> Callable[[], float]:
+    def latency() -> float:
+        value = MEDIAN_LATENCY * slowdown * rng.lognormvariate(0, 0.5)
+        return value * 10 if rng.random() < outliers else value
+    return latency
+
+
+def drive_limiters(samples: int, outliers: float) -> bool:
+    from app.utils.admission import Admission
+
+    rng = random.Random(1)
+    steady_ok = True
+    for service, controller in Admission().upstreams.items():
+        configured = controller.limit
+        low = configured
+        for _ in range(samples):
+            latency = make_latency(rng, outliers)()
+            controller.limiter.observe(latency, True, controller.limit)
+            low = min(low, controller.limit)
+        slow = make_latency(rng, outliers, slowdown=4)
+        slowed = configured
+        for _ in range(samples):
+            controller.limiter.observe(slow(), True, controller.limit)
+            slowed = min(slowed, controller.limit)
+        for _ in range(samples):
+            controller.limiter.observe(make_latency(rng, outliers)(), True, controller.limit)
+        steady_ok &= low >= configured * 0.9
+        print(f"{service:>9}: configured {configured:4d}   steady min {low:4d}   "
+              f"4x slowdown min {slowed:4d}   recovered {controller.limit:4d}")
+    return steady_ok
+
+
+async def through_gateway(concurrency: int, warmup: float, seconds: float, outliers: float) -> bool:
+    latency = make_latency(random.Random(2), outliers)
+
+    async def handler(method, path, headers, body_size):
+        await asyncio.sleep(latency())
+        return await default_handler(method, path, headers, body_size)
+
+    async with StubUpstream() as auth_stub, StubUpstream(handler=handler) as document_stub:
+        os.environ["AUTH_SERVICE_URL"] = auth_stub.url
+        os.environ["DOCUMENT_SERVICE_URL"] = document_stub.url
+        from app.main import app
+        from app.utils.admission import admission
+
+        document = admission.upstreams["document"]
+        configured = low = document.limit
+        pages = itertools.count()
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://gateway", timeout=None) as client:
+                headers = {"Authorization": "Bearer token"}
+                # Connections are opened and the limiter's windows filled first
+                steady_from = time.monotonic() + warmup
+                stop_at = steady_from + seconds
+                statuses = {}
+
+                async def list_documents() -> None:
+                    nonlocal low
+                    while time.monotonic() < stop_at:
+                        # Distinct pages, so no response is cached or coalesced
+                        response = await client.get(f"/api/v1/documents/?page={next(pages)}", headers=headers)
+                        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                        if time.monotonic() >= steady_from:
+                            low = min(low, document.limit)
+
+                await asyncio.gather(*(list_documents() for _ in range(concurrency)))
+        print(f"  gateway: configured {configured:4d}   steady min {low:4d}   final {document.limit:4d}   "
+              f"statuses {statuses}   document requests {document_stub.requests}")
+        return low >= configured * 0.9
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--samples", type=int, default=5000)
+    parser.add_argument("--outliers", type=float, default=0.02, help="fraction of requests 10x slower")
+    parser.add_argument("--concurrency", type=int, default=150)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    os.environ["ADMISSION_ENABLED"] = "true"
+    os.environ["ADMISSION_ADAPTIVE"] = "true"
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    os.environ.setdefault("UPSTREAM_MAX_CONNECTIONS", "1000")
+    os.environ.setdefault("UPSTREAM_MAX_KEEPALIVE_CONNECTIONS", "1000")
+    # The gateway first: settings are read from the environment on import
+    steady = asyncio.run(through_gateway(args.concurrency, args.warmup, args.seconds, args.outliers))
+    steady &= drive_limiters(args.samples, args.outliers)
+    print("OK" if steady else "FAILED: an adaptive limit collapsed under steady load")
+    raise SystemExit(0 if steady else 1)
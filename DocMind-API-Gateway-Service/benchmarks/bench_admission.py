@@ -0,0 +1,107 @@
+"""
+A burst of RAG queries against cheap document listings, with and without
+admission control.
+
+The RAG stub models a service that can only work on ``--rag-capacity``
+queries at a time (each takes ``--rag-time`` seconds), so excess queries
+queue inside it and its latency climbs. A flood of ``--burst`` RAG queries is
+fired together with a steady stream of listings. With admission control,
+RAG is held to its upstream limit, overflow is shed quickly with 503 +
+Retry-After, and listings keep their latency; without it every RAG query
+piles onto the backend.
+
+Each mode runs in a fresh interpreter because middleware is configured at
+import time.
+
+    python -m benchmarks.bench_admission --burst 400
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+from typing import List
+
+import httpx
+
+from .stub_upstream import StubUpstream, default_handler
+
+
+def percentile(values: List[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] * 1000 if values else 0.0
+
+
+async def run(burst: int, rag_capacity: int, rag_time: float, listings: int) -> None:
+    capacity = asyncio.Semaphore(rag_capacity)
+
+    async def rag_handler(method, path, headers, body_size):
+        async with capacity:
+            await asyncio.sleep(rag_time)
+        return await default_handler(method, path, headers, body_size)
+
+    async with StubUpstream() as auth_stub, StubUpstream(delay=0.005) as document_stub, \
+            StubUpstream(handler=rag_handler) as rag_stub:
+        os.environ["AUTH_SERVICE_URL"] = auth_stub.url
+        os.environ["DOCUMENT_SERVICE_URL"] = document_stub.url
+        os.environ["RAG_SERVICE_URL"] = rag_stub.url
+        from app.config import settings
+        from app.main import app
+
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://gateway", timeout=None) as client:
+                headers = {"Authorization": "Bearer token"}
+                rag_latencies: List[float] = []
+                shed_latencies: List[float] = []
+                list_latencies: List[float] = []
+                statuses: Counter = Counter()
+
+                async def ask(i: int) -> None:
+                    start = time.perf_counter()
+                    response = await client.post("/api/v1/rag/query", json={"q": f"question {i}"}, headers=headers)
+                    statuses[response.status_code] += 1
+                    (rag_latencies if response.status_code == 200 else shed_latencies).append(
+                        time.perf_counter() - start)
+
+                async def list_documents() -> None:
+                    for _ in range(listings):
+                        start = time.perf_counter()
+                        response = await client.get("/api/v1/documents/", headers=headers)
+                        assert response.status_code == 200, response.status_code
+                        list_latencies.append(time.perf_counter() - start)
+                        await asyncio.sleep(0.01)
+
+                start = time.perf_counter()
+                await asyncio.gather(list_documents(), *(ask(i) for i in range(burst)))
+                elapsed = time.perf_counter() - start
+
+        mode = "on " if settings.ADMISSION_ENABLED else "off"
+        print(f"admission {mode}: {elapsed:.2f}s, rag statuses {dict(statuses)}")
+        print(f"  rag answered   p50 {percentile(rag_latencies, 50):8.1f} ms  p99 {percentile(rag_latencies, 99):8.1f} ms")
+        if shed_latencies:
+            print(f"  rag shed (503) p50 {percentile(shed_latencies, 50):8.1f} ms  p99 {percentile(shed_latencies, 99):8.1f} ms")
+        print(f"  listings       p50 {percentile(list_latencies, 50):8.1f} ms  p99 {percentile(list_latencies, 99):8.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--burst", type=int, default=400)
+    parser.add_argument("--rag-capacity", type=int, default=16)
+    parser.add_argument("--rag-time", type=float, default=0.1)
+    parser.add_argument("--listings", type=int, default=100)
+    parser.add_argument("--mode", choices=("on", "off", "both"), default="both")
+    args = parser.parse_args()
+
+    if args.mode == "both":
+        for mode in ("off", "on"):
+            argv = [a for a in sys.argv[1:] if not a.startswith("--mode")]
+            subprocess.run([sys.executable, "-m", "benchmarks.bench_admission", *argv, "--mode", mode], check=True)
+    else:
+        os.environ["ADMISSION_ENABLED"] = "true" if args.mode == "on" else "false"
+        os.environ["RATE_LIMIT_ENABLED"] = "false"
+        os.environ.setdefault("UPSTREAM_MAX_CONNECTIONS", "1000")
+        os.environ.setdefault("UPSTREAM_MAX_KEEPALIVE_CONNECTIONS", "1000")
+        asyncio.run(run(args.burst, args.rag_capacity, args.rag_time, args.listings))
@@ -0,0 +1,87 @@
+"""
+Spread of load and tail latency across document-service replicas.
+
+Starts ``--replicas`` stub replicas, one of them ``--slow-factor`` times
+slower than the rest, points DOCUMENT_SERVICE_URL at all of them and
+drives GET /documents through the gateway's pooled client with each
+balancing policy. Reports throughput, p50/p99 and how many requests each
+replica served. A final round makes one replica fail every request to show
+passive ejection.
+
+    python -m benchmarks.bench_load_balancing --replicas 4 --concurrency 64 --duration 5
+"""
+import argparse
+import asyncio
+import os
+import time
+from contextlib import AsyncExitStack
+from typing import List
+
+from .bench_upstream_client import report
+from .stub_upstream import StubUpstream
+
+
+async def drive(concurrency: int, duration: float) -> List[float]:
+    from app.utils.http import get_client
+
+    latencies: List[float] = []
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        client = get_client("document")
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await client.get("/documents")
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+async def main(replicas: int, concurrency: int, duration: float, delay: float, slow_factor: float) -> None:
+    async with AsyncExitStack() as stack:
+        stubs = [await stack.enter_async_context(StubUpstream(delay=delay)) for _ in range(replicas)]
+        stubs[0].delay = delay * slow_factor
+        os.environ["DOCUMENT_SERVICE_URL"] = ",".join(stub.url for stub in stubs)
+        os.environ.setdefault("UPSTREAM_MAX_KEEPALIVE_CONNECTIONS", str(concurrency))
+        from app.config import settings
+        from app.utils.http import close_clients, start_clients
+
+        print(f"{replicas} replicas, replica 0 is {slow_factor:g}x slower ({delay * slow_factor * 1000:.0f} ms)")
+        for policy in ("round_robin", "least_outstanding", "p2c"):
+            settings.LOAD_BALANCER_POLICY = policy
+            for stub in stubs:
+                stub.requests = 0
+            await start_clients()
+            try:
+                start = time.perf_counter()
+                latencies = await drive(concurrency, duration)
+                report(policy, latencies, time.perf_counter() - start)
+            finally:
+                await close_clients()
+            print(f"{'':>10}  served per replica: {[stub.requests for stub in stubs]}")
+
+        # Passive ejection: replica 0 now fails every request
+        stubs[0].delay = delay
+        stubs[0].error_rate = 1.0
+        settings.LOAD_BALANCER_POLICY = "p2c"
+        for stub in stubs:
+            stub.requests = 0
+        await start_clients()
+        try:
+            latencies = await drive(concurrency, duration)
+        finally:
+            await close_clients()
+        print(f"{'ejection':>10}: replica 0 failing; served per replica: "
+              f"{[stub.requests for stub in stubs]} ({len(latencies)} requests)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--replicas", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--delay", type=float, default=0.01)
+    parser.add_argument("--slow-factor", type=float, default=10.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.replicas, args.concurrency, args.duration, args.delay, args.slow_factor))
@@ -0,0 +1,44 @@
+"""
+Per-request cost of the in-memory rate limiter as the client count grows.
+
+Each round sends ``--hits`` requests spread across N distinct client keys
+and reports the mean cost of one limiter check. The cost should stay flat
+from 1k to 100k clients for both algorithms.
+
+    python -m benchmarks.bench_rate_limiter
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from app.utils.rate_limit import MemoryBackend, RateLimiter, RateLimitRule
+
+
+async def measure(algorithm: str, clients: int, hits: int) -> float:
+    limiter = RateLimiter([RateLimitRule("ip", 100, 60)], algorithm,
+                          MemoryBackend(max_keys=clients))
+    keys = [{"ip": f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"} for i in range(clients)]
+    # Warm every client so the state table is full before timing
+    for key in keys:
+        await limiter.hit(key)
+
+    order = [random.choice(keys) for _ in range(hits)]
+    start = time.perf_counter()
+    for key in order:
+        await limiter.hit(key)
+    return (time.perf_counter() - start) / hits * 1e9
+
+
+async def main(hits: int) -> None:
+    for algorithm in ("token_bucket", "sliding_window"):
+        for clients in (1_000, 10_000, 100_000):
+            cost = await measure(algorithm, clients, hits)
+            print(f"{algorithm:>15} {clients:>8} clients: {cost:8.0f} ns/request")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--hits", type=int, default=200_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.hits))
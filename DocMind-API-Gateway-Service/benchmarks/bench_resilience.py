@@ -0,0 +1,96 @@
+"""
+Exercise the upstream resilience layer against a fault-injecting stub.
+
+Scenarios, each against a fresh document stub:
+  errors  - 30% of responses are 503; retries should hide most of them
+  slow    - 5% of responses take 500 ms; hedging should cut the p99
+  dead    - nothing listens; the breaker should open and fail fast
+
+    python -m benchmarks.bench_resilience --requests 500
+"""
+import argparse
+import asyncio
+import os
+import time
+from typing import List, Optional
+
+from fastapi import HTTPException
+
+from .stub_upstream import StubUpstream
+
+
+def report(name: str, statuses: List[int], latencies: List[float], upstream_requests: int) -> None:
+    latencies.sort()
+    ok = sum(1 for s in statuses if s == 200)
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+    print(f"{name:>22}: {ok}/{len(statuses)} ok, p50 {p50:7.2f} ms, p99 {p99:7.2f} ms, "
+          f"{upstream_requests} upstream requests")
+
+
+async def run(name: str, requests: int, concurrency: int, stub: Optional[StubUpstream] = None) -> None:
+    from app.utils.http import get_client, get_policy
+
+    statuses: List[int] = []
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                request = get_client("document").build_request("GET", "/documents")
+                response = await get_policy("document").send(request)
+                statuses.append(response.status_code)
+            except HTTPException as e:
+                statuses.append(e.status_code)
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    report(name, statuses, latencies, stub.requests if stub else 0)
+
+
+async def scenario(name: str, stub_kwargs, env, requests: int, concurrency: int) -> None:
+    from app.config import settings
+    from app.utils.http import start_clients, close_clients
+
+    async with StubUpstream(**stub_kwargs) as stub:
+        for key, value in env.items():
+            setattr(settings, key, value)
+        settings.DOCUMENT_SERVICE_URL = stub.url
+        await start_clients()
+        try:
+            await run(name, requests, concurrency, stub)
+        finally:
+            await close_clients()
+
+
+async def main(requests: int, concurrency: int) -> None:
+    os.environ.setdefault("BREAKER_FAILURE_THRESHOLD", "20")
+    from app.config import settings
+
+    await scenario("errors, no retries", {"error_rate": 0.3}, {"RETRY_MAX_ATTEMPTS": 0}, requests, concurrency)
+    await scenario("errors, 2 retries", {"error_rate": 0.3}, {"RETRY_MAX_ATTEMPTS": 2}, requests, concurrency)
+    await scenario("slow tail, no hedging", {"slow_rate": 0.05, "slow_delay": 0.5, "delay": 0.005},
+                   {"HEDGE_ENABLED": False}, requests, concurrency)
+    await scenario("slow tail, hedging", {"slow_rate": 0.05, "slow_delay": 0.5, "delay": 0.005},
+                   {"HEDGE_ENABLED": True, "HEDGE_MIN_SAMPLES": 20}, requests, concurrency)
+
+    # Dead upstream: point at a closed port, breaker should trip and shed
+    from app.utils.http import start_clients, close_clients, get_policy
+    settings.DOCUMENT_SERVICE_URL = "http://127.0.0.1:9"
+    settings.RETRY_MAX_ATTEMPTS = 0
+    await start_clients()
+    try:
+        await run("dead upstream", requests, concurrency)
+        print(f"{'breaker state':>22}: {get_policy('document').breaker.state}")
+    finally:
+        await close_clients()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
@@ -0,0 +1,56 @@
+"""
+Thundering herd: many identical document listings for one user at once.
+
+Fires ``--herd`` concurrent GET /api/v1/documents/ requests with the same
+bearer token through the gateway app, with and without single-flight, and
+counts how many calls actually reached the auth and document stubs.
+
+    python -m benchmarks.bench_singleflight --herd 200 --rounds 5
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+from .stub_upstream import StubUpstream
+
+
+async def herd(client: httpx.AsyncClient, size: int, token: str) -> None:
+    responses = await asyncio.gather(*(
+        client.get("/api/v1/documents/", headers={"Authorization": f"Bearer {token}"})
+        for _ in range(size)
+    ))
+    assert all(r.status_code == 200 for r in responses), {r.status_code for r in responses}
+
+
+async def main(size: int, rounds: int) -> None:
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    async with StubUpstream(delay=0.02) as auth_stub, StubUpstream(delay=0.05) as document_stub:
+        os.environ["AUTH_SERVICE_URL"] = auth_stub.url
+        os.environ["DOCUMENT_SERVICE_URL"] = document_stub.url
+        from app.config import settings
+        from app.main import app
+
+        for enabled in (False, True):
+            settings.SINGLE_FLIGHT_ENABLED = enabled
+            auth_stub.requests = document_stub.requests = 0
+            async with app.router.lifespan_context(app):
+                transport = httpx.ASGITransport(app=app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as client:
+                    start = time.perf_counter()
+                    for i in range(rounds):
+                        # A fresh token per round so the token cache starts cold
+                        await herd(client, size, f"token-{enabled}-{i}")
+                    elapsed = time.perf_counter() - start
+            print(f"single-flight {'on ' if enabled else 'off'}: {size * rounds} requests in {elapsed:.2f}s, "
+                  f"upstream calls: auth {auth_stub.requests}, document {document_stub.requests}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--herd", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.herd, args.rounds))
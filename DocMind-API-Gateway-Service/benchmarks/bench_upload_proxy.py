@@ -0,0 +1,103 @@
+"""
+Proxy a large synthetic upload through the gateway and check its peak RSS.
+
+Starts the gateway under uvicorn in a subprocess, points it at stub auth and
+document upstreams, streams ``--size`` bytes to /api/v1/documents/upload and
+compares the gateway's peak RSS (VmHWM) before and after. Exits non-zero if
+the growth exceeds ``--max-growth-mb``.
+
+    python -m benchmarks.bench_upload_proxy --size-mb 1024
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+from .stub_upstream import StubUpstream
+
+CHUNK = b"\0" * (1 << 20)
+
+
+def peak_rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError("VmHWM not available on this platform")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def synthetic_file(size: int):
+    sent = 0
+    while sent < size:
+        chunk = CHUNK[:min(len(CHUNK), size - sent)]
+        sent += len(chunk)
+        yield chunk
+
+
+async def main(size: int, max_growth_mb: float) -> int:
+    async with StubUpstream() as auth_stub, StubUpstream() as document_stub:
+        port = free_port()
+        env = dict(os.environ,
+                   AUTH_SERVICE_URL=auth_stub.url,
+                   DOCUMENT_SERVICE_URL=document_stub.url,
+                   MAX_UPLOAD_SIZE=str(size + (1 << 20)))
+        gateway = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app",
+             "--port", str(port), "--log-level", "warning"],
+            env=env,
+        )
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None) as client:
+                for _ in range(100):
+                    try:
+                        await client.get("/metrics")
+                        break
+                    except httpx.TransportError:
+                        await asyncio.sleep(0.1)
+
+                baseline = peak_rss_mb(gateway.pid)
+                start = time.perf_counter()
+                response = await client.post(
+                    "/api/v1/documents/upload",
+                    content=synthetic_file(size),
+                    headers={
+                        "Authorization": "Bearer benchmark-token",
+                        "Content-Type": "application/octet-stream",
+                        "Content-Length": str(size),
+                    },
+                )
+                elapsed = time.perf_counter() - start
+                peak = peak_rss_mb(gateway.pid)
+        finally:
+            gateway.terminate()
+            gateway.wait()
+
+    received = response.json().get("received_bytes")
+    growth = peak - baseline
+    print(f"status {response.status_code}, upstream received {received} of {size} bytes")
+    print(f"{size / elapsed / (1 << 20):.1f} MiB/s, peak RSS {baseline:.1f} -> {peak:.1f} MiB "
+          f"(+{growth:.1f} MiB)")
+    if received != size or growth > max_growth_mb:
+        print("FAIL")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=int, default=1024)
+    parser.add_argument("--max-growth-mb", type=float, default=64.0)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.size_mb << 20, args.max_growth_mb)))
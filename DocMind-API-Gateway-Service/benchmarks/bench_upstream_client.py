@@ -0,0 +1,76 @@
+"""
+Compare per-call httpx clients against the shared pooled upstream clients.
+
+Each simulated gateway request does what an authenticated route does: one
+token check against the auth stub followed by one forwarded call to the
+document stub.
+
+    python -m benchmarks.bench_upstream_client --concurrency 50 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import time
+from typing import List
+
+import httpx
+
+
+def report(name: str, latencies: List[float], elapsed: float) -> None:
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+    print(f"{name:>10}: {len(latencies) / elapsed:9.1f} req/s   "
+          f"p50 {p50:7.2f} ms   p99 {p99:7.2f} ms   ({len(latencies)} requests)")
+
+
+async def run(name: str, call, concurrency: int, duration: float) -> None:
+    latencies: List[float] = []
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    report(name, latencies, time.perf_counter() - start)
+
+
+async def main(concurrency: int, duration: float) -> None:
+    from .stub_upstream import StubUpstream
+
+    async with StubUpstream() as auth_stub, StubUpstream() as document_stub:
+        os.environ["AUTH_SERVICE_URL"] = auth_stub.url
+        os.environ["DOCUMENT_SERVICE_URL"] = document_stub.url
+        os.environ.setdefault("UPSTREAM_MAX_KEEPALIVE_CONNECTIONS", str(concurrency))
+
+        from app.utils.http import start_clients, close_clients, get_client
+
+        async def per_call():
+            async with httpx.AsyncClient() as client:
+                await client.get(f"{auth_stub.url}/verify-token")
+            async with httpx.AsyncClient() as client:
+                await client.get(f"{document_stub.url}/documents")
+
+        async def pooled():
+            await get_client("auth").get("/verify-token")
+            await get_client("document").get("/documents")
+
+        await run("per-call", per_call, concurrency, duration)
+
+        await start_clients()
+        try:
+            await run("pooled", pooled, concurrency, duration)
+        finally:
+            await close_clients()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency, args.duration))
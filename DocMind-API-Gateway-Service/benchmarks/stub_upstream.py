@@ -0,0 +1,128 @@
+"""
+Minimal asyncio HTTP/1.1 stub upstream used by the gateway benchmarks.
+
+Speaks just enough HTTP/1.1 (keep-alive, Content-Length and chunked request
+bodies) to stand in for the auth, document and rag services without pulling
+a real server into the benchmark. Faults can be injected: a fraction of
+requests answered with ``error_status``, slowed by ``slow_delay`` or dropped
+without a response.
+"""
+import asyncio
+import json
+import random
+from http import HTTPStatus
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+Handler = Callable[[str, str, Dict[str, str], int], Awaitable[Tuple[int, Dict[str, str], bytes]]]
+
+
+async def default_handler(method: str, path: str, headers: Dict[str, str], body_size: int):
+    if path.startswith("/verify-token"):
+        payload = {"id": "1", "sub": "user@example.com"}
+    else:
+        payload = {"method": method, "path": path, "received_bytes": body_size}
+    return 200, {"Content-Type": "application/json"}, json.dumps(payload).encode()
+
+
+class StubUpstream:
+    def __init__(self, handler: Optional[Handler] = None, delay: float = 0.0,
+                 host: str = "127.0.0.1", port: int = 0,
+                 error_rate: float = 0.0, error_status: int = 503,
+                 slow_rate: float = 0.0, slow_delay: float = 1.0,
+                 drop_rate: float = 0.0):
+        self.handler = handler or default_handler
+        self.delay = delay
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.slow_rate = slow_rate
+        self.slow_delay = slow_delay
+        self.drop_rate = drop_rate
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> "StubUpstream":
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def __aenter__(self) -> "StubUpstream":
+        return await self.start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+    async def _drain_body(self, reader: asyncio.StreamReader, headers: Dict[str, str]) -> int:
+        size = 0
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                line = await reader.readline()
+                chunk_size = int(line.split(b";")[0].strip() or b"0", 16)
+                if chunk_size == 0:
+                    await reader.readline()
+                    return size
+                remaining = chunk_size
+                while remaining:
+                    data = await reader.read(min(remaining, 1 << 16))
+                    if not data:
+                        return size
+                    remaining -= len(data)
+                size += chunk_size
+                await reader.readline()
+        remaining = int(headers.get("content-length", "0"))
+        while remaining:
+            data = await reader.read(min(remaining, 1 << 16))
+            if not data:
+                break
+            remaining -= len(data)
+            size += len(data)
+        return size
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode().split(" ", 2)
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body_size = await self._drain_body(reader, headers)
+
+                self.requests += 1
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                if random.random() < self.slow_rate:
+                    await asyncio.sleep(self.slow_delay)
+                if random.random() < self.drop_rate:
+                    break
+                if random.random() < self.error_rate:
+                    status, response_headers, body = self.error_status, {}, b""
+                else:
+                    status, response_headers, body = await self.handler(method, path, headers, body_size)
+
+                head = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}", f"Content-Length: {len(body)}"]
+                head += [f"{name}: {value}" for name, value in response_headers.items()]
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + body)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError, ValueError):
+            pass
+        finally:
+            writer.close()
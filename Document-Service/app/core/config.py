@@ -22,14 +22,71 @@ class Settings(BaseSettings):
     AWS_SECRET_ACCESS_KEY: Optional[str] = "fake_secret_key"
     AWS_BUCKET_NAME: Optional[str] = "fake_bucket"
     AWS_REGION: Optional[str] = "us-west-2"
+    # Any S3-compatible store instead of AWS, e.g. http://minio:9000
+    S3_ENDPOINT_URL: Optional[str] = None
+
+    # Object storage: "s3" (see above) or "local" (files under
+    # STORAGE_LOCAL_ROOT, for development)
+    STORAGE_BACKEND: str = "s3"
+    STORAGE_LOCAL_ROOT: str = "./data/objects"
+    # Uploads are written in parts of this size (at least 5 MiB for S3),
+    # this many at a time; peak memory per upload is about their product
+    STORAGE_PART_SIZE: int = 8 * 1024 * 1024
+    STORAGE_UPLOAD_CONCURRENCY: int = 4
 
     # Elasticsearch
     ELASTICSEARCH_HOST: Optional[str] = "localhost"
     ELASTICSEARCH_PORT: Optional[int] = 9200
 
+    # Tokens are verified locally against the auth service's signing keys
+    AUTH_JWKS_URL: str = "http://auth-service:8001/.well-known/jwks.json"
+    JWKS_REFRESH_INTERVAL: float = 300.0
+    JWT_LEEWAY: float = 0.0
+
     # Redis
     REDIS_HOST: Optional[str] = "localhost"
     REDIS_PORT: Optional[int] = 6379
+    # Takes precedence over REDIS_HOST/REDIS_PORT, e.g. rediss://:pw@host:6380/0
+    REDIS_URL: Optional[str] = None
+    REDIS_MAX_CONNECTIONS: int = 50
+    # Seconds to wait for a pooled connection before failing the command
+    REDIS_POOL_TIMEOUT: float = 2.0
+    REDIS_SOCKET_TIMEOUT: float = 2.0
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
+    # Client-side cache of tracked keys; 0 disables it
+    REDIS_LOCAL_CACHE_SIZE: int = 10000
+    REDIS_LOCAL_CACHE_TTL: float = 60.0
+    # Token revocations from the auth service, mirrored into a local filter
+    TOKEN_REVOCATION_CHANNEL: str = "docmind:token-revocations"
+    REVOCATION_BUCKET_SECONDS: int = 300
+    REVOCATION_FILTER_CAPACITY: int = 10000
+    REVOCATION_FILTER_ERROR_RATE: float = 0.001
+    # Per-user document-set version announcements (upload/delete)
+    DOCSET_VERSION_CHANNEL: str = "docmind:docset-versions"
+
+    # Ingestion pipeline: workers per stage in this process (0 leaves the
+    # stage to other processes), and how often idle workers poll the queue
+    INGEST_PARSE_WORKERS: int = 2
+    INGEST_CHUNK_WORKERS: int = 1
+    INGEST_EMBED_WORKERS: int = 2
+    INGEST_INDEX_WORKERS: int = 1
+    INGEST_POLL_INTERVAL: float = 1.0
+    # A worker that hasn't finished a stage by then is presumed dead
+    INGEST_LEASE_SECONDS: int = 600
+    # Failed stages are retried after RETRY_BASE_DELAY * 2**n seconds (capped)
+    INGEST_MAX_ATTEMPTS: int = 5
+    INGEST_RETRY_BASE_DELAY: float = 2.0
+    INGEST_RETRY_MAX_DELAY: float = 300.0
+    # Characters per chunk, and how many each chunk repeats from the last
+    INGEST_CHUNK_SIZE: int = 1000
+    INGEST_CHUNK_OVERLAP: int = 100
+    INGEST_EMBEDDING_DIMENSIONS: int = 256
+
+    # Text extraction: documents parsed at once (one process each), and
+    # the time and address space each may use before it is killed
+    EXTRACT_WORKERS: int = 2
+    EXTRACT_TIMEOUT: float = 120.0
+    EXTRACT_MEMORY_LIMIT_MB: int = 1024
 
     model_config = SettingsConfigDict(env_file=".env")
 
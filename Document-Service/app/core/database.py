@@ -11,5 +11,15 @@ engine: AsyncEngine = create_async_engine(
     echo=settings.DEBUG,
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession)
+# Attributes stay loaded after commit: an async session can't lazily reload them
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession,
+                            expire_on_commit=False)
 
+
+def dialect_insert(session: AsyncSession, model):
+    """INSERT for ``model`` with the session dialect's ON CONFLICT support."""
+    if session.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model)
@@ -0,0 +1,90 @@
+import asyncio
+import time
+from typing import Dict, Optional
+
+import jwt
+
+from app.core.config import settings
+from app.logger_config import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class JWKSVerifier:
+    """Verifies auth-service tokens locally against its published JWKS.
+
+    Keys are fetched at startup and refreshed in the background every
+    ``refresh_interval`` seconds, so verification never waits on the
+    network. A token naming an unknown ``kid`` (a freshly rotated key)
+    triggers one early refresh, at most once per ``min_refresh_interval``.
+    """
+
+    def __init__(self, url: str, refresh_interval: float, min_refresh_interval: float = 10.0,
+                 leeway: float = 0.0):
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self.leeway = leeway
+        self.keys: Dict[str, jwt.PyJWK] = {}
+        # Only used for fetching; its blocking I/O runs in a worker thread
+        self._client = jwt.PyJWKClient(url, cache_jwk_set=False, cache_keys=False)
+        self._last_refresh = 0.0
+        self._refreshing: Optional[asyncio.Task] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _fetch(self) -> None:
+        self._last_refresh = time.monotonic()
+        try:
+            jwk_set = await asyncio.to_thread(self._client.get_jwk_set)
+        except jwt.PyJWTError as e:
+            logger.warning(f"JWKS refresh failed, keeping {len(self.keys)} known key(s): {str(e)}")
+            return
+        self.keys = {key.key_id: key for key in jwk_set.keys if key.key_id}
+
+    async def refresh(self) -> None:
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.create_task(self._fetch())
+        await asyncio.shield(self._refreshing)
+
+    def _key_for(self, token: str) -> Optional[jwt.PyJWK]:
+        header = jwt.get_unverified_header(token)
+        key = self.keys.get(header.get("kid"))
+        if key is None or header.get("alg") != key.algorithm_name:
+            return None
+        return key
+
+    async def verify(self, token: str) -> Dict:
+        """Return the token's claims; raises jwt.PyJWTError if it isn't valid."""
+        key = self._key_for(token)
+        if key is None and time.monotonic() - self._last_refresh >= self.min_refresh_interval:
+            await self.refresh()
+            key = self._key_for(token)
+        if key is None:
+            raise jwt.InvalidKeyError("Token signed with an unknown key")
+        return jwt.decode(token, key.key, algorithms=[key.algorithm_name],
+                          leeway=self.leeway, options={"require": ["exp", "sub"]})
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await self.refresh()
+
+    async def start(self) -> None:
+        await self.refresh()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+jwks_verifier = JWKSVerifier(
+    settings.AUTH_JWKS_URL,
+    settings.JWKS_REFRESH_INTERVAL,
+    leeway=settings.JWT_LEEWAY,
+)
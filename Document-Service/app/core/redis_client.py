@@ -0,0 +1,24 @@
+from docmind_common.metrics import registry
+from docmind_common.redis_client import RedisClient
+
+from app.core.config import settings
+
+
+def redis_url() -> str:
+    return settings.REDIS_URL or f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}/0"
+
+
+redis_client = RedisClient(
+    redis_url(),
+    max_connections=settings.REDIS_MAX_CONNECTIONS,
+    pool_timeout=settings.REDIS_POOL_TIMEOUT,
+    socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+    health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+    local_cache_size=settings.REDIS_LOCAL_CACHE_SIZE,
+    local_cache_ttl=settings.REDIS_LOCAL_CACHE_TTL,
+)
+
+registry.gauge("redis_commands_in_flight", "Redis commands awaiting a reply",
+               fn=lambda: redis_client.in_flight)
+registry.gauge("redis_local_cache_keys", "Keys held in the client-side cache",
+               fn=lambda: redis_client.local_cache_keys)
@@ -1,31 +1,41 @@
-from typing import Generator
+from typing import AsyncGenerator
 import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.config import settings
 from app.core.database import SessionLocal
+from app.core.jwks import jwks_verifier
+from app.core.redis_client import redis_client
+from app.core.revocation import revocation_list
+from app.services.document_service import DocumentService
+from app.services.ingestion_queue import job_queue
+from app.services.search_service import search_service
+from app.services.storage_service import storage_service
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
 
-def get_db() -> Generator:
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """
     Database dependency that creates a new SessionLocal instance for each request
     and closes it when the request is done.
     """
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+    async with SessionLocal() as session:
+        yield session
+
+
+def get_document_service(db: AsyncSession = Depends(get_db)) -> DocumentService:
+    """
+    DocumentService over the request's session and the process-wide
+    storage, search and Redis clients and ingestion queue.
+    """
+    return DocumentService(db, storage_service, search_service, redis_client, job_queue)
 
 
 async def get_current_user(
-        token: str = Depends(oauth2_scheme),
-        db: Session = Depends(get_db)
+        token: str = Depends(oauth2_scheme)
 ) -> int:
     """
     Dependency that validates the JWT token and returns the current user ID.
@@ -38,14 +48,12 @@ async def get_current_user(
     )
 
     try:
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM]
-        )
+        payload = await jwks_verifier.verify(token)
         user_id: int = payload.get("sub")
         if user_id is None:
             raise credentials_exception
+        if await revocation_list.is_revoked(payload.get("jti")):
+            raise credentials_exception
 
         # Here you might want to verify the user exists in the database
         # This is just a basic example
@@ -1,20 +1,27 @@
 from contextlib import asynccontextmanager
 from datetime import datetime
 
+from docmind_common.metrics import registry
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from app.core.config import settings
 from app.core.database import engine, Base
+from app.core.jwks import jwks_verifier
+from app.core.redis_client import redis_client
+from app.core.revocation import revocation_list
 from app.logger_config import setup_logger
 from app.routes import document
-from app.services.search_service import ElasticsearchService
-from app.services.storage_service import S3StorageService
+from app.services.ingestion_service import ingestion_pipeline
+from app.services.search_service import search_service
+from app.services.storage_service import storage_service
 from app.utils.document_service_exception import DocumentServiceException
 
 # Setup logging
 logger = setup_logger(__name__)
+# The shared docmind_common clients log through the same handler
+setup_logger("docmind_common")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI ):
@@ -27,15 +34,22 @@ async def lifespan(app: FastAPI ):
             await conn.run_sync(Base.metadata.create_all)
         logger.info("Database tables created successfully")
 
-        # Initialize S3 connection
-        # s3_service = S3StorageService()
-        # await s3_service.initialize()
-        # logger.info("S3 connection initialized successfully")
+        await jwks_verifier.start()
+        logger.info(f"Loaded {len(jwks_verifier.keys)} token signing key(s)")
 
-        # Initialize Elasticsearch
-        # es_service = ElasticsearchService()
-        # await es_service.initialize()
-        # logger.info("Elasticsearch connection initialized successfully")
+        await redis_client.start()
+        logger.info("Redis connection pool initialized")
+        await revocation_list.start()
+
+        # Created once here and shared by every request
+        await storage_service.initialize()
+        logger.info(f"Object storage initialized ({settings.STORAGE_BACKEND})")
+
+        await search_service.initialize()
+        logger.info("Elasticsearch connection initialized successfully")
+
+        await ingestion_pipeline.start()
+        logger.info(f"Ingestion workers started: {ingestion_pipeline.workers}")
 
     except Exception as e:
         logger.error(f"Error during startup: {str(e)}", exc_info=True)
@@ -46,12 +60,22 @@ async def lifespan(app: FastAPI ):
     # Shutdown logic
     logger.info("Shutting down Document Service...")
     try:
+        # Unfinished stages go back to the queue for the next worker
+        await ingestion_pipeline.stop()
+        logger.info("Ingestion workers stopped")
+
         # Close database connections
         await engine.dispose()
         logger.info("Database connections closed")
 
         # Cleanup any other resources
-        # Add cleanup code for other services if needed
+        await jwks_verifier.stop()
+        await revocation_list.stop()
+        await redis_client.stop()
+        logger.info("Redis connections closed")
+        await storage_service.close()
+        await search_service.close()
+        logger.info("Object storage and Elasticsearch connections closed")
 
     except Exception as e:
         logger.error(f"Error during shutdown: {str(e)}", exc_info=True)
@@ -127,13 +151,20 @@ async def global_exception_handler(request: Request, exc: Exception):
 # Health check endpoint
 @app.get("/health")
 async def health_check():
+    redis_health = await redis_client.health()
     return {
-        "status": "healthy",
+        "status": "healthy" if redis_health["status"] == "healthy" else "degraded",
         "timestamp": datetime.now(),
-        "version": settings.VERSION
+        "version": settings.VERSION,
+        "redis": redis_health
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return registry.render()
+
+
 # Include routers
 app.include_router(
     document.router,
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, DateTime, Integer, String
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class Blob(Base):
+    """One stored copy of some content, shared by every document with that SHA-256.
+
+    ``ref_count`` is the number of documents pointing at it; the object in
+    storage, and what was derived from it (its search index entry, keyed
+    by ``id``), go when the last of them is deleted.
+    """
+    __tablename__ = "blobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    sha256 = Column(String(64), unique=True, index=True, nullable=False)
+    storage_key = Column(String, unique=True, nullable=False)
+    size = Column(Integer, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=1)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
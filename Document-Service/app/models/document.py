@@ -12,8 +12,10 @@ class Document(Base):
     filename = Column(String, index=True)
     file_type = Column(String)
     file_size = Column(Integer)
-    s3_key = Column(String, unique=True)
-    user_id = Column(Integer, ForeignKey("user.id"))
+    # Shared by documents with the same content (see Blob), so not unique
+    s3_key = Column(String)
+    content_hash = Column(String(64), index=True)
+    user_id = Column(Integer, ForeignKey("user.id"), index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -0,0 +1,40 @@
+from sqlalchemy import JSON, Column, DateTime, Index, Integer, String, Text
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+STAGES = ("parse", "chunk", "embed", "index")
+# What each stage leaves in storage for the next, under artifacts/<blob id>/
+ARTIFACTS = ("text.txt", "chunks.jsonl", "embeddings.jsonl")
+
+
+def artifact_key(blob_id: int, name: str) -> str:
+    return f"artifacts/{blob_id}/{name}"
+
+
+class IngestionJob(Base):
+    """A blob's way through the ingestion stages; the table is also the queue.
+
+    A job waits in ``stage`` with status "queued" until ``available_at``,
+    is leased by one worker ("running" until ``locked_until``, after which
+    another may take it over), and moves on to the next stage, or back to
+    "queued" with a later ``available_at`` to retry. It ends "done" after
+    the last stage or "failed" once out of attempts. ``timings`` holds the
+    seconds each stage took.
+    """
+    __tablename__ = "ingestion_jobs"
+    # What a worker's claim filters and orders by
+    __table_args__ = (Index("ix_ingestion_jobs_claim", "stage", "status", "available_at"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    blob_id = Column(Integer, unique=True, index=True, nullable=False)
+    content_type = Column(String, nullable=False)
+    stage = Column(String, nullable=False, default=STAGES[0])
+    status = Column(String, nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime(timezone=True), nullable=False)
+    locked_until = Column(DateTime(timezone=True))
+    last_error = Column(Text)
+    timings = Column(JSON, nullable=False, default=dict)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
 
 class DocumentBase(BaseModel):
     filename: str
@@ -13,8 +13,33 @@ class DocumentCreate(DocumentBase):
 class DocumentResponse(DocumentBase):
     id: int
     s3_key: str
+    content_hash: Optional[str] = None
     created_at: datetime
     updated_at: Optional[datetime]
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class DocumentListResponse(BaseModel):
+    items: List[DocumentResponse]
+    page: int
+    limit: int
+    total: int
+
+class UploadAcceptedResponse(BaseModel):
+    document: DocumentResponse
+    job_id: Optional[int]
+    status_url: str
+
+class IngestionStatusResponse(BaseModel):
+    document_id: int
+    job_id: Optional[int] = None
+    # parse, chunk, embed or index; None for documents from before jobs
+    stage: Optional[str] = None
+    # queued, running, done or failed
+    status: str
+    attempts: int = 0
+    last_error: Optional[str] = None
+    # Seconds taken by each finished stage
+    timings: Dict[str, float] = {}
+    updated_at: Optional[datetime] = None
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, UploadFile, File
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, UploadFile, File, Query, Request, Response
 from starlette.responses import JSONResponse
 
-from app.dependencies import get_db, get_current_user
+from app.dependencies import get_current_user, get_document_service
 from app.services.document_service import DocumentService
-from app.models.schemas import DocumentResponse
+from app.models.schemas import (DocumentResponse, DocumentListResponse, IngestionStatusResponse,
+                                UploadAcceptedResponse)
+from app.utils.http_cache import is_not_modified, make_etag, validator_headers
+
+# Lets callers (the gateway) learn the new document-set version without Redis
+DOCSET_VERSION_HEADER = "X-Docset-Version"
 
 router = APIRouter(
     responses={404:{"description":"Not Found"}}
@@ -14,31 +18,95 @@ router = APIRouter(
 async def foo():
     return JSONResponse({"message": "inside doc route"})
 
-@router.post("/upload", response_model=DocumentResponse)
+@router.post("/upload", response_model=UploadAcceptedResponse, status_code=202)
 async def upload_document(
+    request: Request,
+    response: Response,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    document_service: DocumentService = Depends(get_document_service),
     current_user_id: int = Depends(get_current_user)
 ):
-    document_service = DocumentService(db)
-    document = await document_service.upload_document(file, current_user_id)
-    return document
+    # Accepted once stored; it is parsed and indexed in the background,
+    # with progress at the status URL
+    document, job = await document_service.upload_document(file, current_user_id)
+    version = await document_service.bump_docset_version(current_user_id)
+    if version is not None:
+        response.headers[DOCSET_VERSION_HEADER] = str(version)
+    # A path, so it holds behind the gateway too
+    status_url = request.url_for("get_document_status", document_id=document.id).path
+    response.headers["Location"] = status_url
+    return UploadAcceptedResponse(document=document, job_id=job.id, status_url=status_url)
+
+@router.get("/", response_model=DocumentListResponse)
+async def list_documents(
+    request: Request,
+    response: Response,
+    page: int = Query(1, ge=1),
+    limit: int = Query(10, ge=1, le=100),
+    document_service: DocumentService = Depends(get_document_service),
+    current_user_id: int = Depends(get_current_user)
+):
+    # The ETag comes from a cheap aggregate, so a revalidation that ends in
+    # 304 never loads the rows. Deletes don't move a max timestamp, so the
+    # listing offers no Last-Modified and relies on the ETag alone.
+    total, newest_id, last_modified = await document_service.get_listing_state(current_user_id)
+    headers = validator_headers(
+        make_etag("list", current_user_id, page, limit, total, newest_id, last_modified))
+    if is_not_modified(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    documents = await document_service.list_documents(current_user_id, page, limit)
+    response.headers.update(headers)
+    return DocumentListResponse(items=documents, page=page, limit=limit, total=total)
 
 @router.get("/{document_id}", response_model=DocumentResponse)
 async def get_document(
     document_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    document_service: DocumentService = Depends(get_document_service),
+    current_user_id: int = Depends(get_current_user)
+):
+    document = await document_service.get_document(document_id, current_user_id)
+    last_modified = document.updated_at or document.created_at
+    headers = validator_headers(make_etag("doc", document.id, last_modified), last_modified)
+    if is_not_modified(request, headers["ETag"], last_modified):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return document
+
+@router.get("/{document_id}/status", response_model=IngestionStatusResponse)
+async def get_document_status(
+    document_id: int,
+    document_service: DocumentService = Depends(get_document_service),
     current_user_id: int = Depends(get_current_user)
 ):
-    document_service = DocumentService(db)
-    return await document_service.get_document(document_id, current_user_id)
+    document = await document_service.get_document(document_id, current_user_id)
+    job = await document_service.get_ingestion_job(document)
+    if job is None:
+        # Indexed at upload, before ingestion jobs
+        return IngestionStatusResponse(document_id=document.id, status="done")
+    return IngestionStatusResponse(
+        document_id=document.id,
+        job_id=job.id,
+        stage=job.stage,
+        status=job.status,
+        attempts=job.attempts,
+        last_error=job.last_error,
+        timings=job.timings or {},
+        updated_at=job.updated_at or job.created_at,
+    )
 
 @router.delete("/{document_id}")
 async def delete_document(
     document_id: int,
-    db: Session = Depends(get_db),
+    response: Response,
+    document_service: DocumentService = Depends(get_document_service),
     current_user_id: int = Depends(get_current_user)
 ):
-    document_service = DocumentService(db)
     await document_service.delete_document(document_id, current_user_id)
+    version = await document_service.bump_docset_version(current_user_id)
+    if version is not None:
+        response.headers[DOCSET_VERSION_HEADER] = str(version)
     return {"message": "Document deleted successfully"}
\ No newline at end of file
@@ -1,63 +1,205 @@
-from fastapi import UploadFile, HTTPException
-from sqlalchemy.orm import Session
-import boto3
-from elasticsearch import Elasticsearch
-import redis
+import json
+import os
+import uuid
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
 
-from app.models.document import Document, DocumentCreate
+from fastapi import UploadFile, HTTPException
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from redis import RedisError
+
+from app.models.blob import Blob
+from app.models.document import Document
+from app.models.ingestion import ARTIFACTS, IngestionJob, artifact_key
+from app.models.schemas import DocumentCreate
 from app.core.config import settings
-from app.services.storage_service import S3StorageService
+from app.core.database import dialect_insert
+from app.core.redis_client import RedisClient
+from app.services.ingestion_queue import JobQueue
+from app.services.storage_service import StorageBackend, StoredObject
 from app.services.search_service import ElasticsearchService
-from app.utils.file_processor import process_document
+from app.logger_config import setup_logger
+
+logger = setup_logger(__name__)
+
+UPLOAD_READ_SIZE = 1024 * 1024
+
+
+async def _read_upload(file: UploadFile) -> AsyncIterator[bytes]:
+    await file.seek(0)
+    while chunk := await file.read(UPLOAD_READ_SIZE):
+        yield chunk
+
+
+def search_key(blob_id: int) -> str:
+    # Index entries belong to the blob, shared by its documents
+    return f"blob:{blob_id}"
+
+
+async def bump_docset_version(redis: RedisClient, user_id: int) -> Optional[int]:
+    """
+    Increment the user's document-set version and announce it on
+    DOCSET_VERSION_CHANNEL so caches keyed by it (e.g. the gateway's RAG
+    answer cache) drop results computed over the old set of documents.
+    """
+    try:
+        version = await redis.execute("INCR", f"docset_version:{user_id}")
+        await redis.execute(
+            "PUBLISH",
+            settings.DOCSET_VERSION_CHANNEL,
+            json.dumps({"user_id": str(user_id), "version": version})
+        )
+        return version
+    except RedisError as e:
+        logger.error(f"Could not bump document-set version for user {user_id}: {str(e)}")
+        return None
 
 
 class DocumentService:
-    def __init__(self, db: Session):
+    """Per-request document operations.
+
+    Only the session belongs to the request; the storage, search and Redis
+    clients and the ingestion queue are the process-wide ones started in
+    the lifespan and passed in by the get_document_service dependency.
+    """
+
+    def __init__(self, db: AsyncSession, storage: StorageBackend, es: ElasticsearchService, redis: RedisClient,
+                 queue: JobQueue):
         self.db = db
-        self.s3 = S3StorageService()
-        self.es = ElasticsearchService()
-        self.redis = redis.Redis(
-            host=settings.REDIS_HOST,
-            port=settings.REDIS_PORT,
-            decode_responses=True
+        self.storage = storage
+        self.es = es
+        self.redis = redis
+        self.queue = queue
+
+    async def _claim_blob(self, stored: StoredObject) -> Blob:
+        """Record a newly stored blob, or reference the one stored by a concurrent upload."""
+        result = await self.db.execute(
+            dialect_insert(self.db, Blob)
+            .values(sha256=stored.sha256, storage_key=stored.key, size=stored.size, ref_count=1)
+            .on_conflict_do_update(index_elements=[Blob.sha256], set_={"ref_count": Blob.ref_count + 1})
+            .returning(Blob)
+        )
+        return result.scalar_one()
+
+    async def _release_blob(self, content_hash: str) -> Optional[Blob]:
+        """Drop a reference; returns the blob if that was the last one, and deletes its row."""
+        result = await self.db.execute(
+            update(Blob)
+            .where(Blob.sha256 == content_hash)
+            .values(ref_count=Blob.ref_count - 1)
+            .returning(Blob)
         )
+        blob = result.scalar_one_or_none()
+        if blob is None or blob.ref_count > 0:
+            return None
+        await self.db.execute(delete(Blob).where(Blob.id == blob.id))
+        return blob
 
-    async def upload_document(self, file: UploadFile, user_id: int) -> Document:
+    async def _remove_object(self, key: str) -> None:
         try:
-            # Process document using unstructured.io
-            processed_content = await process_document(file)
+            await self.storage.delete(key)
+        except Exception as e:
+            logger.error(f"Could not remove orphaned {key}: {str(e)}")
+
+    async def upload_document(self, file: UploadFile, user_id: int) -> Tuple[Document, IngestionJob]:
+        """Store an uploaded file and queue its ingestion, sharing the blob of identical content.
+
+        The upload is read once, on its way to storage, which takes its
+        SHA-256 as it goes. Deduplication happens afterwards: if a blob with
+        that hash is already recorded, the document references it and shares
+        its ingestion job and index entries, and the object just written is
+        deleted again. Parsing, chunking, embedding and indexing happen
+        later, in the ingestion workers, which read the blob from storage.
+        """
+        filename = os.path.basename(file.filename or "") or "document"
+        content_type = file.content_type or "application/octet-stream"
+        stored = None
+        try:
+            key = f"blobs/{uuid.uuid4().hex}"
+            stored = await self.storage.upload(key, _read_upload(file), content_type)
+            logger.info(f"Stored {key}: {stored.size} bytes, sha256 {stored.sha256}")
+            blob = await self._claim_blob(stored)
+            content_hash = stored.sha256
+            if blob.storage_key != stored.key:
+                logger.info(f"Upload {filename} duplicates blob {blob.id}, reusing it")
 
-            # Upload to S3
-            s3_key = await self.s3.upload_file(file)
+            # Queued in the same transaction, so a stored document always has a job
+            job = await self.queue.enqueue(self.db, blob.id, content_type)
 
             # Create document record
             doc = DocumentCreate(
-                filename=file.filename,
-                file_type=file.content_type,
-                file_size=file.size,
+                filename=filename,
+                file_type=content_type,
+                file_size=blob.size,
                 user_id=user_id
             )
 
-            db_document = Document(**doc.dict(), s3_key=s3_key)
+            db_document = Document(**doc.model_dump(), s3_key=blob.storage_key, content_hash=content_hash)
             self.db.add(db_document)
-            self.db.commit()
-            self.db.refresh(db_document)
-
-            # Index in Elasticsearch
-            await self.es.index_document(db_document.id, processed_content)
-
-            return db_document
+            await self.db.commit()
+            await self.db.refresh(db_document)
 
         except Exception as e:
             # Rollback in case of failure
-            self.db.rollback()
+            await self.db.rollback()
+            if stored is not None:
+                await self._remove_object(stored.key)
             raise HTTPException(status_code=500, detail=str(e))
 
+        if job.status == "queued":
+            self.queue.notify(job.stage)
+        if blob.storage_key != stored.key:
+            # The content was already stored, so this copy is redundant
+            await self._remove_object(stored.key)
+        return db_document, job
+
+    async def bump_docset_version(self, user_id: int) -> Optional[int]:
+        return await bump_docset_version(self.redis, user_id)
+
+    async def get_ingestion_job(self, document: Document) -> Optional[IngestionJob]:
+        if document.content_hash is None:
+            # Stored before ingestion jobs, and indexed at upload
+            return None
+        blob_id = await self.db.scalar(select(Blob.id).where(Blob.sha256 == document.content_hash))
+        if blob_id is None:
+            return None
+        return await self.queue.for_blob(self.db, blob_id)
+
+    async def list_documents(self, user_id: int, page: int, limit: int) -> List[Document]:
+        result = await self.db.execute(
+            select(Document)
+            .where(Document.user_id == user_id)
+            .order_by(Document.id.desc())
+            .offset((page - 1) * limit)
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+    async def get_listing_state(self, user_id: int) -> Tuple[int, Optional[int], Optional[datetime]]:
+        """Count, newest id and latest modification of a user's documents.
+
+        One aggregate over the user_id index; enough to tell whether any
+        listing page can have changed, without loading the rows.
+        """
+        result = await self.db.execute(
+            select(
+                func.count(Document.id),
+                func.max(Document.id),
+                func.max(func.coalesce(Document.updated_at, Document.created_at)),
+            ).where(Document.user_id == user_id)
+        )
+        count, max_id, last_modified = result.one()
+        return count, max_id, last_modified
+
     async def get_document(self, document_id: int, user_id: int) -> Document:
-        document = self.db.query(Document).filter(
-            Document.id == document_id,
-            Document.user_id == user_id
-        ).first()
+        result = await self.db.execute(
+            select(Document).where(
+                Document.id == document_id,
+                Document.user_id == user_id
+            )
+        )
+        document = result.scalar_one_or_none()
 
         if not document:
             raise HTTPException(status_code=404, detail="Document not found")
@@ -67,12 +209,28 @@ class DocumentService:
     async def delete_document(self, document_id: int, user_id: int):
         document = await self.get_document(document_id, user_id)
 
-        # Delete from S3
-        await self.s3.delete_file(document.s3_key)
-
-        # Delete from Elasticsearch
-        await self.es.delete_document(document_id)
-
-        # Delete from database
-        self.db.delete(document)
-        self.db.commit()
\ No newline at end of file
+        # Delete from database, releasing the document's blob reference
+        released = None
+        if document.content_hash is not None:
+            released = await self._release_blob(document.content_hash)
+            if released is not None:
+                await self.queue.remove(self.db, released.id)
+        await self.db.delete(document)
+        await self.db.commit()
+
+        # Then the stored file, what ingestion derived from it and its index
+        # entries, if nothing else uses them
+        if document.content_hash is None:
+            # Stored before deduplication: the file was the document's own
+            keys, doc_id = [document.s3_key], str(document.id)
+        elif released is not None:
+            keys = [released.storage_key] + [artifact_key(released.id, name) for name in ARTIFACTS]
+            doc_id = search_key(released.id)
+        else:
+            return
+        for key in keys:
+            await self._remove_object(key)
+        try:
+            await self.es.delete_document(doc_id)
+        except Exception as e:
+            logger.error(f"Could not remove index entries of {doc_id}: {str(e)}")
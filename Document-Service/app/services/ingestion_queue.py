@@ -0,0 +1,162 @@
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import SessionLocal, dialect_insert
+from app.models.ingestion import STAGES, IngestionJob
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class JobQueue:
+    """Durable queue of ingestion jobs, kept in the ingestion_jobs table.
+
+    A worker claims the next job of its stage with a single
+    ``UPDATE ... WHERE id = (SELECT ... FOR UPDATE SKIP LOCKED LIMIT 1)``,
+    so on PostgreSQL concurrent workers, in any process, each take a
+    different job without waiting on one another. SQLite, the local
+    stand-in, has no row locks and drops the clause, but it runs one write
+    at a time, so the statement is still an atomic claim.
+
+    A claim is a lease: a job still "running" after ``lease_seconds`` is
+    handed to the next worker that asks, so a crashed worker's jobs aren't
+    lost. Enqueueing also wakes this process's idle workers, which
+    otherwise poll.
+    """
+
+    def __init__(self, session_factory: Callable[[], AsyncSession], lease_seconds: int = 600,
+                 max_attempts: int = 5, retry_base_delay: float = 2.0, retry_max_delay: float = 300.0):
+        self.session_factory = session_factory
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.wakeups: Dict[str, asyncio.Event] = {stage: asyncio.Event() for stage in STAGES}
+
+    def notify(self, stage: str) -> None:
+        self.wakeups[stage].set()
+
+    async def enqueue(self, db: AsyncSession, blob_id: int, content_type: str) -> IngestionJob:
+        """Queue ``blob_id`` for ingestion in ``db``'s transaction.
+
+        A blob has one job however many documents share it, so this
+        returns the existing job if it already has one; if that one failed,
+        it is queued again at the stage it failed in.
+        """
+        now = utcnow()
+        result = await db.execute(
+            dialect_insert(db, IngestionJob)
+            .values(blob_id=blob_id, content_type=content_type, stage=STAGES[0], status="queued",
+                    attempts=0, available_at=now, timings={})
+            .on_conflict_do_update(
+                index_elements=[IngestionJob.blob_id],
+                set_={"status": "queued", "attempts": 0, "available_at": now},
+                where=IngestionJob.status == "failed",
+            )
+            .returning(IngestionJob)
+        )
+        job = result.scalar_one_or_none()
+        if job is None:
+            # Already there and not failed, so left alone
+            job = await self.for_blob(db, blob_id)
+        return job
+
+    @staticmethod
+    async def for_blob(db: AsyncSession, blob_id: int) -> Optional[IngestionJob]:
+        return await db.scalar(select(IngestionJob).where(IngestionJob.blob_id == blob_id))
+
+    @staticmethod
+    async def remove(db: AsyncSession, blob_id: int) -> None:
+        await db.execute(delete(IngestionJob).where(IngestionJob.blob_id == blob_id))
+
+    async def claim(self, stage: str) -> Optional[IngestionJob]:
+        now = utcnow()
+        candidate = (
+            select(IngestionJob.id)
+            .where(
+                IngestionJob.stage == stage,
+                or_(
+                    and_(IngestionJob.status == "queued", IngestionJob.available_at <= now),
+                    # Leased by a worker that never finished
+                    and_(IngestionJob.status == "running", IngestionJob.locked_until < now),
+                ),
+            )
+            .order_by(IngestionJob.available_at, IngestionJob.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        async with self.session_factory() as db:
+            result = await db.execute(
+                update(IngestionJob)
+                .where(IngestionJob.id == candidate)
+                .values(status="running", locked_until=now + timedelta(seconds=self.lease_seconds),
+                        attempts=IngestionJob.attempts + 1)
+                .returning(IngestionJob)
+                .execution_options(synchronize_session=False)
+            )
+            job = result.scalar_one_or_none()
+            await db.commit()
+            return job
+
+    async def _finish(self, job: IngestionJob, **values) -> bool:
+        # Only while our lease holds: a worker that took the job over has
+        # bumped attempts since
+        async with self.session_factory() as db:
+            result = await db.execute(
+                update(IngestionJob)
+                .where(IngestionJob.id == job.id, IngestionJob.stage == job.stage,
+                       IngestionJob.status == "running", IngestionJob.attempts == job.attempts)
+                .values(locked_until=None, **values)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            return result.rowcount > 0
+
+    async def advance(self, job: IngestionJob, elapsed: float) -> bool:
+        """Record the stage as done and queue the next; False if the job is no longer ours."""
+        index = STAGES.index(job.stage)
+        next_stage = STAGES[index + 1] if index + 1 < len(STAGES) else None
+        values = {"timings": {**(job.timings or {}), job.stage: round(elapsed, 3)},
+                  "attempts": 0, "last_error": None, "available_at": utcnow()}
+        if next_stage is None:
+            values["status"] = "done"
+        else:
+            values.update(stage=next_stage, status="queued")
+        if not await self._finish(job, **values):
+            return False
+        if next_stage is not None:
+            self.notify(next_stage)
+        return True
+
+    async def retry(self, job: IngestionJob, error: str) -> bool:
+        """Queue the stage again after a backoff; returns False once out of attempts."""
+        if job.attempts >= self.max_attempts:
+            await self._finish(job, status="failed", last_error=error)
+            return False
+        delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** (job.attempts - 1))
+        # Jittered, so jobs that failed together don't retry together
+        delay *= random.uniform(0.5, 1.0)
+        await self._finish(job, status="queued", last_error=error,
+                           available_at=utcnow() + timedelta(seconds=delay))
+        return True
+
+    async def release(self, job: IngestionJob) -> None:
+        """Hand an unfinished stage back without counting the attempt (e.g. on shutdown)."""
+        await self._finish(job, status="queued", attempts=job.attempts - 1, available_at=utcnow())
+
+
+job_queue = JobQueue(
+    SessionLocal,
+    settings.INGEST_LEASE_SECONDS,
+    settings.INGEST_MAX_ATTEMPTS,
+    settings.INGEST_RETRY_BASE_DELAY,
+    settings.INGEST_RETRY_MAX_DELAY,
+)
@@ -0,0 +1,243 @@
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List
+
+from docmind_common.metrics import registry
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.redis_client import RedisClient, redis_client
+from app.logger_config import setup_logger
+from app.models.blob import Blob
+from app.models.document import Document
+from app.models.ingestion import ARTIFACTS, STAGES, IngestionJob, artifact_key
+from app.services.document_service import bump_docset_version, search_key
+from app.services.ingestion_queue import JobQueue, job_queue
+from app.services.search_service import ElasticsearchService, search_service
+from app.services.storage_service import StorageBackend, storage_service
+from app.utils.chunking import chunk_stream
+from app.utils.embeddings import embed_text
+from app.utils.file_processor import DocumentExtractor, document_extractor
+from app.utils.streams import iter_lines, iter_text
+
+logger = setup_logger(__name__)
+
+ENCODE_SIZE = 1024 * 1024
+# Chunks embedded per worker-thread call, and indexed per bulk request
+EMBED_BATCH = 64
+INDEX_BATCH = 500
+
+stage_seconds = registry.histogram(
+    "ingestion_stage_seconds", "Time to run one ingestion stage for one blob, by stage",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300))
+jobs_total = registry.counter(
+    "ingestion_stage_runs_total", "Ingestion stage runs, by stage and outcome")
+
+
+class IngestionPipeline:
+    """Workers that take uploaded blobs through parse, chunk, embed and index.
+
+    Each stage has its own pool of ``workers[stage]`` tasks claiming jobs
+    of that stage from the queue, so a slow stage (embedding) can be given
+    more workers than a cheap one, or none in a process that shouldn't run
+    it. A stage reads what the one before left in storage and writes its
+    own artifact, so any worker, in any process, can pick up any job. A
+    stage that raises is retried with backoff by the queue.
+
+    Deleting the last document of a blob removes its job; a stage already
+    running for it finds the blob gone and cleans up after itself.
+    """
+
+    def __init__(self, queue: JobQueue, storage: StorageBackend, search: ElasticsearchService,
+                 redis: RedisClient, extractor: DocumentExtractor, workers: Dict[str, int],
+                 poll_interval: float = 1.0, chunk_size: int = 1000, chunk_overlap: int = 100,
+                 dimensions: int = 256):
+        self.queue = queue
+        self.storage = storage
+        self.search = search
+        self.redis = redis
+        self.extractor = extractor
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.dimensions = dimensions
+        self.stages: Dict[str, Callable[[IngestionJob, Blob], Awaitable[None]]] = {
+            "parse": self.parse,
+            "chunk": self.chunk,
+            "embed": self.embed,
+            "index": self.index,
+        }
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        for stage in STAGES:
+            for _ in range(self.workers.get(stage, 0)):
+                self._tasks.append(asyncio.create_task(self._work(stage)))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _work(self, stage: str) -> None:
+        wakeup = self.queue.wakeups[stage]
+        while True:
+            try:
+                job = await self.queue.claim(stage)
+            except Exception as e:
+                logger.error(f"Could not claim a {stage} job: {str(e)}")
+                job = None
+            if job is None:
+                # Enqueued here: woken at once; by another process: next poll
+                try:
+                    await asyncio.wait_for(wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                wakeup.clear()
+                continue
+            await self._run(job)
+
+    async def _run(self, job: IngestionJob) -> None:
+        start = time.perf_counter()
+        try:
+            async with self.queue.session_factory() as db:
+                blob = await db.get(Blob, job.blob_id)
+            if blob is not None:
+                await self.stages[job.stage](job, blob)
+        except asyncio.CancelledError:
+            await self.queue.release(job)
+            raise
+        except Exception as e:
+            retried = await self.queue.retry(job, f"{type(e).__name__}: {str(e)}")
+            jobs_total.inc(stage=job.stage, outcome="retried" if retried else "failed")
+            logger.error(f"Ingestion of blob {job.blob_id} failed at {job.stage} "
+                         f"(attempt {job.attempts}{', retrying' if retried else ', giving up'}): {str(e)}")
+            return
+
+        elapsed = time.perf_counter() - start
+        if blob is not None and await self.queue.advance(job, elapsed):
+            stage_seconds.observe(elapsed, stage=job.stage)
+            jobs_total.inc(stage=job.stage, outcome="done")
+            return
+        # The job was removed with the blob's last document while this ran
+        # (or its lease ran out and another worker has it)
+        async with self.queue.session_factory() as db:
+            if await db.get(Blob, job.blob_id) is None:
+                await self.discard(job.blob_id)
+                jobs_total.inc(stage=job.stage, outcome="discarded")
+
+    async def discard(self, blob_id: int) -> None:
+        """Remove whatever ingestion produced for a blob: its artifacts and index entries."""
+        for name in ARTIFACTS:
+            try:
+                await self.storage.delete(artifact_key(blob_id, name))
+            except Exception as e:
+                logger.error(f"Could not remove {artifact_key(blob_id, name)}: {str(e)}")
+        try:
+            await self.search.delete_document(search_key(blob_id))
+        except Exception as e:
+            logger.error(f"Could not remove index entries of blob {blob_id}: {str(e)}")
+
+    async def _write_lines(self, key: str, records: AsyncIterator[Dict[str, Any]]) -> None:
+        async def encoded() -> AsyncIterator[bytes]:
+            buffer = bytearray()
+            async for record in records:
+                buffer += json.dumps(record).encode() + b"\n"
+                if len(buffer) >= ENCODE_SIZE:
+                    yield bytes(buffer)
+                    buffer.clear()
+            if buffer:
+                yield bytes(buffer)
+
+        await self.storage.upload(key, encoded(), "application/x-ndjson")
+
+    async def _read_lines(self, key: str) -> AsyncIterator[Dict[str, Any]]:
+        async for line in iter_lines(self.storage.read(key)):
+            if line:
+                yield json.loads(line)
+
+    async def parse(self, job: IngestionJob, blob: Blob) -> None:
+        async def text() -> AsyncIterator[bytes]:
+            # Written out as it is extracted, a blank line between elements
+            buffer = bytearray()
+            async for element in self.extractor.extract(self.storage.read(blob.storage_key), job.content_type):
+                if element.text.strip():
+                    buffer += element.text.encode() + b"\n\n"
+                if len(buffer) >= ENCODE_SIZE:
+                    yield bytes(buffer)
+                    buffer.clear()
+            if buffer:
+                yield bytes(buffer)
+
+        await self.storage.upload(artifact_key(blob.id, "text.txt"), text(), "text/plain; charset=utf-8")
+
+    async def chunk(self, job: IngestionJob, blob: Blob) -> None:
+        async def chunks() -> AsyncIterator[Dict[str, Any]]:
+            # Streamed: only the text not yet cut into chunks is held
+            text = iter_text(self.storage.read(artifact_key(blob.id, "text.txt")))
+            n = 0
+            async for content in chunk_stream(text, self.chunk_size, self.chunk_overlap):
+                yield {"n": n, "content": content}
+                n += 1
+
+        await self._write_lines(artifact_key(blob.id, "chunks.jsonl"), chunks())
+
+    async def embed(self, job: IngestionJob, blob: Blob) -> None:
+        def embed_batch(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            return [{**chunk, "embedding": embed_text(chunk["content"], self.dimensions)} for chunk in batch]
+
+        async def embedded() -> AsyncIterator[Dict[str, Any]]:
+            batch: List[Dict[str, Any]] = []
+            async for chunk in self._read_lines(artifact_key(blob.id, "chunks.jsonl")):
+                batch.append(chunk)
+                if len(batch) == EMBED_BATCH:
+                    for record in await asyncio.to_thread(embed_batch, batch):
+                        yield record
+                    batch = []
+            if batch:
+                for record in await asyncio.to_thread(embed_batch, batch):
+                    yield record
+
+        await self._write_lines(artifact_key(blob.id, "embeddings.jsonl"), embedded())
+
+    async def index(self, job: IngestionJob, blob: Blob) -> None:
+        doc_key = search_key(blob.id)
+        batch: List[Dict[str, Any]] = []
+        async for chunk in self._read_lines(artifact_key(blob.id, "embeddings.jsonl")):
+            batch.append(chunk)
+            if len(batch) == INDEX_BATCH:
+                await self.search.index_chunks(doc_key, batch)
+                batch = []
+        if batch:
+            await self.search.index_chunks(doc_key, batch)
+
+        # The blob's documents are now searchable: caches over their owners'
+        # document sets are stale
+        async with self.queue.session_factory() as db:
+            owners = (await db.execute(
+                select(Document.user_id).where(Document.content_hash == blob.sha256).distinct()
+            )).scalars().all()
+        for user_id in owners:
+            await bump_docset_version(self.redis, user_id)
+
+
+ingestion_pipeline = IngestionPipeline(
+    job_queue,
+    storage_service,
+    search_service,
+    redis_client,
+    document_extractor,
+    workers={
+        "parse": settings.INGEST_PARSE_WORKERS,
+        "chunk": settings.INGEST_CHUNK_WORKERS,
+        "embed": settings.INGEST_EMBED_WORKERS,
+        "index": settings.INGEST_INDEX_WORKERS,
+    },
+    poll_interval=settings.INGEST_POLL_INTERVAL,
+    chunk_size=settings.INGEST_CHUNK_SIZE,
+    chunk_overlap=settings.INGEST_CHUNK_OVERLAP,
+    dimensions=settings.INGEST_EMBEDDING_DIMENSIONS,
+)
@@ -1,3 +1,89 @@
+from typing import Any, Dict, List
+
+from app.core.config import settings
+from app.logger_config import setup_logger
+
+logger = setup_logger(__name__)
+
+
 class ElasticsearchService:
-    async def initialize(self):
-        pass
\ No newline at end of file
+    """Document chunks and their embeddings in an Elasticsearch index.
+
+    One AsyncElasticsearch client, and so one connection pool, is created by
+    initialize() at startup and shared by every request. A ready-made client
+    can be passed in instead, e.g. a stand-in for benchmarks. Each chunk is
+    its own entry, "<doc_key>:<n>", carrying ``doc`` so a document's
+    chunks can be found and removed together.
+    """
+
+    def __init__(self, host: str, port: int, index: str = "documents", dimensions: int = 256):
+        self.url = f"http://{host}:{port}"
+        self.index = index
+        self.dimensions = dimensions
+        self._client: Any = None
+        self._index_ready = False
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            raise RuntimeError("ElasticsearchService used before initialize()")
+        return self._client
+
+    async def initialize(self, client: Any = None) -> None:
+        if self._client is not None:
+            return
+        if client is None:
+            from elasticsearch import AsyncElasticsearch
+
+            client = AsyncElasticsearch(self.url)
+        self._client = client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    async def _ensure_index(self) -> None:
+        if self._index_ready:
+            return
+        # 400 is "already exists", e.g. created by another process
+        await self.client.options(ignore_status=400).indices.create(index=self.index, mappings={
+            "properties": {
+                "doc": {"type": "keyword"},
+                "chunk": {"type": "integer"},
+                "content": {"type": "text"},
+                "embedding": {"type": "dense_vector", "dims": self.dimensions},
+            }
+        })
+        self._index_ready = True
+
+    async def index_chunks(self, doc_key: str, chunks: List[Dict[str, Any]]) -> None:
+        """Index (or overwrite) a batch of a document's chunks in one bulk request.
+
+        Each chunk has ``n``, ``content`` and ``embedding``.
+        """
+        await self._ensure_index()
+        operations: List[Dict[str, Any]] = []
+        for chunk in chunks:
+            operations.append({"index": {"_index": self.index, "_id": f"{doc_key}:{chunk['n']}"}})
+            operations.append({"doc": doc_key, "chunk": chunk["n"], "content": chunk["content"],
+                               "embedding": chunk["embedding"]})
+        response = await self.client.bulk(operations=operations)
+        if response.get("errors"):
+            failed = next(item["index"]["error"] for item in response["items"] if "error" in item["index"])
+            raise RuntimeError(f"Indexing chunks of {doc_key} failed: {failed}")
+
+    async def delete_document(self, doc_key: str) -> None:
+        # Its chunks, or the single entry with that ID written before
+        # documents were chunked. Already gone (or never indexed) is fine.
+        await self.client.options(ignore_status=404).delete_by_query(
+            index=self.index,
+            query={"bool": {"should": [{"term": {"doc": doc_key}}, {"ids": {"values": [doc_key]}}]}},
+        )
+
+
+search_service = ElasticsearchService(
+    settings.ELASTICSEARCH_HOST,
+    settings.ELASTICSEARCH_PORT,
+    dimensions=settings.INGEST_EMBEDDING_DIMENSIONS,
+)
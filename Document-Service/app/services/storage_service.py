@@ -1,3 +1,284 @@
-class S3StorageService:
-    async def initialize(self):
-        pass
\ No newline at end of file
+import asyncio
+import hashlib
+import os
+import uuid
+from typing import Any, AsyncIterator, Awaitable, Callable, List, NamedTuple, Optional
+
+from app.core.config import settings
+from app.logger_config import setup_logger
+from app.utils.streams import fixed_parts, next_chunk
+
+logger = setup_logger(__name__)
+
+READ_CHUNK_SIZE = 1024 * 1024
+# S3 rejects multipart uploads with smaller parts (bar the last)
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class StoredObject(NamedTuple):
+    key: str
+    size: int
+    sha256: str
+
+
+class StorageBackend:
+    """Where document files live.
+
+    upload() takes the file as a stream of chunks and writes it in parts of
+    ``part_size``, up to ``concurrency`` parts at a time, hashing and
+    counting the bytes on the way through. At most ``concurrency`` parts
+    are in memory however large the file, since the next part isn't read
+    until one of them has been written.
+    """
+
+    def __init__(self, part_size: int, concurrency: int):
+        self.part_size = part_size
+        self.concurrency = max(1, concurrency)
+
+    async def initialize(self, client: Any = None) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def upload(self, key: str, chunks: AsyncIterator[bytes],
+                     content_type: Optional[str] = None) -> StoredObject:
+        digest = hashlib.sha256()
+        size = 0
+
+        async def measured() -> AsyncIterator[bytes]:
+            nonlocal size
+            async for part in fixed_parts(chunks, self.part_size):
+                # hashlib drops the GIL on large buffers, so this overlaps the writes
+                await asyncio.to_thread(digest.update, part)
+                size += len(part)
+                yield part
+
+        await self._write(key, measured(), content_type or "application/octet-stream")
+        return StoredObject(key, size, digest.hexdigest())
+
+    async def _write_parts(self, parts: AsyncIterator[bytes],
+                           write_part: Callable[[int, bytes], Awaitable[Any]]) -> List[Any]:
+        """Run write_part(number, part) for every part, numbered from 1, ``concurrency`` at a time."""
+        slots = asyncio.Semaphore(self.concurrency)
+        tasks: List[asyncio.Task] = []
+
+        async def write(number: int, part: bytes) -> Any:
+            try:
+                return await write_part(number, part)
+            finally:
+                slots.release()
+
+        try:
+            number = 0
+            async for part in parts:
+                await slots.acquire()
+                failed = next((task for task in tasks if task.done() and task.exception()), None)
+                if failed is not None:
+                    slots.release()
+                    raise failed.exception()
+                number += 1
+                tasks.append(asyncio.create_task(write(number, part)))
+                del part
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    async def _write(self, key: str, parts: AsyncIterator[bytes], content_type: str) -> None:
+        raise NotImplementedError
+
+    def read(self, key: str) -> AsyncIterator[bytes]:
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+
+class S3StorageBackend(StorageBackend):
+    """Document files in an S3 bucket, or any S3-compatible store (MinIO) via ``endpoint_url``.
+
+    One boto3 client (thread-safe, with its own connection pool) is created
+    by initialize() at startup and shared by every request; its blocking
+    calls run in worker threads. Files of more than one part go up as a
+    multipart upload, which is aborted if any part fails. A ready-made
+    client can be passed in instead, e.g. a stand-in for benchmarks.
+    """
+
+    def __init__(self, bucket: str, region: Optional[str] = None,
+                 access_key_id: Optional[str] = None, secret_access_key: Optional[str] = None,
+                 endpoint_url: Optional[str] = None, part_size: int = 8 * 1024 * 1024,
+                 concurrency: int = 4):
+        if part_size < S3_MIN_PART_SIZE:
+            raise ValueError(f"S3 multipart parts must be at least {S3_MIN_PART_SIZE} bytes")
+        super().__init__(part_size, concurrency)
+        self.bucket = bucket
+        self.region = region
+        self.access_key_id = access_key_id
+        self.secret_access_key = secret_access_key
+        self.endpoint_url = endpoint_url
+        self._client: Any = None
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            raise RuntimeError("S3StorageBackend used before initialize()")
+        return self._client
+
+    async def initialize(self, client: Any = None) -> None:
+        if self._client is not None:
+            return
+        if client is None:
+            import boto3
+            from botocore.config import Config
+
+            client = boto3.client(
+                "s3",
+                region_name=self.region,
+                endpoint_url=self.endpoint_url,
+                aws_access_key_id=self.access_key_id,
+                aws_secret_access_key=self.secret_access_key,
+                # Enough pooled connections for every concurrent part
+                config=Config(max_pool_connections=max(10, self.concurrency * 4)),
+            )
+        self._client = client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            close = getattr(self._client, "close", None)
+            if close is not None:
+                close()
+            self._client = None
+
+    async def _write(self, key: str, parts: AsyncIterator[bytes], content_type: str) -> None:
+        first = await next_chunk(parts, b"")
+        second = await next_chunk(parts)
+        if second is None:
+            # A single part: one PUT, no multipart bookkeeping
+            await asyncio.to_thread(self.client.put_object, Bucket=self.bucket, Key=key,
+                                    Body=first, ContentType=content_type)
+            return
+
+        head = [first, second]
+        del first, second
+
+        async def all_parts() -> AsyncIterator[bytes]:
+            # Popped, so no reference outlives the upload of its part
+            while head:
+                yield head.pop(0)
+            async for part in parts:
+                yield part
+
+        upload = await asyncio.to_thread(self.client.create_multipart_upload, Bucket=self.bucket,
+                                         Key=key, ContentType=content_type)
+        upload_id = upload["UploadId"]
+
+        async def write_part(number: int, part: bytes) -> dict:
+            response = await asyncio.to_thread(self.client.upload_part, Bucket=self.bucket, Key=key,
+                                               UploadId=upload_id, PartNumber=number, Body=part)
+            return {"PartNumber": number, "ETag": response["ETag"]}
+
+        try:
+            uploaded = await self._write_parts(all_parts(), write_part)
+            await asyncio.to_thread(self.client.complete_multipart_upload, Bucket=self.bucket, Key=key,
+                                    UploadId=upload_id, MultipartUpload={"Parts": uploaded})
+        except BaseException:
+            # Otherwise the parts already sent are kept (and billed) indefinitely
+            try:
+                await asyncio.to_thread(self.client.abort_multipart_upload, Bucket=self.bucket,
+                                        Key=key, UploadId=upload_id)
+            except Exception as e:
+                logger.error(f"Could not abort multipart upload of {key}: {str(e)}")
+            raise
+
+    async def read(self, key: str) -> AsyncIterator[bytes]:
+        response = await asyncio.to_thread(self.client.get_object, Bucket=self.bucket, Key=key)
+        body = response["Body"]
+        try:
+            while chunk := await asyncio.to_thread(body.read, READ_CHUNK_SIZE):
+                yield chunk
+        finally:
+            body.close()
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self.client.delete_object, Bucket=self.bucket, Key=key)
+
+
+class LocalStorageBackend(StorageBackend):
+    """Document files under a local directory, for development and tests.
+
+    Parts are written concurrently at their offsets in a temporary file,
+    which is renamed into place once complete, so a reader never sees a
+    partial file, much like an S3 multipart upload.
+    """
+
+    def __init__(self, root: str, part_size: int = 8 * 1024 * 1024, concurrency: int = 4):
+        super().__init__(part_size, concurrency)
+        self.root = os.path.abspath(root)
+
+    def path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Storage key escapes the storage root: {key}")
+        return path
+
+    async def initialize(self, client: Any = None) -> None:
+        await asyncio.to_thread(os.makedirs, self.root, exist_ok=True)
+
+    async def _write(self, key: str, parts: AsyncIterator[bytes], content_type: str) -> None:
+        path = self.path(key)
+        await asyncio.to_thread(os.makedirs, os.path.dirname(path), exist_ok=True)
+        partial = f"{path}.{uuid.uuid4().hex}.partial"
+        fd = await asyncio.to_thread(os.open, partial, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+
+        async def write_part(number: int, part: bytes) -> None:
+            await asyncio.to_thread(os.pwrite, fd, part, (number - 1) * self.part_size)
+
+        try:
+            await self._write_parts(parts, write_part)
+            await asyncio.to_thread(os.fsync, fd)
+        except BaseException:
+            os.close(fd)
+            await asyncio.to_thread(os.remove, partial)
+            raise
+        os.close(fd)
+        await asyncio.to_thread(os.replace, partial, path)
+
+    async def read(self, key: str) -> AsyncIterator[bytes]:
+        f = await asyncio.to_thread(open, self.path(key), "rb")
+        try:
+            while chunk := await asyncio.to_thread(f.read, READ_CHUNK_SIZE):
+                yield chunk
+        finally:
+            f.close()
+
+    async def delete(self, key: str) -> None:
+        try:
+            await asyncio.to_thread(os.remove, self.path(key))
+        except FileNotFoundError:
+            pass
+
+
+def create_storage_backend() -> StorageBackend:
+    if settings.STORAGE_BACKEND == "local":
+        return LocalStorageBackend(
+            settings.STORAGE_LOCAL_ROOT,
+            settings.STORAGE_PART_SIZE,
+            settings.STORAGE_UPLOAD_CONCURRENCY,
+        )
+    if settings.STORAGE_BACKEND == "s3":
+        return S3StorageBackend(
+            settings.AWS_BUCKET_NAME,
+            settings.AWS_REGION,
+            settings.AWS_ACCESS_KEY_ID,
+            settings.AWS_SECRET_ACCESS_KEY,
+            settings.S3_ENDPOINT_URL,
+            settings.STORAGE_PART_SIZE,
+            settings.STORAGE_UPLOAD_CONCURRENCY,
+        )
+    raise ValueError(f"Unknown storage backend '{settings.STORAGE_BACKEND}'")
+
+
+storage_service = create_storage_backend()
@@ -0,0 +1,63 @@
+import re
+from typing import AsyncIterator, Iterator
+
+_BREAKS = (re.compile(r"\n\s*\n"), re.compile(r"(?<=[.!?])\s+"), re.compile(r"\s+"))
+
+
+def _chunk_end(text: str, start: int, size: int, overlap: int) -> int:
+    """Where the chunk starting at ``start`` ends, given more than ``size`` characters from there."""
+    window = text[start:start + size]
+    for pattern in _BREAKS:
+        cut = None
+        for match in pattern.finditer(window, overlap + 1):
+            cut = match.start()
+        if cut is not None:
+            return start + cut
+    return start + size
+
+
+def chunk_text(text: str, size: int, overlap: int = 0) -> Iterator[str]:
+    """Split text into chunks of at most ``size`` characters for embedding.
+
+    Each chunk ends at the last paragraph break in its window, failing that
+    the last sentence end, then the last whitespace, and only cuts a word
+    when there is none. The next chunk starts ``overlap`` characters before
+    the end of this one, so a passage cut at a boundary is whole in one of
+    them.
+    """
+    if overlap >= size:
+        raise ValueError("Chunk overlap must be smaller than the chunk size")
+    start = 0
+    while start < len(text):
+        end = _chunk_end(text, start, size, overlap) if start + size < len(text) else len(text)
+        chunk = text[start:end].strip()
+        if chunk:
+            yield chunk
+        if end == len(text):
+            return
+        start = max(end - overlap, start + 1)
+
+
+async def chunk_stream(parts: AsyncIterator[str], size: int, overlap: int = 0) -> AsyncIterator[str]:
+    """chunk_text() over text arriving in parts, holding little more than a part at a time.
+
+    A chunk is cut once its whole window has arrived, so the chunks are
+    the same as chunk_text() gives for the joined text; what is left after
+    the last cut (the overlap, and anything short of a full window) is
+    carried over to the next part.
+    """
+    if overlap >= size:
+        raise ValueError("Chunk overlap must be smaller than the chunk size")
+    text = ""
+    async for part in parts:
+        text += part
+        start = 0
+        while start + size < len(text):
+            end = _chunk_end(text, start, size, overlap)
+            chunk = text[start:end].strip()
+            if chunk:
+                yield chunk
+            start = max(end - overlap, start + 1)
+        text = text[start:]
+    for chunk in chunk_text(text, size, overlap):
+        yield chunk
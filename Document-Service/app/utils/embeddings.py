@@ -0,0 +1,21 @@
+import hashlib
+import math
+import re
+from typing import List
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def embed_text(text: str, dimensions: int) -> List[float]:
+    """A unit-length hashed bag-of-words vector for ``text``.
+
+    Each lower-cased token adds +1 or -1 (by its hash) to one of
+    ``dimensions`` buckets, so texts sharing words point the same way.
+    A stand-in until the service is wired to an embedding model.
+    """
+    vector = [0.0] * dimensions
+    for token in _TOKEN.findall(text.lower()):
+        digest = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "big")
+        vector[digest % dimensions] += 1.0 if digest >> 63 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector))
+    return [v / norm for v in vector] if norm else vector
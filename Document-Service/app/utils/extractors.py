@@ -0,0 +1,232 @@
+"""
+Text extractors, one per document format, and the entry point of the
+processes they run in.
+
+An extractor takes the path of a document and yields its text as
+Elements, one per page, slide, paragraph, row or block as the format
+has them, so a large document never has to be held as one string.
+Extractors are registered per media type with @extractor. The libraries
+for PDF, DOCX and PPTX are optional and imported when first needed;
+CSV, HTML and plain text need only the standard library.
+
+This module is what the extraction processes import, so it must not
+import the application (its settings, database or clients).
+"""
+import codecs
+import csv
+from html.parser import HTMLParser
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional
+
+# Flushed to the parent at about this much text
+BATCH_BYTES = 64 * 1024
+TEXT_READ_SIZE = 64 * 1024
+TEXT_SECTION_SIZE = 16 * 1024
+
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+PPTX_TYPE = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+
+
+class Element(NamedTuple):
+    # page, slide, paragraph, row, block or section
+    kind: str
+    # 1-based position among the document's elements of that kind
+    number: int
+    text: str
+
+
+Extractor = Callable[[str], Iterator[Element]]
+
+EXTRACTORS: Dict[str, Extractor] = {}
+
+
+def extractor(*media_types: str) -> Callable[[Extractor], Extractor]:
+    def register(fn: Extractor) -> Extractor:
+        for media_type in media_types:
+            EXTRACTORS[media_type] = fn
+        return fn
+    return register
+
+
+def media_type_of(content_type: Optional[str]) -> str:
+    return (content_type or "").split(";")[0].strip().lower()
+
+
+def _optional(module: str, package: str):
+    try:
+        return __import__(module, fromlist=["_"])
+    except ImportError:
+        raise ImportError(f"Extracting this format needs the {package} package") from None
+
+
+@extractor("text/plain", "text/markdown")
+def extract_text(path: str) -> Iterator[Element]:
+    # Sections of about TEXT_SECTION_SIZE, cut at line ends
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    number = 0
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(TEXT_READ_SIZE)
+            pending += decoder.decode(block, final=not block)
+            while len(pending) >= TEXT_SECTION_SIZE or (not block and pending):
+                cut = len(pending)
+                if cut > TEXT_SECTION_SIZE:
+                    cut = pending.rfind("\n", 0, TEXT_SECTION_SIZE) + 1 or TEXT_SECTION_SIZE
+                number += 1
+                yield Element("section", number, pending[:cut])
+                pending = pending[cut:]
+            if not block:
+                return
+
+
+@extractor("text/csv")
+def extract_csv(path: str) -> Iterator[Element]:
+    # A row per element, each value labelled with its column
+    with open(path, newline="", encoding="utf-8", errors="replace") as f:
+        rows = csv.reader(f)
+        header = next(rows, None)
+        if header is None:
+            return
+        for number, row in enumerate(rows, 1):
+            text = "; ".join(f"{name}: {value}" for name, value in zip(header, row) if value)
+            yield Element("row", number, text)
+
+
+class _BlockParser(HTMLParser):
+    """Collects the text of an HTML document block by block, skipping scripts and styles."""
+
+    BLOCKS = {"p", "div", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "pre",
+              "blockquote", "section", "article", "header", "footer", "td", "th", "br", "title"}
+    SKIPPED = {"script", "style", "noscript", "template"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks: List[str] = []
+        self._text: List[str] = []
+        self._skipping = 0
+
+    def _end_block(self) -> None:
+        text = " ".join("".join(self._text).split())
+        if text:
+            self.blocks.append(text)
+        self._text = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED:
+            self._skipping += 1
+        elif tag in self.BLOCKS:
+            self._end_block()
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED:
+            self._skipping = max(0, self._skipping - 1)
+        elif tag in self.BLOCKS:
+            self._end_block()
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self._text.append(data)
+
+    def close(self):
+        super().close()
+        self._end_block()
+
+
+@extractor("text/html", "application/xhtml+xml")
+def extract_html(path: str) -> Iterator[Element]:
+    parser = _BlockParser()
+    number = 0
+    with open(path, encoding="utf-8", errors="replace") as f:
+        while True:
+            data = f.read(TEXT_READ_SIZE)
+            if data:
+                parser.feed(data)
+            else:
+                parser.close()
+            for text in parser.blocks:
+                number += 1
+                yield Element("block", number, text)
+            parser.blocks.clear()
+            if not data:
+                return
+
+
+@extractor("application/pdf")
+def extract_pdf(path: str) -> Iterator[Element]:
+    pypdf = _optional("pypdf", "pypdf")
+    reader = pypdf.PdfReader(path)
+    for number, page in enumerate(reader.pages, 1):
+        yield Element("page", number, page.extract_text() or "")
+
+
+@extractor(DOCX_TYPE)
+def extract_docx(path: str) -> Iterator[Element]:
+    docx = _optional("docx", "python-docx")
+    from docx.table import Table
+    from docx.text.paragraph import Paragraph
+
+    document = docx.Document(path)
+    paragraphs = rows = 0
+    # Body order, so table rows stay between the paragraphs around them
+    for child in document.element.body.iterchildren():
+        tag = child.tag.rsplit("}", 1)[-1]
+        if tag == "p":
+            text = Paragraph(child, document).text
+            if text.strip():
+                paragraphs += 1
+                yield Element("paragraph", paragraphs, text)
+        elif tag == "tbl":
+            for row in Table(child, document).rows:
+                text = " | ".join(cell.text for cell in row.cells)
+                if text.strip(" |"):
+                    rows += 1
+                    yield Element("row", rows, text)
+
+
+@extractor(PPTX_TYPE)
+def extract_pptx(path: str) -> Iterator[Element]:
+    pptx = _optional("pptx", "python-pptx")
+    presentation = pptx.Presentation(path)
+    for number, slide in enumerate(presentation.slides, 1):
+        texts = []
+        for shape in slide.shapes:
+            if shape.has_text_frame:
+                texts.append(shape.text_frame.text)
+            elif getattr(shape, "has_table", False):
+                texts.extend(" | ".join(cell.text for cell in row.cells) for row in shape.table.rows)
+        if slide.has_notes_slide:
+            texts.append(slide.notes_slide.notes_text_frame.text)
+        yield Element("slide", number, "\n".join(text for text in texts if text.strip()))
+
+
+def run_extractor(path: str, media_type: str, conn, memory_limit: Optional[int]) -> None:
+    """Extract ``path`` in this (child) process, sending batches of elements over ``conn``.
+
+    Sends ("elements", [...]) as each batch of about BATCH_BYTES fills,
+    then ("done", None), or ("error", message) if extraction fails. Sends
+    block while the pipe is full, so the child runs no further ahead of
+    the parent than that. ``memory_limit`` caps this process's address
+    space, so a document that needs more fails with MemoryError instead of
+    taking the service down.
+    """
+    try:
+        if memory_limit:
+            import resource
+
+            resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+        batch: List[tuple] = []
+        size = 0
+        for element in EXTRACTORS[media_type](path):
+            batch.append(tuple(element))
+            size += len(element.text)
+            if size >= BATCH_BYTES:
+                conn.send(("elements", batch))
+                batch, size = [], 0
+        conn.send(("elements", batch))
+        conn.send(("done", None))
+    except MemoryError:
+        conn.send(("error", f"MemoryError: needed more than {memory_limit} bytes"))
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {str(e)}"))
+    finally:
+        conn.close()
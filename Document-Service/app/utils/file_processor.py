@@ -1,3 +1,114 @@
-# Process document using unstructured.io
-def process_document():
-    return None
\ No newline at end of file
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+from typing import AsyncIterator, Optional
+
+from app.core.config import settings
+from app.utils.extractors import EXTRACTORS, Element, media_type_of, run_extractor
+
+
+class ExtractionError(Exception):
+    pass
+
+
+class ExtractionTimeout(ExtractionError):
+    pass
+
+
+def _receive(conn, timeout: float):
+    # Waits in a worker thread, so the event loop never blocks on the pipe
+    if not conn.poll(timeout):
+        raise TimeoutError
+    try:
+        return conn.recv()
+    except EOFError:
+        return None
+
+
+class DocumentExtractor:
+    """Extracts documents' text in separate processes, streaming it back as Elements.
+
+    Each document gets a process of its own, forked from a forkserver that
+    has already imported the extractors, with at most ``max_workers`` of
+    them at a time. Parsing never blocks the event loop or holds the GIL
+    of the service, and a document that hangs or needs too much memory
+    costs only its own process: it is killed after ``timeout`` seconds,
+    and its address space is capped at ``memory_limit`` bytes.
+
+    The process sends elements back in small batches as it goes, and
+    can't get more than a pipe's worth ahead of the reader, so a large
+    document is never held in memory as a whole on either side.
+    """
+
+    def __init__(self, max_workers: int = 2, timeout: float = 120.0, memory_limit: Optional[int] = None):
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self._slots = asyncio.Semaphore(self.max_workers)
+        self._context = multiprocessing.get_context("forkserver")
+        self._context.set_forkserver_preload(["app.utils.extractors"])
+
+    @staticmethod
+    def supports(content_type: Optional[str]) -> bool:
+        return media_type_of(content_type) in EXTRACTORS
+
+    async def extract(self, chunks: AsyncIterator[bytes], content_type: Optional[str]) -> AsyncIterator[Element]:
+        """Yield the text of the document streamed in ``chunks``, element by element.
+
+        Formats without an extractor yield nothing. Raises ExtractionError
+        (ExtractionTimeout for the time limit) if extraction fails.
+        """
+        media_type = media_type_of(content_type)
+        if media_type not in EXTRACTORS:
+            return
+        # Parsers need a seekable file; the document goes to disk, not memory
+        fd, path = tempfile.mkstemp(prefix="extract-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                async for chunk in chunks:
+                    await asyncio.to_thread(f.write, chunk)
+            async with self._slots:
+                async for element in self._run(path, media_type):
+                    yield element
+        finally:
+            os.remove(path)
+
+    async def _run(self, path: str, media_type: str) -> AsyncIterator[Element]:
+        receiver, sender = self._context.Pipe(duplex=False)
+        process = self._context.Process(target=run_extractor,
+                                        args=(path, media_type, sender, self.memory_limit), daemon=True)
+        await asyncio.to_thread(process.start)
+        sender.close()
+        deadline = time.monotonic() + self.timeout
+        try:
+            while True:
+                try:
+                    message = await asyncio.to_thread(_receive, receiver, max(0.0, deadline - time.monotonic()))
+                except TimeoutError:
+                    raise ExtractionTimeout(f"Extraction took longer than {self.timeout:g}s") from None
+                if message is None:
+                    # Died without a word, e.g. killed for memory by the kernel
+                    await asyncio.to_thread(process.join)
+                    raise ExtractionError(f"Extraction process exited with code {process.exitcode}")
+                kind, payload = message
+                if kind == "done":
+                    return
+                if kind == "error":
+                    raise ExtractionError(payload)
+                for element in payload:
+                    yield Element(*element)
+        finally:
+            # Also when the reader stops early or times out
+            if process.is_alive():
+                process.kill()
+            await asyncio.to_thread(process.join)
+            receiver.close()
+
+
+document_extractor = DocumentExtractor(
+    settings.EXTRACT_WORKERS,
+    settings.EXTRACT_TIMEOUT,
+    settings.EXTRACT_MEMORY_LIMIT_MB * 1024 * 1024 if settings.EXTRACT_MEMORY_LIMIT_MB else None,
+)
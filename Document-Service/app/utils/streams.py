@@ -0,0 +1,46 @@
+import codecs
+from typing import Any, AsyncIterator
+
+
+async def next_chunk(chunks: AsyncIterator[bytes], default: Any = None) -> Any:
+    """The stream's next chunk, or ``default`` once it is exhausted (anext() before Python 3.10)."""
+    try:
+        return await chunks.__anext__()
+    except StopAsyncIteration:
+        return default
+
+
+async def fixed_parts(chunks: AsyncIterator[bytes], part_size: int) -> AsyncIterator[bytes]:
+    """Regroup a byte stream into parts of exactly ``part_size`` (the last may be shorter)."""
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer += chunk
+        while len(buffer) >= part_size:
+            yield bytes(buffer[:part_size])
+            del buffer[:part_size]
+    if buffer:
+        yield bytes(buffer)
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Split a byte stream into lines, without their newlines."""
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer += chunk
+        start = 0
+        while (end := buffer.find(b"\n", start)) != -1:
+            yield bytes(buffer[start:end])
+            start = end + 1
+        del buffer[:start]
+    if buffer:
+        yield bytes(buffer)
+
+
+async def iter_text(chunks: AsyncIterator[bytes], encoding: str = "utf-8") -> AsyncIterator[str]:
+    """Decode a byte stream incrementally, so no character is split between chunks."""
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    async for chunk in chunks:
+        if text := decoder.decode(chunk):
+            yield text
+    if text := decoder.decode(b"", final=True):
+        yield text
@@ -0,0 +1,170 @@
+"""
+GET and DELETE /documents/{id} throughput and latency under concurrency.
+
+Seeds ``--documents`` rows for ``--users`` users in a throwaway aiosqlite
+database, then fetches every document, ``--concurrency`` requests at a
+time, through the ASGI app, and deletes them all the same way. Files go
+to the local storage backend in a temporary directory, Elasticsearch is an
+in-memory stand-in handed to the shared client before startup, and tokens
+are signed with a local key installed in the JWKS verifier. Uses the Redis
+at REDIS_URL or a fakeredis TCP stand-in.
+
+    python -m benchmarks.bench_documents --documents 5000 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Dict, List
+
+
+def start_stand_in(port: int) -> str:
+    from fakeredis import TcpFakeServer
+
+    class StandIn(TcpFakeServer):
+        def get_request(self):
+            # Like Redis itself; otherwise Nagle stalls every pipelined reply
+            conn, addr = super().get_request()
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            return conn, addr
+
+    server = StandIn(("127.0.0.1", port), server_type="redis")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"redis://127.0.0.1:{port}/0"
+
+
+def percentile(values: List[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] * 1000 if values else 0.0
+
+
+class ElasticsearchStandIn:
+    def __init__(self):
+        self.documents: Dict[str, dict] = {}
+        self.indices = self
+
+    def options(self, **kwargs):
+        return self
+
+    async def create(self, index: str, **kwargs):
+        pass
+
+    async def bulk(self, operations: List[dict]):
+        for action, document in zip(operations[::2], operations[1::2]):
+            self.documents[action["index"]["_id"]] = document
+        return {"errors": False, "items": []}
+
+    async def delete_by_query(self, index: str, query: dict):
+        term, ids = query["bool"]["should"]
+        doc_key = term["term"]["doc"]
+        for id in [id for id, document in self.documents.items()
+                   if document.get("doc") == doc_key or id in ids["ids"]["values"]]:
+            del self.documents[id]
+
+    async def close(self):
+        pass
+
+
+def signer():
+    """A private key for signing tokens, and its public half as a PyJWK."""
+    import jwt
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+
+    private_key = Ed25519PrivateKey.generate()
+    jwk = jwt.algorithms.OKPAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+    return private_key, jwt.PyJWK({**jwk, "kid": "bench", "alg": "EdDSA"})
+
+
+async def timed(label: str, requests: List, concurrency: int, send) -> None:
+    slots = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+
+    async def one(request) -> None:
+        async with slots:
+            start = time.perf_counter()
+            statuses[await send(request)] += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(request) for request in requests))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<8} {len(requests) / elapsed:8.0f} req/s   p50 {percentile(latencies, 50):7.2f} ms   "
+          f"p99 {percentile(latencies, 99):7.2f} ms   {dict(statuses)}")
+
+
+async def run(documents: int, users: int, concurrency: int) -> None:
+    import httpx
+    import jwt
+    from sqlalchemy import select
+
+    from app.core.config import settings
+    from app.core.database import SessionLocal
+    from app.core.jwks import jwks_verifier
+    from app.main import app
+    from app.models.document import Document
+    from app.services.search_service import search_service
+
+    await search_service.initialize(client=ElasticsearchStandIn())
+    private_key, public_key = signer()
+
+    async with app.router.lifespan_context(app):
+        jwks_verifier.keys = {"bench": public_key}
+        headers = {}
+        for user_id in range(1, users + 1):
+            token = jwt.encode({"sub": str(user_id), "exp": int(time.time()) + 3600},
+                               private_key, algorithm="EdDSA", headers={"kid": "bench"})
+            headers[user_id] = {"Authorization": f"Bearer {token}"}
+
+        async with SessionLocal() as session:
+            session.add_all([
+                Document(filename=f"doc{i}.pdf", file_type="application/pdf", file_size=1024,
+                         s3_key=f"documents/{i}/doc{i}.pdf", user_id=i % users + 1)
+                for i in range(documents)
+            ])
+            await session.commit()
+            owned = [tuple(row) for row in (await session.execute(select(Document.id, Document.user_id))).all()]
+        random.shuffle(owned)
+
+        prefix = f"{settings.API_V1_STR}/documents"
+        limits = httpx.Limits(max_connections=concurrency)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://docs",
+                                     limits=limits, timeout=None) as client:
+            async def get(request) -> int:
+                doc_id, user_id = request
+                return (await client.get(f"{prefix}/{doc_id}", headers=headers[user_id])).status_code
+
+            async def delete(request) -> int:
+                doc_id, user_id = request
+                return (await client.delete(f"{prefix}/{doc_id}", headers=headers[user_id])).status_code
+
+            await timed("GET", owned, concurrency, get)
+            await timed("DELETE", owned, concurrency, delete)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--port", type=int, default=16380, help="port for the fakeredis stand-in")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ.update({
+        "DEBUG": "false",
+        "DATABASE_URL": f"sqlite+aiosqlite:///{os.path.join(workdir, 'bench.db')}",
+        "STORAGE_BACKEND": "local",
+        "STORAGE_LOCAL_ROOT": os.path.join(workdir, "objects"),
+        # Nothing listens there; the benchmark installs its own key
+        "AUTH_JWKS_URL": "http://127.0.0.1:9/.well-known/jwks.json",
+    })
+    os.environ["REDIS_URL"] = os.environ.get("REDIS_URL") or start_stand_in(args.port)
+    asyncio.run(run(args.documents, args.users, args.concurrency))
+    # The stand-in's handler threads would otherwise keep the process alive
+    os._exit(0)
@@ -0,0 +1,178 @@
+"""
+Text extraction throughput per format.
+
+Generates a corpus of ``--documents`` documents per format, each of
+``--pages`` pages (slides for PPTX, sections of about a page of text
+for the other formats), and extracts them all through the
+DocumentExtractor, ``--workers`` processes at a time. Reports, per
+format, elements and pages per second (for PDF and PPTX; elements of
+the other formats are paragraphs, rows, blocks or sections) and input
+MiB/s. PDFs are written by hand, DOCX and PPTX with python-docx and
+python-pptx; a format whose library is missing is reported as skipped.
+
+    python -m benchmarks.bench_extraction --documents 20 --pages 20 --workers 2
+"""
+import argparse
+import asyncio
+import io
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+from benchmarks.bench_ingestion import WORDS, make_text
+
+MiB = 1024 * 1024
+PAGE_KIB = 3
+
+
+def make_txt(pages: int, seed: int) -> bytes:
+    return make_text(PAGE_KIB * pages, seed)
+
+
+def make_csv(pages: int, seed: int) -> bytes:
+    rng = random.Random(seed)
+    rows = ["id,title,status,amount,notes"]
+    for n in range(pages * 40):
+        rows.append(f"{n},Item {rng.randint(1, 10**6)},{rng.choice(['open', 'closed'])},"
+                    f"{rng.random() * 1000:.2f},\"{' '.join(rng.choice(WORDS) for _ in range(8))}\"")
+    return "\n".join(rows).encode()
+
+
+def make_html(pages: int, seed: int) -> bytes:
+    paragraphs = make_text(PAGE_KIB * pages, seed).decode().split(". ")
+    body = "".join(f"<p>{paragraph}.</p>" + ("<script>var x = 1;</script>" if n % 20 == 0 else "")
+                   for n, paragraph in enumerate(paragraphs))
+    return f"<html><head><title>Doc {seed}</title><style>p {{}}</style></head><body>{body}</body></html>".encode()
+
+
+def make_pdf(pages: int, seed: int) -> bytes:
+    """A plain PDF of ``pages`` pages of text, one line per 80 characters."""
+    text = make_text(PAGE_KIB * pages, seed).decode()
+    page_size = len(text) // pages
+    objects: List[bytes] = [b"<< /Type /Catalog /Pages 2 0 R >>", b""]
+    kids = []
+    for n in range(pages):
+        lines = text[n * page_size:(n + 1) * page_size]
+        lines = [lines[i:i + 80].replace("\\", "").replace("(", "").replace(")", "")
+                 for i in range(0, len(lines), 80)]
+        stream = "BT /F1 9 Tf 11 TL 40 800 Td " + " ".join(f"({line}) '" for line in lines) + " ET"
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream.encode()))
+        content_id = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents %d 0 R "
+                       b"/Resources << /Font << /F1 << /Type /Font /Subtype /Type1 /BaseFont /Helvetica >> >> >> >>"
+                       % content_id)
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>".encode()
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def make_docx(pages: int, seed: int) -> bytes:
+    import docx
+
+    document = docx.Document()
+    for n, paragraph in enumerate(make_text(PAGE_KIB * pages, seed).decode().split("\n\n")):
+        document.add_paragraph(paragraph)
+        if n % 10 == 0:
+            table = document.add_table(rows=3, cols=3)
+            for row in table.rows:
+                for cell in row.cells:
+                    cell.text = f"cell {n}"
+    out = io.BytesIO()
+    document.save(out)
+    return out.getvalue()
+
+
+def make_pptx(pages: int, seed: int) -> bytes:
+    import pptx
+
+    presentation = pptx.Presentation()
+    text = make_text(PAGE_KIB * pages // 3 + 1, seed).decode()
+    per_slide = len(text) // pages
+    for n in range(pages):
+        slide = presentation.slides.add_slide(presentation.slide_layouts[1])
+        slide.shapes.title.text = f"Slide {n + 1}"
+        slide.placeholders[1].text = text[n * per_slide:(n + 1) * per_slide]
+        slide.notes_slide.notes_text_frame.text = f"Notes for slide {n + 1}"
+    out = io.BytesIO()
+    presentation.save(out)
+    return out.getvalue()
+
+
+FORMATS: Dict[str, tuple] = {
+    "txt": ("text/plain", make_txt),
+    "csv": ("text/csv", make_csv),
+    "html": ("text/html", make_html),
+    "pdf": ("application/pdf", make_pdf),
+    "docx": ("application/vnd.openxmlformats-officedocument.wordprocessingml.document", make_docx),
+    "pptx": ("application/vnd.openxmlformats-officedocument.presentationml.presentation", make_pptx),
+}
+
+
+async def chunks_of(content: bytes):
+    for start in range(0, len(content), MiB):
+        yield content[start:start + MiB]
+
+
+async def run(formats: List[str], documents: int, pages: int, workers: int,
+              timeout: float, memory_limit: Optional[int]) -> None:
+    from app.utils.file_processor import DocumentExtractor, ExtractionError
+
+    extractor = DocumentExtractor(workers, timeout, memory_limit)
+    print(f"{documents} documents x {pages} pages per format, {workers} extraction processes")
+    for name in formats:
+        content_type, make = FORMATS[name]
+        try:
+            corpus = [make(pages, seed) for seed in range(documents)]
+        except ImportError as e:
+            print(f"{name:>5}   skipped: {str(e)}")
+            continue
+        kinds: Counter = Counter()
+        errors: List[str] = []
+
+        async def extract(content: bytes) -> None:
+            try:
+                async for element in extractor.extract(chunks_of(content), content_type):
+                    kinds[element.kind] += 1
+            except ExtractionError as e:
+                errors.append(str(e))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(extract(content) for content in corpus))
+        elapsed = time.perf_counter() - start
+        size = sum(len(content) for content in corpus) / MiB
+        pages_per_second = (kinds["page"] + kinds["slide"]) / elapsed
+        print(f"{name:>5}   {sum(kinds.values()) / elapsed:9.0f} elements/s   "
+              + (f"{pages_per_second:7.1f} pages/s   " if pages_per_second else " " * 20)
+              + f"{size / elapsed:7.2f} MiB/s   {dict(kinds)}"
+              + (f"   {len(errors)} failed: {errors[0]}" if errors else ""))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--formats", nargs="+", choices=list(FORMATS), default=list(FORMATS))
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds per document")
+    parser.add_argument("--memory-limit", type=int, default=1024, help="MiB per extraction process")
+    args = parser.parse_args()
+
+    os.environ.setdefault("STORAGE_LOCAL_ROOT", tempfile.mkdtemp())
+    os.environ["STORAGE_BACKEND"] = "local"
+    asyncio.run(run(args.formats, args.documents, args.pages, args.workers, args.timeout,
+                    args.memory_limit * MiB if args.memory_limit else None))
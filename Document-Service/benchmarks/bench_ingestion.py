@@ -0,0 +1,137 @@
+"""
+Upload acknowledgement latency and background ingestion throughput.
+
+POSTs ``--documents`` distinct text files of ``--size`` KiB each to
+/documents/upload, ``--concurrency`` at a time, through the ASGI app, and
+times each 202. Then waits for the ingestion workers (``--workers`` per
+stage, given as parse chunk embed index) to take every job through parse,
+chunk, embed and index, and reports how long that took, the mean time of
+each stage from the jobs' timings, and any failures. Storage is the local
+backend in a temporary directory and Elasticsearch an in-memory stand-in.
+Uses the Redis at REDIS_URL or a fakeredis TCP stand-in.
+
+    python -m benchmarks.bench_ingestion --documents 200 --size 64 --workers 2 1 2 1
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from benchmarks.bench_documents import ElasticsearchStandIn, percentile, signer, start_stand_in
+
+WORDS = ("document", "search", "index", "vector", "retrieval", "answer", "chunk", "query",
+         "storage", "service", "latency", "worker", "queue", "stage", "token", "model")
+
+
+def make_text(size_kib: int, seed: int) -> bytes:
+    rng = random.Random(seed)
+    sentences: List[str] = []
+    length = 0
+    while length < size_kib * 1024:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 18))).capitalize() + "."
+        if rng.random() < 0.1:
+            sentence += "\n\n"
+        sentences.append(sentence)
+        length += len(sentence) + 1
+    return " ".join(sentences).encode()
+
+
+async def run(documents: int, size_kib: int, concurrency: int) -> None:
+    import httpx
+    import jwt
+    from sqlalchemy import func, select
+
+    from app.core.config import settings
+    from app.core.database import SessionLocal
+    from app.core.jwks import jwks_verifier
+    from app.main import app
+    from app.models.ingestion import IngestionJob
+    from app.services.search_service import search_service
+
+    search = ElasticsearchStandIn()
+    await search_service.initialize(client=search)
+    private_key, public_key = signer()
+    files = [make_text(size_kib, seed) for seed in range(documents)]
+
+    async with app.router.lifespan_context(app):
+        jwks_verifier.keys = {"bench": public_key}
+        token = jwt.encode({"sub": "1", "exp": int(time.time()) + 3600},
+                           private_key, algorithm="EdDSA", headers={"kid": "bench"})
+        headers = {"Authorization": f"Bearer {token}"}
+        url = f"{settings.API_V1_STR}/documents/upload"
+        slots = asyncio.Semaphore(concurrency)
+        latencies: List[float] = []
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://docs",
+                                     timeout=None) as client:
+            async def upload(n: int, content: bytes) -> None:
+                async with slots:
+                    start = time.perf_counter()
+                    response = await client.post(url, headers=headers,
+                                                 files={"file": (f"doc{n}.txt", content, "text/plain")})
+                    latencies.append(time.perf_counter() - start)
+                    assert response.status_code == 202, response.text
+
+            start = time.perf_counter()
+            await asyncio.gather(*(upload(n, content) for n, content in enumerate(files)))
+            accepted = time.perf_counter() - start
+            print(f"accepted {documents} x {size_kib} KiB in {accepted:.2f}s   "
+                  f"p50 {percentile(latencies, 50):.2f} ms   p99 {percentile(latencies, 99):.2f} ms")
+
+            while True:
+                async with SessionLocal() as session:
+                    pending = await session.scalar(select(func.count(IngestionJob.id))
+                                                   .where(IngestionJob.status.in_(("queued", "running"))))
+                if not pending:
+                    break
+                await asyncio.sleep(0.1)
+            drained = time.perf_counter() - start
+
+        async with SessionLocal() as session:
+            jobs = (await session.execute(select(IngestionJob))).scalars().all()
+        timings: Dict[str, List[float]] = defaultdict(list)
+        for job in jobs:
+            for stage, seconds in job.timings.items():
+                timings[stage].append(seconds)
+        failed = [job for job in jobs if job.status == "failed"]
+
+        print(f"ingested in {drained:.2f}s from the first upload: {documents / drained:.1f} docs/s, "
+              f"{len(search.documents)} chunks indexed, {len(failed)} failed")
+        for stage in ("parse", "chunk", "embed", "index"):
+            values = timings[stage]
+            if values:
+                print(f"  {stage:<6} mean {sum(values) / len(values) * 1000:8.2f} ms   "
+                      f"p99 {percentile(values, 99):8.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--size", type=int, default=64, help="KiB per document")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--workers", type=int, nargs=4, default=[2, 1, 2, 1],
+                        metavar=("PARSE", "CHUNK", "EMBED", "INDEX"))
+    parser.add_argument("--port", type=int, default=16382, help="port for the fakeredis stand-in")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ.update({
+        "DEBUG": "false",
+        "DATABASE_URL": f"sqlite+aiosqlite:///{os.path.join(workdir, 'bench.db')}",
+        "STORAGE_BACKEND": "local",
+        "STORAGE_LOCAL_ROOT": os.path.join(workdir, "objects"),
+        "INGEST_PARSE_WORKERS": str(args.workers[0]),
+        "INGEST_CHUNK_WORKERS": str(args.workers[1]),
+        "INGEST_EMBED_WORKERS": str(args.workers[2]),
+        "INGEST_INDEX_WORKERS": str(args.workers[3]),
+        # Nothing listens there; the benchmark installs its own key
+        "AUTH_JWKS_URL": "http://127.0.0.1:9/.well-known/jwks.json",
+    })
+    os.environ["REDIS_URL"] = os.environ.get("REDIS_URL") or start_stand_in(args.port)
+    asyncio.run(run(args.documents, args.size, args.concurrency))
+    # The stand-in's handler threads would otherwise keep the process alive
+    os._exit(0)
@@ -0,0 +1,141 @@
+"""
+Upload throughput and peak memory per upload, by file size.
+
+POSTs files of each ``--sizes`` (MiB) to /documents/upload through the
+ASGI app, storing them with the local backend in a temporary directory
+in parts of ``--part-size`` MiB, ``--concurrency`` at a time. Each size is
+uploaded once for throughput, again as a duplicate (whose copy is
+dropped for the blob already stored), and once more with fresh content under
+tracemalloc for the peak Python memory allocated during the request,
+which should stay flat as the files grow. The stored size and SHA-256
+are checked against the source. Ingestion workers are off, so only the
+upload itself (up to the 202) is measured.
+Uses the Redis at REDIS_URL or a fakeredis TCP stand-in.
+
+    python -m benchmarks.bench_upload --sizes 1 16 64 256
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import List
+
+from benchmarks.bench_documents import ElasticsearchStandIn, signer, start_stand_in
+
+MiB = 1024 * 1024
+
+
+def make_file(directory: str, size_mib: int) -> str:
+    path = os.path.join(directory, f"upload-{size_mib}.bin")
+    with open(path, "wb") as f:
+        for _ in range(size_mib):
+            f.write(os.urandom(MiB))
+    return path
+
+
+def sha256_of(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(MiB):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def run(sizes: List[int], workdir: str) -> None:
+    import httpx
+    import jwt
+    from sqlalchemy import select
+
+    from app.core.config import settings
+    from app.core.database import SessionLocal
+    from app.core.jwks import jwks_verifier
+    from app.main import app
+    from app.models.document import Document
+    from app.services.search_service import search_service
+    from app.services.storage_service import storage_service
+
+    await search_service.initialize(client=ElasticsearchStandIn())
+    private_key, public_key = signer()
+
+    async with app.router.lifespan_context(app):
+        jwks_verifier.keys = {"bench": public_key}
+        token = jwt.encode({"sub": "1", "exp": int(time.time()) + 3600},
+                           private_key, algorithm="EdDSA", headers={"kid": "bench"})
+        headers = {"Authorization": f"Bearer {token}"}
+        url = f"{settings.API_V1_STR}/documents/upload"
+        print(f"parts of {settings.STORAGE_PART_SIZE // MiB} MiB, "
+              f"{settings.STORAGE_UPLOAD_CONCURRENCY} at a time")
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://docs",
+                                     timeout=None) as client:
+            async def upload(path: str) -> int:
+                with open(path, "rb") as f:
+                    response = await client.post(url, headers=headers,
+                                                 files={"file": (os.path.basename(path), f, "application/pdf")})
+                assert response.status_code == 202, response.text
+                return response.json()["document"]["id"]
+
+            for size in sizes:
+                path = make_file(workdir, size)
+                expected = sha256_of(path)
+
+                start = time.perf_counter()
+                document_id = await upload(path)
+                elapsed = time.perf_counter() - start
+
+                start = time.perf_counter()
+                duplicate_id = await upload(path)
+                duplicate_elapsed = time.perf_counter() - start
+
+                os.remove(path)
+                path = make_file(workdir, size)
+                tracemalloc.start()
+                await upload(path)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+
+                async with SessionLocal() as session:
+                    documents = (await session.execute(
+                        select(Document).where(Document.id.in_([document_id, duplicate_id])))).scalars().all()
+                assert len({document.s3_key for document in documents}) == 1
+                digest = hashlib.sha256()
+                async for chunk in storage_service.read(documents[0].s3_key):
+                    digest.update(chunk)
+                assert documents[0].file_size == size * MiB and digest.hexdigest() == expected
+
+                print(f"{size:>6} MiB   new {size / elapsed:8.1f} MiB/s   duplicate "
+                      f"{size / duplicate_elapsed:8.1f} MiB/s   peak {peak / MiB:7.1f} MiB")
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 16, 64, 256])
+    parser.add_argument("--part-size", type=int, default=8, help="MiB")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--port", type=int, default=16381, help="port for the fakeredis stand-in")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ.update({
+        "DEBUG": "false",
+        "DATABASE_URL": f"sqlite+aiosqlite:///{os.path.join(workdir, 'bench.db')}",
+        "STORAGE_BACKEND": "local",
+        "STORAGE_LOCAL_ROOT": os.path.join(workdir, "objects"),
+        "STORAGE_PART_SIZE": str(args.part_size * MiB),
+        "STORAGE_UPLOAD_CONCURRENCY": str(args.concurrency),
+        # Uploads only: no ingestion workers competing for the CPU
+        "INGEST_PARSE_WORKERS": "0",
+        "INGEST_CHUNK_WORKERS": "0",
+        "INGEST_EMBED_WORKERS": "0",
+        "INGEST_INDEX_WORKERS": "0",
+        # Nothing listens there; the benchmark installs its own key
+        "AUTH_JWKS_URL": "http://127.0.0.1:9/.well-known/jwks.json",
+    })
+    os.environ["REDIS_URL"] = os.environ.get("REDIS_URL") or start_stand_in(args.port)
+    asyncio.run(run(args.sizes, workdir))
+    # The stand-in's handler threads would otherwise keep the process alive
+    os._exit(0)
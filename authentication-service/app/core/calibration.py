@@ -0,0 +1,84 @@
+"""
+Pick the password-hash cost for this hardware.
+
+Times verification of the configured scheme (HASH_ALGORITHM, or --scheme)
+at increasing costs and recommends the highest HASH_ROUNDS whose median
+verify stays within --target-ms. Run it on the machines that serve logins,
+with nothing else busy:
+
+    python -m app.core.calibration --target-ms 250
+
+Deploying the new HASH_ROUNDS is enough: existing hashes are rehashed at
+the new cost as their users log in.
+"""
+import argparse
+import os
+import statistics
+import time
+from typing import List, Tuple
+
+from passlib.registry import get_crypt_handler
+
+PASSWORD = "calibration-password"
+
+
+def time_verify(scheme: str, rounds: int, samples: int) -> float:
+    """Median seconds to verify one password hashed at ``rounds``."""
+    handler = get_crypt_handler(scheme).using(rounds=rounds)
+    hashed = handler.hash(PASSWORD)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        handler.verify(PASSWORD, hashed)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def calibrate(scheme: str, target: float, samples: int = 5) -> Tuple[int, List[Tuple[int, float]]]:
+    """Return the highest rounds verifying within ``target`` seconds, and every timing taken.
+
+    Log-cost schemes (bcrypt, scrypt) double per round, so they are stepped
+    up one at a time. Linear ones (argon2 time_cost, pbkdf2, sha*_crypt) are
+    extrapolated from the default cost and then nudged down until they fit.
+    """
+    handler = get_crypt_handler(scheme)
+    if "rounds" not in getattr(handler, "setting_kwds", ()):
+        raise ValueError(f"'{scheme}' has no cost parameter to calibrate")
+    timings: List[Tuple[int, float]] = []
+
+    def measure(rounds: int) -> float:
+        elapsed = time_verify(scheme, rounds, samples)
+        timings.append((rounds, elapsed))
+        return elapsed
+
+    if handler.rounds_cost == "log2":
+        rounds = handler.min_rounds
+        while measure(rounds) <= target and rounds < handler.max_rounds:
+            rounds += 1
+        fitting = [r for r, elapsed in timings if elapsed <= target]
+        return (max(fitting) if fitting else handler.min_rounds), timings
+
+    rounds = handler.default_rounds
+    elapsed = measure(rounds)
+    rounds = max(handler.min_rounds, min(handler.max_rounds, int(rounds * target / elapsed)))
+    while measure(rounds) > target and rounds > handler.min_rounds:
+        rounds = max(handler.min_rounds, int(rounds * 0.9))
+    return rounds, timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scheme", default=os.getenv("HASH_ALGORITHM", "bcrypt"))
+    parser.add_argument("--target-ms", type=float, default=250.0, help="verify time to stay within")
+    parser.add_argument("--samples", type=int, default=5, help="verifies timed per cost")
+    args = parser.parse_args()
+
+    rounds, timings = calibrate(args.scheme, args.target_ms / 1000, args.samples)
+    for cost, elapsed in sorted(set(timings)):
+        print(f"{args.scheme} rounds={cost:<10} verify {elapsed * 1000:9.1f} ms")
+    default = get_crypt_handler(args.scheme).default_rounds
+    print(f"\nHASH_ROUNDS={rounds}    (passlib default: {default})")
+
+
+if __name__ == "__main__":
+    main()
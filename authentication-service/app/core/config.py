@@ -1,10 +1,12 @@
 from functools import lru_cache
+from typing import Optional
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Auth Service"
+    VERSION: str = "v1"
     API_V1_STR: str
     DEBUG:bool
 
@@ -12,6 +14,12 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
+    # RS256/EdDSA: directory of <kid>.pem private keys; the newest signs
+    # unless JWT_ACTIVE_KID pins one. All are published in the JWKS
+    JWT_KEYS_DIR: Optional[str] = None
+    JWT_ACTIVE_KID: Optional[str] = None
+    JWT_KEYS_RELOAD_INTERVAL: float = 60.0
+    JWKS_MAX_AGE: int = 300
 
     # Database settings
     DATABASE_URL: str
@@ -19,9 +27,46 @@ class Settings(BaseSettings):
     # Redis settings
     REDIS_HOST: str
     REDIS_PORT: int
+    # Takes precedence over REDIS_HOST/REDIS_PORT, e.g. rediss://:pw@host:6380/0
+    REDIS_URL: Optional[str] = None
+    REDIS_MAX_CONNECTIONS: int = 50
+    # Seconds to wait for a pooled connection before failing the command
+    REDIS_POOL_TIMEOUT: float = 2.0
+    REDIS_SOCKET_TIMEOUT: float = 2.0
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
+    # Client-side cache of tracked keys; 0 disables it
+    REDIS_LOCAL_CACHE_SIZE: int = 10000
+    REDIS_LOCAL_CACHE_TTL: float = 60.0
+
+    # Seconds a user record stays in the login cache
+    USER_CACHE_TTL: int = 300
+
+    # Revoked token IDs are published here so every verifier's filter stays in sync
+    TOKEN_REVOCATION_CHANNEL: str = "docmind:token-revocations"
+    # Revocations are grouped by expiry into buckets of this many seconds,
+    # each a Bloom filter of this capacity and false-positive rate
+    REVOCATION_BUCKET_SECONDS: int = 300
+    REVOCATION_FILTER_CAPACITY: int = 10000
+    REVOCATION_FILTER_ERROR_RATE: float = 0.001
 
     # Password hashing
     HASH_ALGORITHM: str
+    # Cost for HASH_ALGORITHM (bcrypt log2 rounds, argon2 time_cost, ...);
+    # see app.core.calibration. Unset keeps passlib's default. Hashes at
+    # any other cost are rehashed on the user's next login
+    HASH_ROUNDS: Optional[int] = None
+    # Where hashing runs: thread, process or inline (on the event loop)
+    HASH_EXECUTOR: str = "thread"
+    HASH_WORKERS: Optional[int] = None
+    # Pending hash operations allowed before logins are refused with 503
+    HASH_MAX_QUEUE: int = 64
+    HASH_TIMEOUT: float = 5.0
+
+    # Bulk provisioning (admin): users allowed to call it, rows per
+    # duplicate check/hash/insert batch, and process-pool size for hashing
+    ADMIN_EMAILS: str = ""
+    BULK_BATCH_SIZE: int = 500
+    BULK_HASH_WORKERS: Optional[int] = None
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
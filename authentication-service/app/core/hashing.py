@@ -0,0 +1,144 @@
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Callable, List, Optional, Tuple, TypeVar
+
+from docmind_common.metrics import registry
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+from app.core.security import get_password_hash, verify_and_update_password, verify_password
+from app.logger_config import setup_logger
+
+logger = setup_logger(__name__)
+
+T = TypeVar("T")
+
+hash_seconds = registry.histogram(
+    "password_hash_seconds", "Time to hash or verify one password on a worker, excluding queueing",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+
+
+def _timed(fn: Callable[..., T], *args) -> Tuple[T, float]:
+    # Runs on the worker, so the time is the hash itself, not its wait
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def hash_passwords(passwords: List[str]) -> List[Tuple[str, float]]:
+    return [_timed(get_password_hash, password) for password in passwords]
+
+
+class PasswordHasher:
+    """Runs passlib hashing off the event loop on a bounded worker pool.
+
+    ``executor`` is "thread" (bcrypt and argon2 release the GIL while
+    hashing), "process" (for backends that hold it) or "inline" (hash on
+    the event loop, as before). At most ``max_queue`` hashes may be
+    pending; beyond that, or when a hash takes longer than ``timeout``
+    seconds including its wait, callers get a 503 instead of piling up.
+
+    Bulk hashing (hash_many) runs on a separate process pool of
+    ``bulk_workers``, so a large import can't starve interactive logins.
+    """
+
+    def __init__(self, executor: str = "thread", workers: Optional[int] = None,
+                 max_queue: int = 64, timeout: float = 5.0, bulk_workers: Optional[int] = None):
+        if executor not in ("thread", "process", "inline"):
+            raise ValueError(f"Unknown hash executor '{executor}'")
+        self.kind = executor
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.bulk_workers = bulk_workers or os.cpu_count() or 1
+        self.pending = 0
+        self._executor: Optional[Executor] = None
+        self._bulk_executor: Optional[ProcessPoolExecutor] = None
+
+    def start(self) -> None:
+        if self._executor is None and self.kind != "inline":
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="password-hash")
+            logger.info(f"Password hashing on a {self.kind} pool of {self.workers} workers")
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._bulk_executor is not None:
+            self._bulk_executor.shutdown(wait=False, cancel_futures=True)
+            self._bulk_executor = None
+
+    def _overloaded(self, detail: str) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail,
+            headers={"Retry-After": "1"},
+        )
+
+    async def _run(self, fn: Callable[..., T], *args) -> Tuple[T, float]:
+        if self.kind == "inline":
+            return _timed(fn, *args)
+        if self.pending >= self.max_queue:
+            raise self._overloaded("Too many pending password operations, retry later")
+        self.start()
+        self.pending += 1
+        future = asyncio.get_running_loop().run_in_executor(self._executor, partial(_timed, fn, *args))
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            raise self._overloaded("Password operation timed out, retry later")
+        finally:
+            self.pending -= 1
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        valid, elapsed = await self._run(verify_password, plain_password, hashed_password)
+        hash_seconds.observe(elapsed, op="verify")
+        return valid
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Verify, returning a new hash too if the stored one is at an outdated cost."""
+        (valid, new_hash), elapsed = await self._run(verify_and_update_password, plain_password, hashed_password)
+        hash_seconds.observe(elapsed, op="verify" if new_hash is None else "verify_rehash")
+        return valid, new_hash
+
+    async def hash(self, password: str) -> str:
+        hashed, elapsed = await self._run(get_password_hash, password)
+        hash_seconds.observe(elapsed, op="hash")
+        return hashed
+
+    async def hash_many(self, passwords: List[str]) -> List[str]:
+        """Hash a batch of passwords in parallel across the bulk process pool."""
+        if not passwords:
+            return []
+        if self._bulk_executor is None:
+            self._bulk_executor = ProcessPoolExecutor(max_workers=self.bulk_workers)
+            logger.info(f"Bulk password hashing on a process pool of {self.bulk_workers} workers")
+        loop = asyncio.get_running_loop()
+        # A few chunks per worker: few enough to amortise the IPC, enough to balance
+        chunk = max(1, len(passwords) // (self.bulk_workers * 4))
+        futures = [
+            loop.run_in_executor(self._bulk_executor, hash_passwords, passwords[start:start + chunk])
+            for start in range(0, len(passwords), chunk)
+        ]
+        hashes = []
+        for chunk_hashes in await asyncio.gather(*futures):
+            for hashed, elapsed in chunk_hashes:
+                hash_seconds.observe(elapsed, op="bulk_hash")
+                hashes.append(hashed)
+        return hashes
+
+
+password_hasher = PasswordHasher(
+    settings.HASH_EXECUTOR,
+    settings.HASH_WORKERS,
+    settings.HASH_MAX_QUEUE,
+    settings.HASH_TIMEOUT,
+    settings.BULK_HASH_WORKERS,
+)
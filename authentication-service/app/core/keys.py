@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import uuid
+from typing import Dict, List, Optional
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from jwt.algorithms import OKPAlgorithm, RSAAlgorithm
+
+from app.core.config import settings
+from app.logger_config import setup_logger
+
+logger = setup_logger(__name__)
+
+ASYMMETRIC_ALGORITHMS = {"RS256", "EdDSA"}
+
+
+class SigningKey:
+    def __init__(self, kid: str, algorithm: str, private_key):
+        self.kid = kid
+        self.algorithm = algorithm
+        self.private_key = private_key
+        self.public_key = private_key.public_key()
+
+    def public_jwk(self) -> Dict:
+        if self.algorithm == "RS256":
+            jwk = RSAAlgorithm.to_jwk(self.public_key, as_dict=True)
+        else:
+            jwk = OKPAlgorithm.to_jwk(self.public_key, as_dict=True)
+        jwk.update(kid=self.kid, alg=self.algorithm, use="sig")
+        return jwk
+
+
+def generate_private_key(algorithm: str):
+    if algorithm == "RS256":
+        return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return ed25519.Ed25519PrivateKey.generate()
+
+
+class KeyRing:
+    """Token signing keys and the JWKS document that publishes them.
+
+    With an asymmetric ALGORITHM (RS256 or EdDSA) every ``<kid>.pem``
+    private key in ``keys_dir`` is loaded and its public half published at
+    /.well-known/jwks.json. Tokens are signed with ``active_kid`` (default:
+    the newest file) and carry it in their ``kid`` header, so keys can be
+    rotated by adding a new file, then deleting the old one once the
+    tokens it signed have expired. Without a directory an ephemeral key is
+    generated, which only suits a single development instance.
+
+    HS* algorithms keep using the shared SECRET_KEY and publish no keys.
+    """
+
+    def __init__(self, algorithm: str, secret: str, keys_dir: Optional[str] = None,
+                 active_kid: Optional[str] = None):
+        self.algorithm = algorithm
+        self.secret = secret
+        self.keys_dir = keys_dir
+        self.active_kid = active_kid
+        self.keys: Dict[str, SigningKey] = {}
+        self.active: Optional[SigningKey] = None
+        self.jwks_body = b'{"keys":[]}'
+        self.jwks_etag = '"empty"'
+        self._fingerprint: Optional[List] = None
+
+    @property
+    def asymmetric(self) -> bool:
+        return self.algorithm in ASYMMETRIC_ALGORITHMS
+
+    def _scan(self) -> List:
+        if not self.keys_dir or not os.path.isdir(self.keys_dir):
+            return []
+        return sorted(
+            (entry.stat().st_mtime, entry.name)
+            for entry in os.scandir(self.keys_dir)
+            if entry.name.endswith(".pem")
+        )
+
+    def load(self) -> bool:
+        """(Re)load keys if the key directory changed; returns whether it did."""
+        if not self.asymmetric:
+            return False
+        fingerprint = self._scan()
+        if fingerprint == self._fingerprint and self.keys:
+            return False
+
+        keys: Dict[str, SigningKey] = {}
+        for _, name in fingerprint:
+            with open(os.path.join(self.keys_dir, name), "rb") as f:
+                private_key = serialization.load_pem_private_key(f.read(), password=None)
+            keys[name[:-len(".pem")]] = SigningKey(name[:-len(".pem")], self.algorithm, private_key)
+        if not keys:
+            if self.keys:
+                # Keep serving the keys we have rather than invalidate every token
+                logger.error(f"No signing keys found in {self.keys_dir}; keeping current keys")
+                return False
+            kid = f"ephemeral-{uuid.uuid4().hex[:8]}"
+            logger.warning(f"No signing keys configured; generated ephemeral {self.algorithm} key {kid}")
+            keys[kid] = SigningKey(kid, self.algorithm, generate_private_key(self.algorithm))
+            fingerprint = []
+
+        # Newest key signs unless one is pinned
+        active_kid = self.active_kid if self.active_kid in keys else list(keys)[-1]
+        self.keys = keys
+        self.active = keys[active_kid]
+        self.jwks_body = json.dumps(
+            {"keys": [key.public_jwk() for key in keys.values()]}, separators=(",", ":")).encode()
+        self.jwks_etag = f'"{hashlib.sha256(self.jwks_body).hexdigest()[:32]}"'
+        self._fingerprint = fingerprint
+        logger.info(f"Loaded {len(keys)} signing key(s); signing with kid {active_kid}")
+        return True
+
+    def sign(self, claims: Dict) -> str:
+        if not self.asymmetric:
+            return jwt.encode(claims, self.secret, algorithm=self.algorithm)
+        if self.active is None:
+            self.load()
+        return jwt.encode(claims, self.active.private_key, algorithm=self.algorithm,
+                          headers={"kid": self.active.kid})
+
+    def decode(self, token: str) -> Dict:
+        """Verify a token issued by this service; raises jwt.PyJWTError."""
+        if not self.asymmetric:
+            return jwt.decode(token, self.secret, algorithms=[self.algorithm])
+        if self.active is None:
+            self.load()
+        kid = jwt.get_unverified_header(token).get("kid")
+        if kid not in self.keys:
+            raise jwt.InvalidKeyError(f"Unknown signing key {kid!r}")
+        return jwt.decode(token, self.keys[kid].public_key, algorithms=[self.algorithm])
+
+
+key_ring = KeyRing(
+    settings.ALGORITHM,
+    settings.SECRET_KEY,
+    settings.JWT_KEYS_DIR,
+    settings.JWT_ACTIVE_KID,
+)
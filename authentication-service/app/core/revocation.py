@@ -0,0 +1,19 @@
+from docmind_common.metrics import registry
+from docmind_common.revocation import RevocationList
+
+from app.core.config import settings
+from app.core.redis_client import redis_client
+
+
+revocation_list = RevocationList(
+    redis_client,
+    settings.TOKEN_REVOCATION_CHANNEL,
+    settings.REVOCATION_BUCKET_SECONDS,
+    settings.REVOCATION_FILTER_CAPACITY,
+    settings.REVOCATION_FILTER_ERROR_RATE,
+)
+
+registry.gauge("token_revocation_filter_entries", "Live revocations held in the local filter",
+               fn=lambda: len(revocation_list.filter))
+registry.gauge("token_revocation_filter_bytes", "Memory used by the local revocation filter",
+               fn=lambda: revocation_list.filter.nbytes)
@@ -1,34 +1,49 @@
 
-from datetime import datetime, timedelta
-from jose import jwt
+import uuid
+from datetime import datetime, timedelta, timezone
 from passlib.context import CryptContext
-from typing import Optional
+from typing import Optional, Tuple
 from app.core.config import settings
+from app.core.keys import key_ring
 
-pwd_context = CryptContext(schemes=[settings.HASH_ALGORITHM], deprecated="auto")
+
+def _cost_options() -> dict:
+    if settings.HASH_ROUNDS is None:
+        return {}
+    # Pinned from both sides, so needs_update() flags hashes made at any other cost
+    return {f"{settings.HASH_ALGORITHM}__{option}": settings.HASH_ROUNDS
+            for option in ("default_rounds", "min_rounds", "max_rounds")}
+
+
+pwd_context = CryptContext(schemes=[settings.HASH_ALGORITHM], deprecated="auto", **_cost_options())
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify, and if the hash needs_update(), also return a fresh one."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
 def create_access_token(subject: str, expires_delta: Optional[timedelta] = None) -> str:
+    now = datetime.now(timezone.utc)
     if expires_delta:
-        expire = datetime.now() + expires_delta
+        expire = now + expires_delta
     else:
-        expire = datetime.now() + timedelta(
+        expire = now + timedelta(
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
 
-    to_encode = {"exp": expire, "sub": str(subject)}
-    encoded_jwt = jwt.encode(
-        to_encode,
-        settings.SECRET_KEY,
-        algorithm=settings.ALGORITHM
-    )
+    to_encode = {"exp": expire, "iat": now, "sub": str(subject), "jti": uuid.uuid4().hex}
+    return key_ring.sign(to_encode)
+
 
-    return encoded_jwt
\ No newline at end of file
+def decode_access_token(token: str) -> dict:
+    """Verify signature and expiry; raises jwt.PyJWTError on failure."""
+    return key_ring.decode(token)
@@ -1,11 +1,12 @@
-from jose import jwt
+import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from passlib.exc import InvalidTokenError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
 from app.core.database import SessionLocal
+from app.core.revocation import revocation_list
+from app.core.security import decode_access_token
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
@@ -20,12 +21,12 @@ async def get_db() -> AsyncSession:
         yield session
 
 
-async def get_current_user(
+async def get_token_claims(
         token: str = Depends(oauth2_scheme)
-) -> str:
+) -> dict:
     """
-    Dependency that validates the JWT token and returns the current user ID.
-    Raises HTTPException if token is invalid or user is not found.
+    Dependency that validates the JWT token, checks it hasn't been revoked
+    and returns its claims.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -34,16 +35,37 @@ async def get_current_user(
     )
 
     try:
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM]
+        payload = decode_access_token(token)
+    except jwt.PyJWTError:
+        raise credentials_exception
+    if payload.get("sub") is None:
+        raise credentials_exception
+    if await revocation_list.is_revoked(payload.get("jti")):
+        raise credentials_exception
+    return payload
+
+
+async def get_current_user(
+        claims: dict = Depends(get_token_claims)
+) -> str:
+    """
+    Dependency that validates the JWT token and returns the current user ID.
+    Raises HTTPException if token is invalid or user is not found.
+    """
+    # Here you might want to verify the user exists in the database
+    return claims["sub"]
+
+
+async def get_admin_user(
+        current_user: str = Depends(get_current_user)
+) -> str:
+    """
+    Dependency that only lets through users listed in ADMIN_EMAILS.
+    """
+    admins = {email.strip() for email in settings.ADMIN_EMAILS.split(",") if email.strip()}
+    if current_user not in admins:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required",
         )
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-
-        # Here you might want to verify the user exists in the database
-        return user_id
-    except InvalidTokenError:
-        raise credentials_exception
\ No newline at end of file
+    return current_user
@@ -1,19 +1,39 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from datetime import datetime
 
-from fastapi import FastAPI, Request, status
+from docmind_common.metrics import registry
+from fastapi import Depends, FastAPI, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
 
 from app.core.config import settings
 from app.core.database import engine, Base
+from app.core.hashing import password_hasher
+from app.core.keys import key_ring
+from app.core.redis_client import redis_client
+from app.core.revocation import revocation_list
+from app.dependencies import get_token_claims
 from app.logger_config import setup_logger
-from app.routes import auth
+from app.routes import admin, auth
 from app.utils.auth_service_exception import AuthServiceException
 
 # Setup logging
 logger = setup_logger(__name__)
+# The shared docmind_common clients log through the same handler
+setup_logger("docmind_common")
+
+
+async def reload_signing_keys():
+    # Pick up rotated key files without a restart
+    while True:
+        await asyncio.sleep(settings.JWT_KEYS_RELOAD_INTERVAL)
+        try:
+            key_ring.load()
+        except Exception as e:
+            logger.error(f"Error reloading signing keys: {str(e)}", exc_info=True)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -28,6 +48,12 @@ async def lifespan(app: FastAPI):
 
         # Initialize any other required services here
         # Example: CacheService, ExternalAuthProviders, etc.
+        await redis_client.start()
+        logger.info("Redis connection pool initialized")
+        await revocation_list.start()
+        password_hasher.start()
+        key_ring.load()
+        key_reloader = asyncio.create_task(reload_signing_keys())
 
     except Exception as e:
         logger.error(f"Error during startup: {str(e)}", exc_info=True)
@@ -43,6 +69,13 @@ async def lifespan(app: FastAPI):
         logger.info("Database connections closed")
 
         # Cleanup any other resources
+        key_reloader.cancel()
+        with suppress(asyncio.CancelledError):
+            await key_reloader
+        password_hasher.shutdown()
+        await revocation_list.stop()
+        await redis_client.stop()
+        logger.info("Redis connections closed")
 
     except Exception as e:
         logger.error(f"Error during shutdown: {str(e)}", exc_info=True)
@@ -110,18 +143,45 @@ async def global_exception_handler(request: Request, exc: Exception):
 # Health check endpoint
 @app.get("/health")
 async def health_check():
+    redis_health = await redis_client.health()
     return {
-        "status": "healthy",
+        "status": "healthy" if redis_health["status"] == "healthy" else "degraded",
         "timestamp": datetime.now(),
-        "version": settings.VERSION
+        "version": settings.VERSION,
+        "redis": redis_health
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return registry.render()
+
+# Public signing keys for local token verification by other services
+@app.get("/.well-known/jwks.json")
+async def jwks(request: Request):
+    headers = {
+        "Cache-Control": f"public, max-age={settings.JWKS_MAX_AGE}",
+        "ETag": key_ring.jwks_etag,
+    }
+    if request.headers.get("if-none-match") == key_ring.jwks_etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=key_ring.jwks_body, media_type="application/json", headers=headers)
+
+# Token check for the gateway: signature, expiry and revocation
+@app.get("/verify-token")
+async def verify_token(claims: dict = Depends(get_token_claims)):
+    return {**claims, "id": claims["sub"]}
+
 # Include routers
 app.include_router(
     auth.router,
     prefix=f"{settings.API_V1_STR}/auth",
     tags=["authentication"]
 )
+app.include_router(
+    admin.router,
+    prefix=f"{settings.API_V1_STR}/admin",
+    tags=["admin"]
+)
 
 class Test(BaseModel):
     title:str ="Test title"
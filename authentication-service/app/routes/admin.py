@@ -0,0 +1,52 @@
+import json
+import tempfile
+from typing import AsyncIterator, IO
+
+from fastapi import APIRouter, Depends, Request
+from starlette.responses import StreamingResponse
+
+from app.core.database import SessionLocal
+from app.dependencies import get_admin_user
+from app.services.provisioning_service import ProvisioningService, parse_rows
+
+router = APIRouter()
+
+SPOOL_MAX_MEMORY = 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+
+async def _read_spool(spool: IO[bytes]) -> AsyncIterator[bytes]:
+    spool.seek(0)
+    while chunk := spool.read(CHUNK_SIZE):
+        yield chunk
+
+
+@router.post("/users/bulk")
+async def bulk_register(
+    request: Request,
+    admin: str = Depends(get_admin_user)
+):
+    """
+    Register many users from a CSV (header: email,username,password), NDJSON
+    or JSON array body. Streams one NDJSON result per row as its batch is
+    committed, then a final {"summary": ...} line with counts and users/sec.
+    """
+    # Spooled before responding: once a StreamingResponse starts, Starlette
+    # reads the channel for disconnects and the body can no longer be read
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    async for chunk in request.stream():
+        spool.write(chunk)
+    rows = parse_rows(request.headers.get("content-type", ""), _read_spool(spool))
+
+    async def results():
+        # Its own session: the request's dependencies are closed by now
+        try:
+            async with SessionLocal() as db:
+                provisioning = ProvisioningService(db)
+                async for result in provisioning.register(rows):
+                    yield json.dumps(result).encode() + b"\n"
+                yield json.dumps({"summary": provisioning.summary()}).encode() + b"\n"
+        finally:
+            spool.close()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
@@ -7,7 +7,7 @@ from starlette.responses import JSONResponse
 
 from app.services.auth_service import AuthService
 from app.models.schemas import UserCreate, Token, User, NewPassword
-from app.dependencies import get_db, get_current_user, oauth2_scheme
+from app.dependencies import get_db, get_current_user, get_token_claims
 
 router = APIRouter()
 
@@ -38,12 +38,11 @@ async def login(
 
 @router.post("/logout")
 async def logout(
-    current_user_id: str = Depends(get_current_user),
-    token: str = Depends(oauth2_scheme),
+    claims: dict = Depends(get_token_claims),
     db: AsyncSession = Depends(get_db)
 ):
     auth_service = AuthService(db)
-    await auth_service.logout(current_user_id, token)
+    await auth_service.logout(claims)
     return {"message": "Successfully logged out"}
 
 @router.put("/update-password")
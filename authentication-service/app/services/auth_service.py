@@ -1,37 +1,95 @@
 from datetime import timedelta
+from typing import Optional
 
 from fastapi import HTTPException, status
 from pydantic import EmailStr
-from sqlalchemy import select, or_
-from sqlalchemy.exc import IntegrityError
+from redis import RedisError
+from sqlalchemy import exists, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.core.security import verify_password, get_password_hash, create_access_token
+from app.core.hashing import password_hasher
+from app.core.security import create_access_token
 from app.models.user import User
-from app.services.cache_service import RedisCache
+from app.services.cache_service import RedisCache, UserCache
+from app.logger_config import setup_logger
+
+logger = setup_logger(__name__)
 
 
 class AuthService:
     def __init__(self, db: AsyncSession):
         self.db = db
         self.cache = RedisCache()
+        self.users = UserCache()
+
+    async def _query_user(self, column, value: str) -> Optional[User]:
+        result = await self.db.execute(select(User).where(column == value))
+        return result.scalar_one_or_none()
+
+    async def find_user(self, login: str) -> Optional[User]:
+        """Look a user up by email or username, through the user cache.
+
+        Emails always contain "@", so a login without one is only ever a
+        username. Each path is an equality lookup on its own unique index,
+        rather than an OR across both columns.
+        """
+        user = await self.users.get(login)
+        if user is not None:
+            return user
+        user = None
+        if "@" in login:
+            user = await self._query_user(User.email, login)
+        if user is None:
+            user = await self._query_user(User.username, login)
+        if user is not None:
+            await self.users.set(user)
+        return user
 
     async def authenticate_user(self, username: str, password: str)->User:
-        result = await  self.db.execute(select(User).where(or_(User.email == username, User.username == username)))
-        user=result.scalar()
-        print(user)
-        if not user or not verify_password(password, user.hashed_password):
+        user = await self.find_user(username)
+        valid, new_hash = False, None
+        if user:
+            valid, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+        if not valid:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect username or password",
             )
+        if new_hash:
+            await self._rehash(user, new_hash)
         return user
 
+    async def _rehash(self, user: User, new_hash: str):
+        """Store a hash made at the current cost, now that we have the password.
+
+        Only replaces the hash that was just verified, so it can't undo a
+        concurrent password change. The login succeeds either way.
+        """
+        try:
+            await self.db.execute(
+                update(User)
+                .where(User.email == user.email, User.hashed_password == user.hashed_password)
+                .values(hashed_password=new_hash)
+            )
+            await self.db.commit()
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            logger.warning(f"Could not rehash password for {user.email}: {str(e)}")
+            return
+        try:
+            await self.users.invalidate(user.email, user.username)
+        except RedisError as e:
+            # The cached old hash still verifies; it's replaced when it expires
+            logger.warning(f"Could not evict rehashed user {user.email}: {str(e)}")
+
     async def create_user(self, email: EmailStr, username: str, password: str):
-        result = await self.db.execute(select(User).where(or_(User.email == email, User.username == username)))
-        existing_user = result.scalar_one_or_none()
-        if existing_user:
+        # One round trip, each EXISTS probing its own unique index
+        result = await self.db.execute(select(
+            exists().where(User.email == email) | exists().where(User.username == username)
+        ))
+        if result.scalar():
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email or Userid already registered",
@@ -41,7 +99,7 @@ class AuthService:
         user = User(
             email=email,
             username=username,
-            hashed_password=get_password_hash(password)
+            hashed_password=await password_hasher.hash(password)
         )
         self.db.add(user)
 
@@ -65,31 +123,38 @@ class AuthService:
             expires_delta=access_token_expires
         )
 
-        # # Store token in Redis
-        # await self.cache.set_token(
-        #     user.id,
-        #     access_token,
-        #     settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
-        # )
+        # Store token in Redis; the token is valid without it, so an
+        # unavailable Redis doesn't fail the login
+        try:
+            await self.cache.set_token(
+                user.email,
+                access_token,
+                settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+            )
+        except RedisError as e:
+            logger.error(f"Could not store session for {user.email}: {str(e)}")
 
         return {
             "access_token": access_token,
             "token_type": "bearer"
         }
 
-    async def logout(self, user_id: str, token: str):
-        # Delete token from Redis
-        # await self.cache.delete_token(user_id)
-        # Blacklist the token
-        # await self.cache.blacklist_token(token)
-        pass
+    async def logout(self, claims: dict):
+        # Delete the session and revoke the token until it would have expired
+        await self.cache.end_session(claims["sub"], claims.get("jti"), claims["exp"])
 
     async def change_user_password(self, user:User, new_password: str):
-        user.hashed_password=get_password_hash(new_password)
-        self.db.add(user)
+        # ``user`` may come from the user cache, detached from this session
+        hashed_password = await password_hasher.hash(new_password)
+        await self.db.execute(
+            update(User).where(User.email == user.email).values(hashed_password=hashed_password)
+        )
         try:
             await self.db.commit()
         except IntegrityError:
             await self.db.rollback()
             raise
+        # Outside the try: the password has changed, so a failure to evict
+        # the old record must not look like success
+        await self.users.invalidate(user.email, user.username)
 
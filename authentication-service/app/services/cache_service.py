@@ -1,33 +1,95 @@
-import redis
+import json
+from typing import Optional
+
+from redis import RedisError
+
 from app.core.config import settings
+from app.core.redis_client import redis_client
+from app.core.revocation import revocation_list
+from app.logger_config import setup_logger
+from app.models.user import User
+
+logger = setup_logger(__name__)
+
+USER_FIELDS = ("email", "username", "hashed_password", "is_active")
+# Seconds an invalidated user record stays uncacheable
+INVALIDATION_HOLD = 10
+
 
 class RedisCache:
     def __init__(self):
-        self.redis_client = redis.Redis(
-            host=settings.REDIS_HOST,
-            port=settings.REDIS_PORT,
-            decode_responses=True
-        )
+        self.redis = redis_client
 
-    async def set_token(self, user_id: int, token: str, expires_in: int):
+    async def set_token(self, user_id: str, token: str, expires_in: int):
         """Store token in Redis with expiration"""
         key = f"user_session:{user_id}"
-        await self.redis_client.setex(key, expires_in, token)
+        await self.redis.set(key, token, ttl=expires_in)
 
-    async def get_token(self, user_id: int) -> str:
+    async def get_token(self, user_id: str) -> str:
         """Get token from Redis"""
         key = f"user_session:{user_id}"
-        return await self.redis_client.get(key)
+        return await self.redis.get_cached(key)
 
-    async def delete_token(self, user_id: int):
+    async def delete_token(self, user_id: str):
         """Delete token from Redis"""
         key = f"user_session:{user_id}"
-        await self.redis_client.delete(key)
+        await self.redis.delete(key)
+
+    async def end_session(self, user_id: str, jti: str, expires_at: float):
+        """Delete the session and revoke its token in one round trip"""
+        key = f"user_session:{user_id}"
+        pipe = self.redis.pipeline()
+        pipe.delete(key)
+        revocation_list.revoke_in(pipe, jti, expires_at)
+        await self.redis.execute_pipeline(pipe, writes=[key])
+
+
+class UserCache:
+    """Read-through cache of user records for login.
+
+    Each record is stored in Redis under both ``user:email:<email>`` and
+    ``user:username:<username>``, so either login form is one lookup. Reads
+    go through the Redis client's tracked local cache: repeat logins are
+    answered from memory, and a write anywhere (invalidate() after a
+    password change) evicts every process's copy. A local cache that no
+    server invalidates would keep old passwords working on other replicas,
+    so there is no memory tier when the server can't track keys.
+    Redis errors fall back to the database.
+
+    invalidate() leaves a short-lived empty marker rather than deleting,
+    and set() never overwrites one, so a login that read the old row just
+    before a password change can't put it back in the cache.
+    """
+
+    def __init__(self, ttl: int = settings.USER_CACHE_TTL):
+        self.redis = redis_client
+        self.ttl = ttl
+
+    @staticmethod
+    def keys(email: str, username: str):
+        return f"user:email:{email}", f"user:username:{username}"
+
+    async def get(self, login: str) -> Optional[User]:
+        key = f"user:email:{login}" if "@" in login else f"user:username:{login}"
+        try:
+            record = await self.redis.get_cached(key)
+        except RedisError as e:
+            logger.warning(f"User cache unavailable: {str(e)}")
+            return None
+        if not record:
+            return None
+        return User(**json.loads(record))
 
-    async def is_token_blacklisted(self, token: str) -> bool:
-        """Check if token is blacklisted"""
-        return await self.redis_client.sismember("blacklisted_tokens", token)
+    async def set(self, user: User):
+        record = json.dumps({field: getattr(user, field) for field in USER_FIELDS})
+        keys = self.keys(user.email, user.username)
+        pipe = self.redis.pipeline()
+        for key in keys:
+            pipe.set(key, record, ex=self.ttl, nx=True)
+        try:
+            await self.redis.execute_pipeline(pipe, writes=keys)
+        except RedisError as e:
+            logger.warning(f"Could not cache user {user.email}: {str(e)}")
 
-    async def blacklist_token(self, token: str):
-        """Add token to blacklist"""
-        await self.redis_client.sadd("blacklisted_tokens", token)
\ No newline at end of file
+    async def invalidate(self, email: str, username: str):
+        await self.redis.set_many(dict.fromkeys(self.keys(email, username), ""), ttl=INVALIDATION_HOLD)
@@ -0,0 +1,187 @@
+import codecs
+import csv
+import json
+import time
+from typing import AsyncIterator, Dict, List, Set, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.hashing import password_hasher
+from app.models.schemas import UserCreate
+from app.models.user import User
+from app.logger_config import setup_logger
+
+logger = setup_logger(__name__)
+
+CSV_TYPES = {"text/csv", "application/csv"}
+NDJSON_TYPES = {"application/x-ndjson", "application/jsonl"}
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def parse_rows(content_type: str, chunks: AsyncIterator[bytes]) -> AsyncIterator[Dict]:
+    """Yield one dict per user from a CSV (with header), NDJSON or JSON array body.
+
+    CSV and NDJSON are parsed as the body streams in; a JSON array has to
+    arrive whole. Rows that can't be parsed are yielded as ``{"_error": ...}``.
+    """
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type in CSV_TYPES:
+        header = None
+        async for line in _lines(chunks):
+            if not line.strip():
+                continue
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [name.strip().lower() for name in values]
+                continue
+            yield dict(zip(header, values)) if len(values) == len(header) else {
+                "_error": f"Expected {len(header)} columns, got {len(values)}"}
+    elif media_type in NDJSON_TYPES:
+        async for line in _lines(chunks):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                row = {"_error": f"Invalid JSON: {e}"}
+            yield row if isinstance(row, dict) else {"_error": "Expected a JSON object"}
+    else:
+        body = b"".join([chunk async for chunk in chunks])
+        try:
+            rows = json.loads(body)
+        except ValueError as e:
+            rows = [{"_error": f"Invalid JSON: {e}"}]
+        if not isinstance(rows, list):
+            rows = [{"_error": "Expected a JSON array of users"}]
+        for row in rows:
+            yield row if isinstance(row, dict) else {"_error": "Expected a JSON object"}
+
+
+class ProvisioningService:
+    """Registers users in bulk, one batch of BULK_BATCH_SIZE rows at a time.
+
+    Per batch: one query finds every email or username already taken, the
+    new users' passwords are hashed in parallel on the bulk process pool,
+    and rows go in as multi-row ``INSERT ... ON CONFLICT DO NOTHING``, so a
+    concurrent registration of the same user is reported as a duplicate
+    rather than failing the batch. Each row's outcome is yielded as soon
+    as its batch commits.
+    """
+
+    def __init__(self, db: AsyncSession, batch_size: int = settings.BULK_BATCH_SIZE):
+        self.db = db
+        self.batch_size = batch_size
+        self.counts = {"created": 0, "duplicate": 0, "invalid": 0}
+        self.started = time.perf_counter()
+
+    def _insert(self):
+        if self.db.bind.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        return insert(User)
+
+    async def _taken(self, users: List[UserCreate]) -> Tuple[Set[str], Set[str]]:
+        # UNION ALL of two IN lookups, each on its own unique index
+        emails = [user.email for user in users]
+        usernames = [user.username for user in users]
+        result = await self.db.execute(union_all(
+            select(User.email, User.username).where(User.email.in_(emails)),
+            select(User.email, User.username).where(User.username.in_(usernames)),
+        ))
+        rows = result.all()
+        return {row[0] for row in rows}, {row[1] for row in rows}
+
+    def _result(self, index: int, email, status: str, detail: str = None) -> Dict:
+        self.counts[status] += 1
+        result = {"row": index, "email": email, "status": status}
+        if detail:
+            result["detail"] = detail
+        return result
+
+    async def _process(self, batch: List[Tuple[int, Dict]]) -> List[Dict]:
+        results: Dict[int, Dict] = {}
+        valid: List[Tuple[int, UserCreate]] = []
+        seen_emails: Set[str] = set()
+        seen_usernames: Set[str] = set()
+        for index, row in batch:
+            if "_error" in row:
+                results[index] = self._result(index, None, "invalid", row["_error"])
+                continue
+            try:
+                user = UserCreate.model_validate(row)
+            except ValidationError as e:
+                errors = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+                results[index] = self._result(index, row.get("email"), "invalid", errors)
+                continue
+            if user.email in seen_emails or user.username in seen_usernames:
+                results[index] = self._result(index, user.email, "duplicate", "Repeated within the upload")
+                continue
+            seen_emails.add(user.email)
+            seen_usernames.add(user.username)
+            valid.append((index, user))
+
+        if valid:
+            taken_emails, taken_usernames = await self._taken([user for _, user in valid])
+            new = []
+            for index, user in valid:
+                if user.email in taken_emails or user.username in taken_usernames:
+                    results[index] = self._result(index, user.email, "duplicate", "Email or Userid already registered")
+                else:
+                    new.append((index, user))
+
+            hashes = await password_hasher.hash_many([user.password for _, user in new])
+            inserted: Set[str] = set()
+            if new:
+                statement = self._insert().values([
+                    {"email": user.email, "username": user.username, "hashed_password": hashed, "is_active": True}
+                    for (_, user), hashed in zip(new, hashes)
+                ]).on_conflict_do_nothing().returning(User.email)
+                inserted = set((await self.db.execute(statement)).scalars().all())
+                await self.db.commit()
+            for index, user in new:
+                if user.email in inserted:
+                    results[index] = self._result(index, user.email, "created")
+                else:
+                    # Registered by someone else since the duplicate check
+                    results[index] = self._result(index, user.email, "duplicate", "Email or Userid already registered")
+
+        return [results[index] for index, _ in batch]
+
+    def summary(self) -> Dict:
+        elapsed = time.perf_counter() - self.started
+        return {
+            **self.counts,
+            "seconds": round(elapsed, 3),
+            "users_per_sec": round(self.counts["created"] / elapsed, 1) if elapsed else 0.0,
+        }
+
+    async def register(self, rows: AsyncIterator[Dict]) -> AsyncIterator[Dict]:
+        batch: List[Tuple[int, Dict]] = []
+        index = 0
+        async for row in rows:
+            batch.append((index, row))
+            index += 1
+            if len(batch) >= self.batch_size:
+                for result in await self._process(batch):
+                    yield result
+                batch = []
+        if batch:
+            for result in await self._process(batch):
+                yield result
+        logger.info(f"Bulk registration finished: {self.summary()}")
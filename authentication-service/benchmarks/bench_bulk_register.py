@@ -0,0 +1,88 @@
+"""
+Users/sec for bulk registration vs one /register call per user.
+
+Registers ``--users`` accounts through POST /api/v1/admin/users/bulk as a
+streamed CSV (plus a few duplicates and invalid rows), then another
+``--users`` one at a time through /register, in a throwaway SQLite
+database. Hashing uses the configured scheme (bcrypt's default cost), so
+on N cores the bulk path should approach N times the serial rate. Uses the
+Redis at REDIS_URL or a fakeredis TCP stand-in.
+
+    python -m benchmarks.bench_bulk_register --users 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.bench_redis import start_stand_in
+
+
+async def run(users: int, batch_size: int) -> None:
+    import httpx
+    from app.core.config import settings
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://auth", timeout=None) as client:
+            admin = {"email": "admin@example.com", "username": "admin", "password": "admin-password"}
+            await client.post(f"{settings.API_V1_STR}/auth/register", json=admin)
+            response = await client.post(f"{settings.API_V1_STR}/auth/login", data={
+                "username": admin["username"], "password": admin["password"]})
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}", "Content-Type": "text/csv"}
+
+            async def body():
+                yield b"email,username,password\n"
+                for i in range(users):
+                    yield f"bulk{i}@example.com,bulk{i},password-{i}\n".encode()
+                yield b"bulk0@example.com,bulk0,password-0\n"  # repeated in the upload
+                yield b"admin@example.com,someone,password\n"  # already registered
+                yield b"not-an-email,broken,password\n"
+
+            statuses = {}
+            first_result = None
+            start = time.perf_counter()
+            async with client.stream("POST", f"{settings.API_V1_STR}/admin/users/bulk",
+                                     headers=headers, content=body()) as response:
+                assert response.status_code == 200, await response.aread()
+                async for line in response.aiter_lines():
+                    result = json.loads(line)
+                    if "summary" in result:
+                        summary = result["summary"]
+                        continue
+                    first_result = first_result or time.perf_counter() - start
+                    statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+            print(f"bulk:     {summary['users_per_sec']:7.1f} users/s   first result after "
+                  f"{first_result * 1000:.0f} ms   {statuses}")
+
+            start = time.perf_counter()
+            for i in range(users):
+                response = await client.post(f"{settings.API_V1_STR}/auth/register", json={
+                    "email": f"single{i}@example.com", "username": f"single{i}", "password": f"password-{i}"})
+                assert response.status_code == 200, response.text
+            print(f"register: {users / (time.perf_counter() - start):7.1f} users/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--port", type=int, default=16379, help="port for the fakeredis stand-in")
+    args = parser.parse_args()
+
+    database = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ.update({
+        "API_V1_STR": "/api/v1", "DEBUG": "false", "SECRET_KEY": "bench-secret-bench-secret-bench-secret",
+        "ALGORITHM": "HS256", "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+        "DATABASE_URL": f"sqlite+aiosqlite:///{database}",
+        "REDIS_HOST": "127.0.0.1", "REDIS_PORT": "6379",
+        "ADMIN_EMAILS": "admin@example.com", "BULK_BATCH_SIZE": str(args.batch_size),
+    })
+    os.environ.setdefault("HASH_ALGORITHM", "bcrypt")
+    os.environ["REDIS_URL"] = os.environ.get("REDIS_URL") or start_stand_in(args.port)
+    asyncio.run(run(args.users, args.batch_size))
+    # The stand-in's handler threads would otherwise keep the process alive
+    os._exit(0)
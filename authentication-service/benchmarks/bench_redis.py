@@ -0,0 +1,111 @@
+"""
+Session-store operations per second over the shared Redis client.
+
+Runs ``--ops`` logouts (delete session + revoke token), ``--concurrency``
+at a time, once as separate round trips and once pipelined, then times
+session reads through get_cached() and revocation checks of tokens that
+were not revoked (the filter answers those without Redis) against a plain
+EXISTS per check. Uses the server at REDIS_URL, or starts an
+in-process fakeredis TCP server as a stand-in (no client-side caching there:
+it lacks CLIENT TRACKING).
+
+    python -m benchmarks.bench_redis --ops 5000 --concurrency 50
+    REDIS_URL=redis://localhost:6379/15 python -m benchmarks.bench_redis
+"""
+import argparse
+import asyncio
+import os
+import socket
+import threading
+import time
+
+
+def start_stand_in(port: int) -> str:
+    from fakeredis import TcpFakeServer
+
+    class StandIn(TcpFakeServer):
+        def get_request(self):
+            # Like Redis itself; otherwise Nagle stalls every pipelined reply
+            conn, addr = super().get_request()
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            return conn, addr
+
+    server = StandIn(("127.0.0.1", port), server_type="redis")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"redis://127.0.0.1:{port}/0"
+
+
+async def timed(label: str, ops: int, concurrency: int, op) -> None:
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with slots:
+            await op(i)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(ops)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {ops / elapsed:>10.0f} ops/s")
+
+
+async def run(ops: int, concurrency: int) -> None:
+    from app.core.redis_client import redis_client
+    from app.core.revocation import revocation_list
+    from app.services.cache_service import RedisCache
+    from docmind_common.revocation import checks_total
+
+    await redis_client.start()
+    await revocation_list.start()
+    await asyncio.sleep(0.5)  # let the subscriptions settle
+    cache = RedisCache()
+    await redis_client.set_many({f"user_session:user{i}": f"token-{i}" for i in range(ops)}, ttl=600)
+
+    expires_at = time.time() + 600
+
+    async def separate(i: int) -> None:
+        await cache.delete_token(f"user{i}")
+        await revocation_list.revoke(f"jti-a{i}", expires_at)
+
+    async def pipelined(i: int) -> None:
+        await cache.end_session(f"user{i}", f"jti-b{i}", expires_at)
+
+    async def read(i: int) -> None:
+        await cache.get_token(f"user{i % 100}")
+
+    async def check_filter(i: int) -> None:
+        assert not await revocation_list.is_revoked(f"live-{i}")
+
+    async def check_redis(i: int) -> None:
+        await redis_client.execute("EXISTS", revocation_list.key(f"live-{i}"))
+
+    print(f"client-side caching: {redis_client.tracking}")
+    await timed("logout, separate commands", ops, concurrency, separate)
+    await timed("logout, pipelined", ops, concurrency, pipelined)
+    await timed("session reads (100 hot keys)", ops, concurrency, read)
+    await timed("revocation check, filter", ops, concurrency, check_filter)
+    await timed("revocation check, EXISTS", ops, concurrency, check_redis)
+    await asyncio.sleep(0.5)
+    print(f"revocations in filter: {len(revocation_list.filter)} "
+          f"({revocation_list.filter.nbytes / 1024:.0f} KiB)")
+    print("revocation checks:", {dict(labels)["answer"]: int(n) for labels, n in checks_total.samples().items()})
+    await revocation_list.stop()
+    await redis_client.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ops", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--port", type=int, default=16379, help="port for the fakeredis stand-in")
+    args = parser.parse_args()
+
+    os.environ.update({
+        "API_V1_STR": "/api/v1", "DEBUG": "false", "SECRET_KEY": "bench-secret",
+        "ALGORITHM": "HS256", "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+        "DATABASE_URL": "sqlite+aiosqlite://", "HASH_ALGORITHM": "bcrypt",
+        "REDIS_HOST": "127.0.0.1", "REDIS_PORT": "6379",
+    })
+    os.environ["REDIS_URL"] = os.environ.get("REDIS_URL") or start_stand_in(args.port)
+    asyncio.run(run(args.ops, args.concurrency))
+    # The stand-in's handler threads would otherwise keep the process alive
+    os._exit(0)
@@ -0,0 +1,129 @@
+"""
+Login user lookup and login latency against a large users table.
+
+Bulk-loads ``--rows`` users into a throwaway SQLite database (or the one at
+DATABASE_URL), then times ``--lookups`` random lookups with the old
+``email = x OR username = x`` query, with the split per-index lookups, and
+through the warm user cache, followed by full logins with the cache cold
+and warm. Passwords are hashed with 4 bcrypt rounds so the lookup, not the
+hash, dominates. Uses the Redis at REDIS_URL or a fakeredis TCP stand-in.
+
+    python -m benchmarks.bench_user_lookup --rows 1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from typing import Awaitable, Callable, List
+
+from benchmarks.bench_login import percentile
+from benchmarks.bench_redis import start_stand_in
+
+
+def load_sqlite(path: str, rows: int, hashed_password: str) -> None:
+    from sqlalchemy import create_engine
+
+    from app.core.database import Base
+    from app.models.user import User  # noqa: F401  registers the table
+
+    Base.metadata.create_all(create_engine(f"sqlite:///{path}"))
+    conn = sqlite3.connect(path)
+    if conn.execute("SELECT count(*) FROM users").fetchone()[0] >= rows:
+        conn.close()
+        return
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    batch = 50000
+    for start in range(0, rows, batch):
+        conn.executemany(
+            "INSERT INTO users (email, username, hashed_password, is_active) VALUES (?, ?, ?, 1)",
+            ((f"user{i}@example.com", f"user{i}", hashed_password) for i in range(start, min(rows, start + batch))),
+        )
+    conn.commit()
+    conn.close()
+
+
+async def timed(label: str, logins: List[str], fn: Callable[[str], Awaitable]) -> None:
+    latencies = []
+    for login in logins:
+        start = time.perf_counter()
+        await fn(login)
+        latencies.append(time.perf_counter() - start)
+    print(f"{label:<34} p50 {percentile(latencies, 50):8.3f} ms   p99 {percentile(latencies, 99):8.3f} ms")
+
+
+async def run(rows: int, lookups: int, logins: int) -> None:
+    import httpx
+    from sqlalchemy import or_, select
+
+    from app.core.config import settings
+    from app.core.database import SessionLocal, engine
+    from app.main import app
+    from app.models.user import User
+    from app.services.auth_service import AuthService
+
+    if engine.url.get_backend_name() == "sqlite":
+        from passlib.hash import bcrypt
+
+        start = time.perf_counter()
+        load_sqlite(engine.url.database, rows, bcrypt.using(rounds=4).hash("password"))
+        print(f"users table ready in {time.perf_counter() - start:.1f}s")
+
+    async with app.router.lifespan_context(app):
+        await asyncio.sleep(0.5)  # let the Redis subscriptions settle
+
+        sample = [random.randrange(rows) for _ in range(lookups)]
+        by_email = [f"user{i}@example.com" for i in sample]
+        by_username = [f"user{i}" for i in sample]
+
+        async with SessionLocal() as session:
+            service = AuthService(session)
+
+            async def or_query(login: str):
+                result = await session.execute(
+                    select(User).where(or_(User.email == login, User.username == login)))
+                return result.scalar()
+
+            async def split_query(login: str):
+                column = User.email if "@" in login else User.username
+                return await service._query_user(column, login)
+
+            for label, logins_ in (("email", by_email), ("username", by_username)):
+                await timed(f"OR query, by {label}", logins_, or_query)
+                await timed(f"split query, by {label}", logins_, split_query)
+                for login in logins_:
+                    await service.find_user(login)
+                await timed(f"user cache (warm), by {label}", logins_, service.find_user)
+
+        prefix = f"{settings.API_V1_STR}/auth"
+        fresh = [f"user{random.randrange(rows)}" for _ in range(logins)]
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://auth") as client:
+            async def login(username: str):
+                response = await client.post(f"{prefix}/login", data={"username": username, "password": "password"})
+                assert response.status_code == 200, response.text
+
+            await timed("login, user cache cold", fresh, login)
+            await timed("login, user cache warm", fresh, login)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--port", type=int, default=16379, help="port for the fakeredis stand-in")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'users.db')}")
+    os.environ.update({
+        "API_V1_STR": "/api/v1", "DEBUG": "false", "SECRET_KEY": "bench-secret-bench-secret-bench-secret",
+        "ALGORITHM": "HS256", "ACCESS_TOKEN_EXPIRE_MINUTES": "30", "HASH_ALGORITHM": "bcrypt",
+        "HASH_EXECUTOR": "inline", "REDIS_HOST": "127.0.0.1", "REDIS_PORT": "6379",
+    })
+    os.environ["REDIS_URL"] = os.environ.get("REDIS_URL") or start_stand_in(args.port)
+    asyncio.run(run(args.rows, args.lookups, args.logins))
+    # The stand-in's handler threads would otherwise keep the process alive
+    os._exit(0)
@@ -0,0 +1,7 @@
+"""
+Code shared by the DocMind services.
+
+Each service installs this package (``pip install -e ../docmind-common``)
+and configures what it needs from its own settings; nothing in here reads
+a service's configuration.
+"""
@@ -0,0 +1,79 @@
+import hashlib
+import math
+import time
+from typing import Dict, List
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter sized for ``capacity`` items at ``error_rate``."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        # Double hashing over one 128-bit digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._bits)
+
+
+class ExpiringBloomFilter:
+    """Bloom filters bucketed by the expiry of what they hold.
+
+    A token ID goes into the bucket covering its ``exp``; a bucket is
+    dropped once everything in it has expired, so memory follows the
+    number of live revocations. A bucket that fills up grows another
+    filter rather than letting its false-positive rate climb.
+    """
+
+    def __init__(self, bucket_seconds: int, capacity: int, error_rate: float):
+        self.bucket_seconds = bucket_seconds
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._buckets: Dict[int, List[BloomFilter]] = {}
+
+    def add(self, item: str, expires_at: float) -> None:
+        if expires_at <= time.time():
+            return
+        filters = self._buckets.setdefault(int(expires_at // self.bucket_seconds), [])
+        if any(item in bloom for bloom in filters):
+            # Already there (e.g. our own revocation echoed back by pub/sub)
+            return
+        if not filters or filters[-1].count >= self.capacity:
+            # Each extra filter is twice as strict, keeping the bucket's
+            # combined false-positive rate under 2 * error_rate
+            filters.append(BloomFilter(self.capacity, self.error_rate / 2 ** len(filters)))
+        filters[-1].add(item)
+
+    def purge(self) -> None:
+        current = int(time.time() // self.bucket_seconds)
+        for bucket in [bucket for bucket in self._buckets if bucket < current]:
+            del self._buckets[bucket]
+
+    def __contains__(self, item: str) -> bool:
+        self.purge()
+        return any(item in bloom for filters in self._buckets.values() for bloom in filters)
+
+    def __len__(self) -> int:
+        return sum(bloom.count for filters in self._buckets.values() for bloom in filters)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(bloom.nbytes for filters in self._buckets.values() for bloom in filters)
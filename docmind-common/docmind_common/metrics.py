@@ -0,0 +1,123 @@
+"""
+The Prometheus metrics every service serves on /metrics.
+
+Modules register their metrics on the process-wide ``registry`` at import
+time; registering a name twice returns the metric already there.
+"""
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+LabelKey = Tuple[Tuple[str, str], ...]
+Sample = Union[float, Dict[LabelKey, float]]
+
+
+class Metric:
+    """A counter or gauge rendered in the Prometheus text exposition format.
+
+    Values are either recorded with inc()/set() or, when ``fn`` is given,
+    read from the callback at scrape time (a number, or a dict of label
+    tuples to numbers).
+    """
+
+    def __init__(self, name: str, documentation: str, kind: str,
+                 fn: Optional[Callable[[], Sample]] = None):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.fn = fn
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[tuple(sorted(labels.items()))] = value
+
+    def samples(self) -> Dict[LabelKey, float]:
+        if self.fn is None:
+            return dict(self._values)
+        value = self.fn()
+        if isinstance(value, dict):
+            return value
+        return {(): float(value)}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}",
+                 f"# TYPE {self.name} {self.kind}"]
+        for labels, value in self.samples().items():
+            if labels:
+                label_str = ",".join(f'{k}="{v}"' for k, v in labels)
+                lines.append(f"{self.name}{{{label_str}}} {value}")
+            else:
+                lines.append(f"{self.name} {value}")
+        return lines
+
+
+class Histogram(Metric):
+    """Observations counted into cumulative ``le`` buckets, with _sum and _count."""
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float]):
+        super().__init__(name, documentation, "histogram")
+        self.buckets = sorted(buckets)
+        self._series: Dict[LabelKey, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        # One count per bucket, then +Inf, then the sum
+        series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += 1
+        series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}",
+                 f"# TYPE {self.name} {self.kind}"]
+        for labels, series in self._series.items():
+            label_str = "".join(f'{k}="{v}",' for k, v in labels)
+            for bound, count in zip(self.buckets + [float("inf")], series):
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{label_str}le="{le}"}} {count}')
+            suffix = f"{{{label_str.rstrip(',')}}}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {series[-1]}")
+            lines.append(f"{self.name}_count{suffix} {series[-2]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def _register(self, name: str, documentation: str, kind: str,
+                  fn: Optional[Callable[[], Sample]]) -> Metric:
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = Metric(name, documentation, kind, fn)
+        return metric
+
+    def counter(self, name: str, documentation: str,
+                fn: Optional[Callable[[], Sample]] = None) -> Metric:
+        return self._register(name, documentation, "counter", fn)
+
+    def gauge(self, name: str, documentation: str,
+              fn: Optional[Callable[[], Sample]] = None) -> Metric:
+        return self._register(name, documentation, "gauge", fn)
+
+    def histogram(self, name: str, documentation: str, buckets: Sequence[float]) -> Histogram:
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = Histogram(name, documentation, buckets)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
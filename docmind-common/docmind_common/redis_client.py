@@ -0,0 +1,271 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+import redis.asyncio as redis
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+INVALIDATE_CHANNEL = "__redis__:invalidate"
+
+commands_total = registry.counter(
+    "redis_commands_total", "Redis commands and pipelines sent, by operation and outcome")
+command_seconds = registry.counter(
+    "redis_command_seconds_total", "Time spent waiting on Redis, by operation")
+local_cache_total = registry.counter(
+    "redis_local_cache_lookups_total", "Client-side cache lookups, by outcome")
+invalidations_total = registry.counter(
+    "redis_local_cache_invalidations_total", "Keys dropped from the client-side cache by the server")
+
+
+class RedisClient:
+    """A service's one asyncio Redis client.
+
+    Commands share a bounded connection pool (callers wait up to
+    ``pool_timeout`` for a free connection instead of opening more), and
+    multi-key helpers send their commands as one pipeline. Reads through
+    get_cached() are served from a small local cache kept coherent with
+    server-assisted client-side caching: the server tracks every key under
+    ``tracking_prefixes`` and pushes invalidations on __redis__:invalidate.
+    Servers without CLIENT TRACKING (Redis < 6, most stand-ins) simply skip
+    the local cache.
+
+    start() connects to ``url``, or adopts an already built client, e.g.
+    ``fakeredis.FakeAsyncRedis()`` in tests.
+    """
+
+    def __init__(self, url: str, max_connections: int = 50, pool_timeout: float = 2.0,
+                 socket_timeout: float = 2.0, health_check_interval: int = 30,
+                 local_cache_size: int = 0, local_cache_ttl: float = 60.0,
+                 tracking_prefixes: Iterable[str] = ()):
+        self.url = url
+        self.max_connections = max_connections
+        self.pool_timeout = pool_timeout
+        self.socket_timeout = socket_timeout
+        self.health_check_interval = health_check_interval
+        self.local_cache_size = local_cache_size
+        self.local_cache_ttl = local_cache_ttl
+        self.tracking_prefixes = list(tracking_prefixes)
+        self.in_flight = 0
+        self._redis: Optional[redis.Redis] = None
+        self._local: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        # Bumped on every invalidation so a read racing one is not cached
+        self._epoch = 0
+        self._tracking = False
+        self._tracker: Optional[asyncio.Task] = None
+
+    @property
+    def client(self) -> redis.Redis:
+        if self._redis is None:
+            raise RuntimeError("Redis client used before startup")
+        return self._redis
+
+    @property
+    def tracking(self) -> bool:
+        return self._tracking
+
+    @property
+    def local_cache_keys(self) -> int:
+        return len(self._local)
+
+    async def start(self, client: Optional[redis.Redis] = None) -> None:
+        if self._redis is not None:
+            return
+        if client is None:
+            pool = redis.BlockingConnectionPool.from_url(
+                self.url,
+                max_connections=self.max_connections,
+                timeout=self.pool_timeout,
+                socket_timeout=self.socket_timeout,
+                socket_connect_timeout=self.socket_timeout,
+                health_check_interval=self.health_check_interval,
+                decode_responses=True,
+            )
+            client = redis.Redis(connection_pool=pool)
+        self._redis = client
+        if self.local_cache_size > 0 and self.tracking_prefixes:
+            self._tracker = asyncio.create_task(self._track())
+
+    async def stop(self) -> None:
+        if self._tracker is not None:
+            self._tracker.cancel()
+            try:
+                await self._tracker
+            except asyncio.CancelledError:
+                pass
+            self._tracker = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+        self._local.clear()
+
+    @asynccontextmanager
+    async def _timed(self, operation: str) -> AsyncIterator[None]:
+        self.in_flight += 1
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            yield
+            outcome = "ok"
+        finally:
+            self.in_flight -= 1
+            command_seconds.inc(time.perf_counter() - start, operation=operation)
+            commands_total.inc(operation=operation, outcome=outcome)
+
+    async def execute(self, *args: Any) -> Any:
+        async with self._timed(str(args[0]).lower()):
+            return await self.client.execute_command(*args)
+
+    def pipeline(self, transaction: bool = False) -> redis.client.Pipeline:
+        return self.client.pipeline(transaction=transaction)
+
+    async def execute_pipeline(self, pipe: redis.client.Pipeline, writes: Iterable[str] = ()) -> List[Any]:
+        """Send everything queued on ``pipe`` in one round trip.
+
+        ``writes`` names the keys the pipeline modifies, so they are dropped
+        from the local cache straight away.
+        """
+        async with self._timed("pipeline"):
+            results = await pipe.execute()
+        self._invalidate(list(writes))
+        return results
+
+    async def get_many(self, keys: List[str]) -> List[Optional[str]]:
+        if not keys:
+            return []
+        async with self._timed("mget"):
+            return await self.client.mget(keys)
+
+    async def set(self, key: str, value: str, ttl: Optional[int] = None) -> None:
+        async with self._timed("set"):
+            await self.client.set(key, value, ex=ttl)
+        # Don't wait for the server's invalidation to see our own write
+        self._invalidate([key])
+
+    async def set_many(self, mapping: Dict[str, str], ttl: Optional[int] = None) -> None:
+        pipe = self.pipeline()
+        for key, value in mapping.items():
+            pipe.set(key, value, ex=ttl)
+        await self.execute_pipeline(pipe, writes=mapping)
+
+    async def delete(self, *keys: str) -> int:
+        async with self._timed("del"):
+            deleted = await self.client.delete(*keys)
+        self._invalidate(list(keys))
+        return deleted
+
+    def _cacheable(self, key: str) -> bool:
+        return self._tracking and any(key.startswith(prefix) for prefix in self.tracking_prefixes)
+
+    async def get_cached(self, key: str) -> Optional[str]:
+        """GET served from the local cache when the key is tracked."""
+        if not self._cacheable(key):
+            async with self._timed("get"):
+                return await self.client.get(key)
+
+        entry = self._local.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._local.move_to_end(key)
+            local_cache_total.inc(outcome="hit")
+            return entry[1]
+        local_cache_total.inc(outcome="miss")
+
+        epoch = self._epoch
+        async with self._timed("get"):
+            value = await self.client.get(key)
+        if epoch == self._epoch and self._tracking:
+            self._local[key] = (time.monotonic() + self.local_cache_ttl, value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_cache_size:
+                self._local.popitem(last=False)
+        return value
+
+    def _invalidate(self, keys: Optional[List]) -> None:
+        self._epoch += 1
+        if keys is None:
+            # FLUSHDB/FLUSHALL, or tracking was lost
+            invalidations_total.inc(len(self._local))
+            self._local.clear()
+            return
+        for key in keys:
+            if isinstance(key, bytes):
+                key = key.decode()
+            if self._local.pop(key, None) is not None:
+                invalidations_total.inc()
+
+    def _listener_kwargs(self) -> Dict[str, Any]:
+        # For connections that sit waiting for pushes: no read timeout; a
+        # dead peer is noticed through keepalive
+        return dict(self.client.connection_pool.connection_kwargs, socket_timeout=None, socket_keepalive=True)
+
+    def pubsub(self) -> redis.client.PubSub:
+        """A PubSub on a connection of its own, outside the command pool."""
+        pool = redis.ConnectionPool(
+            connection_class=self.client.connection_pool.connection_class, **self._listener_kwargs())
+        return redis.client.PubSub(pool, ignore_subscribe_messages=True)
+
+    async def _subscribe_invalidations(self) -> redis.Connection:
+        # Tracking lives as long as its connection, so it can't come from
+        # the pool. Local entries expire after local_cache_ttl regardless
+        pool = self.client.connection_pool
+        conn = pool.connection_class(**self._listener_kwargs())
+        await conn.connect()
+        await conn.send_command("CLIENT", "ID")
+        client_id = await conn.read_response()
+        prefixes = [arg for prefix in self.tracking_prefixes for arg in ("PREFIX", prefix)]
+        await conn.send_command("CLIENT", "TRACKING", "ON", "REDIRECT", client_id, "BCAST", *prefixes)
+        await conn.read_response()
+        await conn.send_command("SUBSCRIBE", INVALIDATE_CHANNEL)
+        await conn.read_response()
+        return conn
+
+    async def _track(self) -> None:
+        backoff = 1.0
+        while True:
+            conn = None
+            try:
+                conn = await self._subscribe_invalidations()
+                self._tracking = True
+                backoff = 1.0
+                logger.info(f"Redis client-side caching enabled for {', '.join(self.tracking_prefixes)}")
+                while True:
+                    message = await conn.read_response()
+                    if isinstance(message, list) and len(message) == 3 and message[0] in ("message", b"message"):
+                        self._invalidate(message[2])
+            except asyncio.CancelledError:
+                raise
+            except redis.ResponseError as e:
+                logger.info(f"Redis client-side caching unavailable: {str(e)}")
+                return
+            except Exception as e:
+                logger.warning(f"Redis invalidation stream lost, retrying in {backoff:.0f}s: {str(e)}")
+            finally:
+                # Without invalidations nothing local can be trusted
+                self._tracking = False
+                self._invalidate(None)
+                if conn is not None:
+                    await conn.disconnect()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    async def health(self) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            async with self._timed("ping"):
+                await self.client.ping()
+        except (redis.RedisError, RuntimeError) as e:
+            return {"status": "unhealthy", "error": str(e)}
+        return {
+            "status": "healthy",
+            "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+            "in_flight": self.in_flight,
+            "max_connections": self.max_connections,
+            "client_side_caching": self._tracking,
+            "local_cache_keys": self.local_cache_keys,
+        }
+
@@ -0,0 +1,128 @@
+import asyncio
+import json
+import logging
+import math
+import time
+from typing import Optional
+
+from redis import RedisError
+
+from .bloom import ExpiringBloomFilter
+from .metrics import registry
+from .redis_client import RedisClient
+
+logger = logging.getLogger(__name__)
+
+REVOKED_PREFIX = "revoked:"
+
+checks_total = registry.counter(
+    "token_revocation_checks_total", "Revocation checks, by how they were answered")
+
+
+class RevocationList:
+    """Revoked token IDs (``jti``), each kept until its token would expire.
+
+    Redis holds ``revoked:<jti>`` with a TTL of the token's remaining
+    lifetime and is the source of truth. Every process keeps an expiring
+    Bloom filter of those IDs, loaded at startup and fed by the revocations
+    published on TOKEN_REVOCATION_CHANNEL, so the usual answer (not
+    revoked) never leaves memory. Only a filter hit is confirmed in Redis.
+    """
+
+    def __init__(self, redis: RedisClient, channel: str, bucket_seconds: int = 300,
+                 capacity: int = 10000, error_rate: float = 0.001):
+        self.redis = redis
+        self.channel = channel
+        self.bucket_seconds = bucket_seconds
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.filter = self._empty_filter()
+        self._listener: Optional[asyncio.Task] = None
+
+    def _empty_filter(self) -> ExpiringBloomFilter:
+        return ExpiringBloomFilter(self.bucket_seconds, self.capacity, self.error_rate)
+
+    @staticmethod
+    def key(jti: str) -> str:
+        return f"{REVOKED_PREFIX}{jti}"
+
+    def revoke_in(self, pipe, jti: str, expires_at: float) -> None:
+        """Queue the revocation on ``pipe``, to be sent with other commands."""
+        ttl = math.ceil(expires_at - time.time())
+        if not jti or ttl <= 0:
+            # Tokens without an ID can't be revoked; expired ones needn't be
+            return
+        pipe.set(self.key(jti), str(int(expires_at)), ex=ttl)
+        pipe.publish(self.channel, json.dumps({"jti": jti, "exp": int(expires_at)}))
+        self.filter.add(jti, expires_at)
+
+    async def revoke(self, jti: str, expires_at: float) -> None:
+        pipe = self.redis.pipeline()
+        self.revoke_in(pipe, jti, expires_at)
+        await self.redis.execute_pipeline(pipe)
+
+    async def is_revoked(self, jti: Optional[str]) -> bool:
+        if not jti:
+            checks_total.inc(answer="no_jti")
+            return False
+        if jti not in self.filter:
+            checks_total.inc(answer="filter")
+            return False
+        try:
+            revoked = bool(await self.redis.execute("EXISTS", self.key(jti)))
+        except RedisError as e:
+            # The filter hit is very likely a real revocation; fail closed
+            logger.error(f"Could not confirm revocation of {jti}: {str(e)}")
+            checks_total.inc(answer="unconfirmed")
+            return True
+        checks_total.inc(answer="revoked" if revoked else "false_positive")
+        return revoked
+
+    async def load(self) -> None:
+        """Rebuild the filter from Redis, dropping anything that expired."""
+        loaded = self._empty_filter()
+        keys = [key async for key in self.redis.client.scan_iter(match=f"{REVOKED_PREFIX}*", count=1000)]
+        for start in range(0, len(keys), 1000):
+            batch = keys[start:start + 1000]
+            for key, exp in zip(batch, await self.redis.get_many(batch)):
+                if exp is not None:
+                    loaded.add(key[len(REVOKED_PREFIX):], float(exp))
+        self.filter = loaded
+        logger.info(f"Loaded {len(loaded)} live token revocation(s)")
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                # Subscribed first, so nothing revoked during the load is missed
+                await self.load()
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    try:
+                        revocation = json.loads(message["data"])
+                        self.filter.add(revocation["jti"], float(revocation["exp"]))
+                    except (ValueError, KeyError, TypeError):
+                        logger.warning(f"Ignoring malformed revocation: {message['data']!r}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Revocation channel lost, resubscribing: {str(e)}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    async def start(self) -> None:
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+